@@ -0,0 +1,107 @@
+"""Summaries and questions for a document's text, shared by the web app and batch CLI"""
+import re
+from models import MODEL_SPECS
+from summarization import summarize_sentences
+from text_analysis import compute_statistics, extract_key_points, extractive_summarization
+from questions import generate_multiple_choice_questions, generate_theory_questions, generate_rule_based_questions
+
+DEFAULT_QUESTION_TYPES = ['multiple_choice', 'theory']
+
+
+class AnalysisError(ValueError):
+    """A problem with the document's text that the user can fix"""
+
+
+def report_nothing(progress=None, message=None):
+    """Progress callback used when an analysis runs outside a job"""
+
+def summarize_document(content_hash, text, get_analysis, results, models, report=report_nothing):
+    """Summarize a document's text; report(progress, message) tracks progress
+
+    get_analysis() returns the text's AnalyzedDocument and is only called
+    when the summary is not in the results cache.
+    """
+    if len(re.sub(r'\s+', ' ', text).strip()) < 100:
+        raise AnalysisError('Text too short for summarization')
+
+    # Results are cached per document and per method that produced them
+    ai_params = {'model': MODEL_SPECS['summarizer'][1]}
+    fallback_params = {'model': 'extractive'}
+    cached = results.get(content_hash, 'summary', ai_params)
+    use_ai = cached is None and models.available('summarizer')
+    if cached is None and not use_ai:
+        cached = results.get(content_hash, 'summary', fallback_params)
+    if cached is not None:
+        return cached
+
+    def summary_progress(done, total, round_index):
+        if round_index == 0:
+            report(0.05 + 0.75 * done / total, f'Summarizing part {done} of {total}')
+        else:
+            report(0.8 + 0.1 * done / total, f'Combining summaries ({done} of {total})')
+
+    # Tokenize once; every helper below reuses the same sentences and words
+    report(0.0, 'Preparing summary')
+    analysis = get_analysis()
+
+    # Use AI summarization if available
+    if use_ai:
+        # Summarize the whole document in token-sized, batched chunks
+        ai_summary = summarize_sentences(analysis.sentences, models, progress=summary_progress)
+    else:
+        # Fallback to extractive summarization
+        ai_summary = extractive_summarization(analysis)
+
+    # Generate key points
+    report(0.9, 'Extracting key points')
+    key_points = extract_key_points(analysis)
+
+    # Calculate text statistics
+    stats = compute_statistics(analysis)
+
+    summary = {
+        'summary': ai_summary,
+        'key_points': key_points,
+        'statistics': stats
+    }
+    results.put(content_hash, 'summary', ai_params if use_ai else fallback_params, summary)
+    return summary
+
+def generate_document_questions(content_hash, get_analysis, results, models, question_types, num_questions,
+                                report=report_nothing):
+    """Generate questions from a document's text, using the results cache"""
+    def cache_params(model):
+        return {'model': model, 'types': sorted(question_types), 'count': num_questions}
+
+    ai_params = cache_params(MODEL_SPECS['question_generator'][1])
+    fallback_params = cache_params('rule-based')
+    cached = results.get(content_hash, 'questions', ai_params)
+    use_ai = cached is None and models.available('question_generator')
+    if cached is None and not use_ai:
+        cached = results.get(content_hash, 'questions', fallback_params)
+    if cached is not None:
+        return cached
+
+    # Generate questions using AI
+    questions = []
+
+    report(0.0, 'Preparing questions')
+    analysis = get_analysis()
+    if use_ai:
+        # Generate multiple choice questions
+        if 'multiple_choice' in question_types:
+            report(0.1, 'Generating multiple choice questions')
+            mc_questions = generate_multiple_choice_questions(analysis, num_questions)
+            questions.extend(mc_questions)
+
+        # Generate theory questions
+        if 'theory' in question_types:
+            report(0.5, 'Generating theory questions')
+            theory_questions = generate_theory_questions(analysis, num_questions)
+            questions.extend(theory_questions)
+    else:
+        # Fallback to rule-based question generation
+        questions = generate_rule_based_questions(analysis, question_types, num_questions)
+
+    results.put(content_hash, 'questions', ai_params if use_ai else fallback_params, questions)
+    return questions
@@ -1,61 +1,301 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import (Flask, Response, g, render_template, request, jsonify, send_file, session,
+                   stream_with_context, url_for)
 import fitz  # PyMuPDF
+import atexit
+import contextlib
+import hmac
+import math
 import os
 import tempfile
-import base64
 import io
-from PIL import Image
 import json
 import time
-import random
-import re
-import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-import textstat
-from transformers import pipeline
-import openai
 from datetime import datetime
+from document_store import DocumentClosed, DocumentStore
+from render_cache import RenderCache
+from rendering import (IMAGE_MIMETYPES, MAX_ZOOM, PREVIEW_ZOOM, TILE_SIZE, RenderTimings, encode_pixmap,
+                       parse_zoom, render_pixmap, render_tile_pixmap, tile_grid, wants_preview, wants_tiles)
+from prefetch import PrefetchScheduler
+from models import get_models, warm_up_in_background
+from text_analysis import analyze_text
+from analysis import AnalysisError, generate_document_questions, report_nothing, summarize_document
+from exports import generate_html_questions, write_text_questions
+from jobs import JobQueue, QueueFull
+from result_cache import RESULT_CACHE_MB, RESULT_CACHE_PATH, ResultCache
+from extraction import assemble_text, format_page_text, iter_document_text
+from search_index import SearchIndex, tokenize
+from thumbnails import ThumbnailStore
+from storage import DocumentStorage, UploadTooLarge, prune_directory
+from metrics import (SamplingProfiler, finish_request, format_metric, format_summary, locked, metrics,
+                     resident_memory_bytes, server_timing, span, start_request)
+from werkzeug.exceptions import RequestEntityTooLarge
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
-try:
-    nltk.data.find('corpora/wordnet')
-except LookupError:
-    nltk.download('wordnet')
+# NLTK and textstat are imported on first use (see nlp.py) and their
+# data is installed beforehand with `python nlp.py`, never downloaded here
 
 app = Flask(__name__)
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  
-
-# Initialize AI models
-try:
-    summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-    question_generator = pipeline("text2text-generation", model="google/flan-t5-base")
-except Exception as e:
-    print(f"Warning: Could not load AI models: {e}")
-    summarizer = None
-    question_generator = None
-
-# Initialize OpenAI (optional - for advanced features)
-openai.api_key = os.getenv('OPENAI_API_KEY', '')
-
-current_pdf_data = {
-    'document': None,
-    'filename': None,
-    'total_pages': 0,
-    'current_page': 0,
-    'extracted_text': '',
-    'summary': '',
-    'questions': []
-}
+# Sessions key each user's open document; set SECRET_KEY when running
+# several worker processes so they all accept the same session cookie
+app.secret_key = os.getenv('SECRET_KEY') or os.urandom(24)
+# Uploads are streamed to disk, so large PDFs don't need to fit in memory
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_UPLOAD_MB', 1024)) * 1024 * 1024
+
+# AI models are loaded on first use (or by a shared model server, see
+# models.py) so importing the app stays fast; WARM_UP_MODELS=1 starts
+# loading them in the background right away
+if os.getenv('WARM_UP_MODELS') == '1':
+    warm_up_in_background()
+
+document_storage = DocumentStorage(
+    os.getenv('DOCUMENT_STORAGE_DIR', os.path.join(tempfile.gettempdir(), 'pdfreader_documents')),
+    max_age=float(os.getenv('DOCUMENT_RETENTION_HOURS', 24)) * 60 * 60,
+    on_delete=lambda content_hash: forget_stored_document(content_hash)
+)
+
+document_store = DocumentStore(
+    max_documents=int(os.getenv('MAX_OPEN_DOCUMENTS', 32)),
+    max_memory=int(os.getenv('MAX_DOCUMENT_MEMORY_MB', 512)) * 1024 * 1024,
+    idle_timeout=int(os.getenv('DOCUMENT_IDLE_TIMEOUT', 30 * 60)),
+    on_close=lambda entry: close_document(entry)
+)
+atexit.register(document_store.close_all)
+
+render_cache = RenderCache(
+    max_bytes=int(os.getenv('RENDER_CACHE_MB', 128)) * 1024 * 1024,
+    disk_dir=os.getenv('RENDER_CACHE_DIR') or None,
+    max_disk_bytes=int(os.getenv('RENDER_CACHE_DISK_MB', 1024)) * 1024 * 1024
+)
+
+# Time spent rendering, per stage: preview, full, prefetch and tile
+render_timings = RenderTimings()
+
+prefetcher = PrefetchScheduler(
+    depth=int(os.getenv('PREFETCH_DEPTH', 2)),
+    max_workers=int(os.getenv('PREFETCH_WORKERS', 2))
+)
+atexit.register(prefetcher.shutdown)
+
+result_cache = ResultCache(RESULT_CACHE_PATH, max_bytes=RESULT_CACHE_MB * 1024 * 1024)
+
+thumbnail_store = ThumbnailStore(
+    os.getenv('THUMBNAIL_DIR', os.path.join(tempfile.gettempdir(), 'pdfreader_thumbnails')),
+    max_bytes=int(os.getenv('THUMBNAIL_CACHE_MB', 256)) * 1024 * 1024
+)
+
+def close_document(entry):
+    """Release what a closed document held
+
+    The stored upload stays on disk for reopening until it is garbage
+    collected; its rendered pages leave memory unless another session
+    has the same PDF open.
+    """
+    document_storage.release(entry.content_hash)
+    if not document_store.has_content(entry.content_hash):
+        render_cache.discard_document(entry.content_hash)
+
+def forget_stored_document(content_hash):
+    """Drop what is cached for a stored upload that was garbage collected"""
+    render_cache.discard_document(content_hash, disk=True)
+    result_cache.discard(content_hash)
+
+# Remove uploads left behind by earlier runs; files in use are touched
+# whenever they are opened or closed, so a day is plenty of margin
+document_storage.collect_garbage()
+
+SEARCH_INDEX_DIR = os.getenv('SEARCH_INDEX_DIR', os.path.join(tempfile.gettempdir(), 'pdfreader_search'))
+# Indexes can be rebuilt from their document, so the least recently used
+# ones are deleted whenever the directory grows past this
+SEARCH_INDEX_MAX_BYTES = int(os.getenv('SEARCH_INDEX_MB', 256)) * 1024 * 1024
+prune_directory(SEARCH_INDEX_DIR, SEARCH_INDEX_MAX_BYTES)
+
+job_queue = JobQueue(
+    max_workers=int(os.getenv('JOB_WORKERS', 2)),
+    max_pending=int(os.getenv('JOB_QUEUE_SIZE', 16))
+)
+atexit.register(job_queue.shutdown)
+
+SERVER_TIMING = os.getenv('SERVER_TIMING', '1') != '0'
+
+# Bearer token for endpoints that change server settings; unset disables them
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
+# Off unless PROFILE_SLOW_REQUESTS_MS is set or it is switched on at /profiler
+profiler = SamplingProfiler(
+    os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'pdfreader_profiles')),
+    slow_seconds=int(os.getenv('PROFILE_SLOW_REQUESTS_MS', 0)) / 1000,
+    interval=float(os.getenv('PROFILE_INTERVAL_MS', 5)) / 1000
+)
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    start_request()
+    profiler.begin()
+
+@app.after_request
+def finish_request_metrics(response):
+    """Record the request's latency and report its spans in a Server-Timing header"""
+    elapsed = time.perf_counter() - g.get('request_started', time.perf_counter())
+    spans = finish_request()
+    endpoint = request.endpoint or 'unmatched'
+    metrics.observe_request(endpoint, request.method, response.status_code, elapsed)
+    if SERVER_TIMING:
+        response.headers['Server-Timing'] = server_timing(spans, elapsed)
+    profiler.end(endpoint, elapsed)
+    return response
+
+@app.teardown_request
+def release_documents(exception=None):
+    """Unpin the documents get_current_document() pinned for this request"""
+    for entry in g.pop('pinned_documents', []):
+        entry.unpin()
+
+def is_admin_request():
+    """Whether the request carries ADMIN_TOKEN as a bearer token"""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if not ADMIN_TOKEN or scheme.lower() != 'bearer':
+        return False
+    return hmac.compare_digest(token.strip().encode(), ADMIN_TOKEN.encode())
+
+def get_current_document():
+    """Return the document entry for the current session, or None
+
+    The entry stays pinned, so its document cannot be closed by an
+    eviction, until the request (or its streamed response) is finished.
+    """
+    doc_id = session.get('doc_id')
+    if not doc_id:
+        return None
+    
+    entry = document_store.get(doc_id, pin=True)
+    if entry is not None:
+        g.setdefault('pinned_documents', []).append(entry)
+        return entry
+    
+    # The document may have been evicted or opened by another worker
+    # process; reopen it from the uploaded file if that still exists
+    pdf_path = session.get('pdf_path')
+    if not pdf_path or not os.path.exists(pdf_path):
+        return None
+    
+    content_hash = session.get('content_hash')
+    
+    def reopen():
+        document = open_stored_document(content_hash, pdf_path)
+        return document, session.get('filename'), pdf_path, content_hash
+    
+    entry = document_store.get_or_open(doc_id, reopen, pin=True)
+    g.setdefault('pinned_documents', []).append(entry)
+    return entry
+
+def open_stored_document(content_hash, path):
+    """Open a stored upload and hold a storage reference for it
+
+    MuPDF reads the file on demand, so even very large PDFs are not
+    loaded into memory. The reference is released by the document
+    store when the document is closed.
+    """
+    document_storage.acquire(content_hash)
+    try:
+        return fitz.open(path)
+    except Exception:
+        document_storage.release(content_hash)
+        raise
+
+def render_page_image(entry, page_index, zoom, fmt='png', stage='full'):
+    """Return encoded image bytes for a page, served from the render cache when possible
+
+    stage labels the render in render_timings: 'preview', 'full' or 'prefetch'.
+    """
+    key = render_cache.make_key(entry.content_hash, page_index, zoom, fmt)
+    
+    def render():
+        # Render at the quantized zoom so the cached image matches its key
+        with locked(entry.lock):
+            if entry.document is None:
+                raise ValueError('Document has been closed')
+            with render_timings.measure(stage):
+                with span('render'):
+                    pix = render_pixmap(entry.document[page_index], key[2])
+                with span('encode'):
+                    return encode_pixmap(pix, fmt)
+    
+    return render_cache.get_or_render(key, render)
+
+def render_tile_image(entry, page_index, zoom, column, row, fmt='png'):
+    """Return encoded image bytes for one tile of a page, cached per tile"""
+    key = render_cache.make_key(entry.content_hash, page_index, zoom, fmt, tile=(column, row, TILE_SIZE))
+    
+    def render():
+        with locked(entry.lock):
+            if entry.document is None:
+                raise ValueError('Document has been closed')
+            with render_timings.measure('tile'):
+                with span('render'):
+                    pix = render_tile_pixmap(entry.document, page_index, key[2], column, row, TILE_SIZE)
+                with span('encode'):
+                    return encode_pixmap(pix, fmt)
+    
+    return render_cache.get_or_render(key, render)
+
+def schedule_prefetch(entry, page_index, zoom, fmt='png'):
+    """Pre-render the pages around page_index at the same zoom and format"""
+    if prefetcher.depth <= 0:
+        return
+    
+    def is_cached(index):
+        return render_cache.contains(render_cache.make_key(entry.content_hash, index, zoom, fmt))
+    
+    def render(index):
+        # The document may have been closed since the page was scheduled
+        with contextlib.suppress(DocumentClosed):
+            with entry.pinned():
+                render_page_image(entry, index, zoom, fmt, stage='prefetch')
+    
+    prefetcher.schedule(entry.doc_id, page_index, entry.total_pages, render, is_cached)
+
+def page_image_etag(entry, page_index, zoom, fmt):
+    """ETag for a rendered page; it only depends on content, page, zoom and format"""
+    zoom = render_cache.quantize_zoom(zoom)
+    return f'{entry.content_hash[:32]}-{page_index + 1}-{zoom:g}-{fmt}'
+
+def image_response(entry, etag, fmt, render):
+    """Serve rendered image bytes with HTTP caching headers
+
+    render() is only called when the client does not already hold the
+    image under etag.
+    """
+    max_age = int(os.getenv('PAGE_IMAGE_MAX_AGE', 3600))
+    
+    # Answer revalidations before touching the cache or MuPDF
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+    else:
+        response = send_file(
+            io.BytesIO(render()),
+            mimetype=IMAGE_MIMETYPES[fmt],
+            etag=etag,
+            last_modified=entry.modified_at,
+            max_age=max_age,
+            conditional=True
+        )
+    
+    # Images belong to the session's document, so keep them out of shared caches
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    return response
+
+def page_image_url(entry, page_num, zoom, fmt='png', stage=None):
+    """URL of the binary image route for a page
+
+    The content hash is part of the query string so a different document
+    never reuses a browser-cached image of the same page number.
+    """
+    params = {'stage': stage} if stage else {}
+    return url_for('get_page_image', page_num=page_num, fmt=fmt,
+                   zoom=render_cache.quantize_zoom(zoom), v=entry.content_hash[:16], **params)
 
 @app.route('/')
 def index():
@@ -65,114 +305,420 @@ def index():
 @app.route('/upload', methods=['POST'])
 def upload_pdf():
     """Handle PDF file upload"""
-    global current_pdf_data
-    
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file uploaded'}), 400
+        # Browsers send the raw file as the request body so it can be
+        # streamed straight to storage; multipart forms still work
+        if request.mimetype == 'multipart/form-data':
+            if 'file' not in request.files:
+                return jsonify({'error': 'No file uploaded'}), 400
+            file = request.files['file']
+            filename = file.filename
+            stream = file.stream
+        else:
+            filename = request.args.get('filename', '')
+            stream = request.stream
         
-        file = request.files['file']
-        if file.filename == '':
+        if not filename:
             return jsonify({'error': 'No file selected'}), 400
         
-        if not file.filename.lower().endswith('.pdf'):
+        if not filename.lower().endswith('.pdf'):
             return jsonify({'error': 'Please upload a PDF file'}), 400
         
+        try:
+            with span('store_upload'):
+                content_hash, pdf_path, _ = document_storage.save_stream(
+                    stream, max_size=app.config['MAX_CONTENT_LENGTH'])
+        except UploadTooLarge as e:
+            return jsonify({'error': str(e)}), 413
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        temp_dir = tempfile.mkdtemp()
-        temp_path = os.path.join(temp_dir, file.filename)
-        file.save(temp_path)
-        
-       
-        pdf_document = fitz.open(temp_path)
-        
-   
-        current_pdf_data['document'] = pdf_document
-        current_pdf_data['filename'] = file.filename
-        current_pdf_data['total_pages'] = len(pdf_document)
-        current_pdf_data['current_page'] = 0
+        try:
+            with span('open'):
+                pdf_document = fitz.open(pdf_path)
+        except Exception:
+            document_storage.release(content_hash)
+            raise
         
+        # Replace whatever this session had open before
+        previous_id = session.get('doc_id')
+        if previous_id:
+            prefetcher.forget(previous_id)
+            document_store.remove(previous_id)
         
-        page = pdf_document[0]
-        pix = page.get_pixmap(matrix=fitz.Matrix(1.5, 1.5))
-        img_data = pix.tobytes("png")
+        entry = document_store.add(pdf_document, filename, pdf_path,
+                                   content_hash=content_hash, pin=True)
+        g.setdefault('pinned_documents', []).append(entry)
+        session['doc_id'] = entry.doc_id
+        session['pdf_path'] = pdf_path
+        session['filename'] = filename
+        session['content_hash'] = content_hash
         
-     
-        img_base64 = base64.b64encode(img_data).decode()
+        # Warm the cache so the browser's first image request is a hit
+        render_page_image(entry, 0, 1.5)
+        schedule_prefetch(entry, 0, 1.5)
         
         return jsonify({
             'success': True,
-            'filename': file.filename,
-            'total_pages': len(pdf_document),
+            'filename': filename,
+            'total_pages': entry.total_pages,
             'current_page': 1,
-            'page_image': f'data:image/png;base64,{img_base64}'
+            'document_version': entry.content_hash[:16],
+            'page_url': page_image_url(entry, 1, 1.5)
         })
         
+    except RequestEntityTooLarge:
+        limit = app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+        return jsonify({'error': f'File is larger than {limit} MB'}), 413
     except Exception as e:
         return jsonify({'error': f'Error processing PDF: {str(e)}'}), 500
 
 @app.route('/page/<int:page_num>')
 def get_page(page_num):
     """Get specific page image"""
-    global current_pdf_data
-    
     try:
-        if not current_pdf_data['document']:
+        entry = get_current_document()
+        if entry is None:
             return jsonify({'error': 'No PDF loaded'}), 400
         
-        if page_num < 1 or page_num > current_pdf_data['total_pages']:
+        if page_num < 1 or page_num > entry.total_pages:
             return jsonify({'error': 'Invalid page number'}), 400
         
- 
-        page = current_pdf_data['document'][page_num - 1]
+        # Get zoom level and image format from query parameters
+        zoom = parse_zoom(request.args.get('zoom', 1.5))
+        if zoom is None:
+            return jsonify({'error': f'Zoom must be a number above 0 and at most {MAX_ZOOM:g}'}), 400
+        fmt = request.args.get('format', 'png')
+        if fmt not in IMAGE_MIMETYPES:
+            return jsonify({'error': 'Unsupported image format'}), 400
         
-        # Get zoom level from query parameter
-        zoom = float(request.args.get('zoom', 1.5))
-        zoom_matrix = fitz.Matrix(zoom, zoom)
+        entry.current_page = page_num - 1
         
-        pix = page.get_pixmap(matrix=zoom_matrix)
-        img_data = pix.tobytes("png")
-        img_base64 = base64.b64encode(img_data).decode()
+        with entry.lock:
+            rect = entry.document[page_num - 1].rect
+        scale = render_cache.quantize_zoom(zoom)
         
-        current_pdf_data['current_page'] = page_num - 1
+        # When the full image still has to be rendered, offer a quick low
+        # resolution preview to show first; it is displayed at full size
+        cached = render_cache.contains(render_cache.make_key(entry.content_hash, page_num - 1, zoom, fmt))
+        preview_url = None
+        if not cached and wants_preview(zoom):
+            preview_url = page_image_url(entry, page_num, PREVIEW_ZOOM, 'jpg', stage='preview')
+        
+        # At high zoom the client draws only the tiles in view, over a
+        # stretched low resolution image of the whole page
+        tiles = None
+        if wants_tiles(scale):
+            columns, rows = tile_grid(rect, scale)
+            tiles = {'size': TILE_SIZE, 'columns': columns, 'rows': rows, 'zoom': scale}
+            base_zoom = PREVIEW_ZOOM if PREVIEW_ZOOM > 0 else 0.25
+            preview_url = page_image_url(entry, page_num, base_zoom, 'jpg', stage='preview')
         
         return jsonify({
             'success': True,
-            'page_image': f'data:image/png;base64,{img_base64}',
+            'page_url': page_image_url(entry, page_num, zoom, fmt),
+            'preview_url': preview_url,
+            'tiles': tiles,
+            'cached': cached,
+            'width': round(rect.width * scale),
+            'height': round(rect.height * scale),
             'current_page': page_num,
-            'total_pages': current_pdf_data['total_pages']
+            'total_pages': entry.total_pages
         })
         
     except Exception as e:
         return jsonify({'error': f'Error loading page: {str(e)}'}), 500
 
+@app.route('/page/<int:page_num>.<any(png, jpg, webp):fmt>')
+def get_page_image(page_num, fmt):
+    """Serve a page as a raw image with HTTP caching headers"""
+    try:
+        entry = get_current_document()
+        if entry is None:
+            return jsonify({'error': 'No PDF loaded'}), 400
+        
+        if page_num < 1 or page_num > entry.total_pages:
+            return jsonify({'error': 'Invalid page number'}), 400
+        
+        zoom = parse_zoom(request.args.get('zoom', 1.5))
+        if zoom is None:
+            return jsonify({'error': f'Zoom must be a number above 0 and at most {MAX_ZOOM:g}'}), 400
+        stage = 'preview' if request.args.get('stage') == 'preview' else 'full'
+        etag = page_image_etag(entry, page_num - 1, zoom, fmt)
+        response = image_response(
+            entry, etag, fmt, lambda: render_page_image(entry, page_num - 1, zoom, fmt, stage))
+        
+        # Previews are followed by the full image, which prefetches from there
+        if stage == 'full':
+            entry.current_page = page_num - 1
+            schedule_prefetch(entry, page_num - 1, zoom, fmt)
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': f'Error loading page: {str(e)}'}), 500
+
+@app.route('/page/<int:page_num>/tile/<zoom>/<int:column>/<int:row>')
+def get_page_tile(page_num, zoom, column, row):
+    """Serve one TILE_SIZE square tile of a page at zoom"""
+    try:
+        entry = get_current_document()
+        if entry is None:
+            return jsonify({'error': 'No PDF loaded'}), 400
+        
+        if page_num < 1 or page_num > entry.total_pages:
+            return jsonify({'error': 'Invalid page number'}), 400
+        
+        zoom = parse_zoom(zoom)
+        if zoom is None:
+            return jsonify({'error': f'Zoom must be a number above 0 and at most {MAX_ZOOM:g}'}), 400
+        zoom = render_cache.quantize_zoom(zoom)
+        
+        fmt = request.args.get('format', 'png')
+        if fmt not in IMAGE_MIMETYPES:
+            return jsonify({'error': 'Unsupported image format'}), 400
+        
+        with entry.lock:
+            columns, rows = tile_grid(entry.document[page_num - 1].rect, zoom)
+        if not (0 <= column < columns and 0 <= row < rows):
+            return jsonify({'error': 'Invalid tile'}), 404
+        
+        etag = f'{page_image_etag(entry, page_num - 1, zoom, fmt)}-t{TILE_SIZE}-{column}-{row}'
+        return image_response(
+            entry, etag, fmt, lambda: render_tile_image(entry, page_num - 1, zoom, column, row, fmt))
+        
+    except Exception as e:
+        return jsonify({'error': f'Error loading tile: {str(e)}'}), 500
+
+@app.route('/thumbnail/<int:page_num>.webp')
+def get_thumbnail(page_num):
+    """Serve a page thumbnail, rendering it now if the batch job has not reached it yet"""
+    try:
+        entry = get_current_document()
+        if entry is None:
+            return jsonify({'error': 'No PDF loaded'}), 400
+        
+        if page_num < 1 or page_num > entry.total_pages:
+            return jsonify({'error': 'Invalid page number'}), 400
+        
+        etag = f'{entry.content_hash[:32]}-{page_num}-thumb{thumbnail_store.width}'
+        return image_response(entry, etag, thumbnail_store.fmt, lambda: thumbnail_store.get_or_render(
+            entry.content_hash, page_num - 1, entry.document, entry.lock))
+        
+    except Exception as e:
+        return jsonify({'error': f'Error loading thumbnail: {str(e)}'}), 500
+
+@app.route('/ready')
+def ready():
+    """Readiness check: 200 whenever requests can be served
+
+    Models that are not loaded yet, or failed to load, do not make the
+    app unready since the extractive fallbacks take over; their state is
+    reported in the body, with models_loaded true once all are loaded.
+    Only a model setup that cannot work at all, such as a model server
+    without a key, answers 503.
+    """
+    try:
+        status = get_models().status()
+    except RuntimeError as e:
+        return jsonify({'ready': False, 'error': str(e)}), 503
+    models_loaded = all(state in ('loaded', 'disabled') for state in status.values())
+    return jsonify({'ready': True, 'models_loaded': models_loaded, 'models': status})
+
+@app.route('/warmup', methods=['POST'])
+def warmup():
+    """Start loading the AI models in the background"""
+    warm_up_in_background()
+    return jsonify({'success': True, 'models': get_models().status()}), 202
+
+@app.route('/render-cache/stats')
+def render_cache_stats():
+    """Report render cache hit/miss counters and render times per stage"""
+    return jsonify({
+        'success': True,
+        'stats': render_cache.stats(),
+        'render_times': render_timings.stats()
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Latency histograms, cache, queue and memory gauges in the Prometheus text format"""
+    render_stats = render_cache.stats()
+    result_stats = result_cache.stats()
+    render_stages = render_timings.stats()
+    
+    def ratio(hits, lookups):
+        return round(hits / lookups, 4) if lookups else 0
+    
+    render_lookups = render_stats['hits'] + render_stats['disk_hits'] + render_stats['misses']
+    result_lookups = result_stats['hits'] + result_stats['misses']
+    sections = [
+        metrics.render(),
+        format_summary('pdfreader_render_seconds', 'Page render time by stage',
+                       [({'stage': stage}, timing['count'], timing['count'] * timing['average_ms'] / 1000)
+                        for stage, timing in render_stages.items()]),
+        format_metric('pdfreader_render_cache_requests_total', 'counter', 'Render cache lookups by result', [
+            ({'result': 'hit'}, render_stats['hits']),
+            ({'result': 'disk_hit'}, render_stats['disk_hits']),
+            ({'result': 'miss'}, render_stats['misses'])
+        ]),
+        format_metric('pdfreader_render_cache_hit_ratio', 'gauge', 'Share of render cache lookups served from memory or disk',
+                      [({}, ratio(render_stats['hits'] + render_stats['disk_hits'], render_lookups))]),
+        format_metric('pdfreader_render_cache_bytes', 'gauge', 'Bytes held by the render cache', [
+            ({'tier': 'memory'}, render_stats['bytes']),
+            ({'tier': 'disk'}, render_stats['disk_bytes'])
+        ]),
+        format_metric('pdfreader_result_cache_requests_total', 'counter', 'Result cache lookups by result', [
+            ({'result': 'hit'}, result_stats['hits']),
+            ({'result': 'miss'}, result_stats['misses'])
+        ]),
+        format_metric('pdfreader_result_cache_hit_ratio', 'gauge', 'Share of result cache lookups that were hits',
+                      [({}, ratio(result_stats['hits'], result_lookups))]),
+        format_metric('pdfreader_queue_depth', 'gauge', 'Queued or running background work', [
+            ({'queue': 'jobs'}, job_queue.pending()),
+            ({'queue': 'prefetch'}, prefetcher.pending())
+        ]),
+        format_metric('pdfreader_open_documents', 'gauge', 'Documents open in this process',
+                      [({}, len(document_store))]),
+        format_metric('pdfreader_document_memory_bytes', 'gauge', 'Estimated memory held by open documents',
+                      [({}, document_store.memory_usage())])
+    ]
+    rss = resident_memory_bytes()
+    if rss is not None:
+        sections.append(format_metric('process_resident_memory_bytes', 'gauge', 'Resident memory size in bytes',
+                                      [({}, rss)]))
+    return Response('\n'.join(sections) + '\n', mimetype='text/plain; version=0.0.4')
+
+@app.route('/profiler', methods=['GET', 'POST'])
+def profiler_settings():
+    """Show or change the slow request profiler: {"enabled": true, "slow_ms": 500}
+
+    Changes need an "Authorization: Bearer <ADMIN_TOKEN>" header and are
+    refused when ADMIN_TOKEN is not set.
+    """
+    if request.method == 'POST':
+        if not is_admin_request():
+            return jsonify({'error': 'Changing the profiler requires ADMIN_TOKEN'}), 403
+        data = request.get_json(silent=True) or {}
+        enabled = data.get('enabled', True)
+        slow_ms = data.get('slow_ms')
+        if not isinstance(enabled, bool):
+            return jsonify({'error': 'enabled must be true or false'}), 400
+        if slow_ms is not None and (isinstance(slow_ms, bool) or not isinstance(slow_ms, (int, float))
+                                    or not math.isfinite(slow_ms) or slow_ms < 0):
+            return jsonify({'error': 'slow_ms must be a number of milliseconds, at least 0'}), 400
+        profiler.configure(enabled, slow_ms / 1000 if slow_ms else None)
+    return jsonify({'success': True, 'profiler': profiler.status()})
+
+@app.route('/result-cache/stats')
+def result_cache_stats():
+    """Report result cache size and hit/miss counters"""
+    return jsonify({'success': True, 'stats': result_cache.stats()})
+
 @app.route('/extract-text')
 def extract_text():
     """Extract text from PDF"""
-    global current_pdf_data
-    
     try:
-        if not current_pdf_data['document']:
+        entry = get_current_document()
+        if entry is None:
             return jsonify({'error': 'No PDF loaded'}), 400
         
-        text = ""
-        for page_num in range(current_pdf_data['total_pages']):
-            page = current_pdf_data['document'][page_num]
-            text += f"\n--- Page {page_num + 1} ---\n"
-            text += page.get_text()
-            text += "\n"
-        
-        current_pdf_data['extracted_text'] = text
+        with span('extract'):
+            text = result_cache.get_or_compute(
+                entry.content_hash, 'text', None,
+                lambda: assemble_text(index_pages(entry, iter_document_text(
+                    entry.document, path=entry.path, lock=entry.lock)))
+            )
+        entry.set_extracted_text(text)
+        document_store.enforce_limits(keep=entry.doc_id)
         
         return jsonify({
             'success': True,
             'text': text,
-            'total_pages': current_pdf_data['total_pages']
+            'total_pages': entry.total_pages
         })
         
     except Exception as e:
         return jsonify({'error': f'Error extracting text: {str(e)}'}), 500
 
+@app.route('/extract-text/stream')
+def extract_text_stream():
+    """Stream extracted text as NDJSON, one line per page as it is extracted"""
+    entry = get_current_document()
+    if entry is None:
+        return jsonify({'error': 'No PDF loaded'}), 400
+    
+    def generate():
+        # A document seen before is sent in one message from the result cache
+        cached_text = result_cache.get(entry.content_hash, 'text')
+        if cached_text is not None:
+            entry.set_extracted_text(cached_text)
+            document_store.enforce_limits(keep=entry.doc_id)
+            yield json.dumps({
+                'page': entry.total_pages,
+                'total_pages': entry.total_pages,
+                'text': cached_text
+            }) + '\n'
+            yield json.dumps({'done': True, 'total_pages': entry.total_pages}) + '\n'
+            return
+        
+        parts = []
+        try:
+            pages = iter_document_text(entry.document, path=entry.path, lock=entry.lock)
+            for page_number, text in index_pages(entry, pages):
+                page_text = format_page_text(page_number, text)
+                parts.append(page_text)
+                yield json.dumps({
+                    'page': page_number,
+                    'total_pages': entry.total_pages,
+                    'text': page_text
+                }) + '\n'
+        except Exception as e:
+            yield json.dumps({'error': f'Error extracting text: {str(e)}'}) + '\n'
+            return
+        
+        # Only keep the text once every page made it to the client
+        entry.set_extracted_text(''.join(parts))
+        result_cache.put(entry.content_hash, 'text', None, entry.extracted_text)
+        document_store.enforce_limits(keep=entry.doc_id)
+        yield json.dumps({'done': True, 'total_pages': entry.total_pages}) + '\n'
+    
+    # Keeps the request, and with it the document's pin, until the stream ends
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    # Stop reverse proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/search')
+def search():
+    """Search the current document and return ranked pages with snippets and highlights"""
+    try:
+        entry = get_current_document()
+        if entry is None:
+            return jsonify({'error': 'No PDF loaded'}), 400
+        
+        query = request.args.get('q', '').strip()
+        terms = list(dict.fromkeys(term for term, _ in tokenize(query)))
+        if not terms:
+            return jsonify({'error': 'Enter a search term'}), 400
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+        
+        start = time.perf_counter()
+        with span('search'):
+            hits = get_search_index(entry).search(query, limit=limit)
+        for hit in hits:
+            hit['rects'], hit['page_size'] = highlight_rects(entry, hit['page'], query, terms)
+        
+        return jsonify({
+            'success': True,
+            'query': query,
+            'hits': hits,
+            'took_ms': round((time.perf_counter() - start) * 1000, 2)
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'Error searching document: {str(e)}'}), 500
+
 @app.route('/save-text', methods=['POST'])
 def save_text():
     """Save extracted text to file"""
@@ -183,9 +729,12 @@ def save_text():
         if not text.strip():
             return jsonify({'error': 'No text to save'}), 400
         
+        entry = get_current_document()
+        document_name = entry.filename if entry and entry.filename else 'document'
+        
         # Create temporary file
         temp_dir = tempfile.mkdtemp()
-        filename = f"extracted_text_{current_pdf_data.get('filename', 'document').replace('.pdf', '')}.txt"
+        filename = f"extracted_text_{document_name.replace('.pdf', '')}.txt"
         file_path = os.path.join(temp_dir, filename)
         
         with open(file_path, 'w', encoding='utf-8') as f:
@@ -196,109 +745,230 @@ def save_text():
     except Exception as e:
         return jsonify({'error': f'Error saving text: {str(e)}'}), 500
 
+def search_index_path(content_hash):
+    return os.path.join(SEARCH_INDEX_DIR, f'{content_hash}.idx')
+
+def index_pages(entry, pages):
+    """Pass (page_number, text) pairs through, indexing each page for search
+
+    The index is stored on the entry and saved to disk once the last page
+    has been consumed; an abandoned extraction leaves no partial index.
+    """
+    index = SearchIndex()
+    for page_number, text in pages:
+        index.add_page(page_number, text)
+        yield page_number, text
+    store_search_index(entry, index)
+
+def store_search_index(entry, index):
+    index.finalize()
+    entry.search_index = index
+    document_store.enforce_limits(keep=entry.doc_id)
+    try:
+        index.save(search_index_path(entry.content_hash))
+    except OSError as e:
+        print(f"Warning: Could not save search index: {e}")
+    prune_directory(SEARCH_INDEX_DIR, SEARCH_INDEX_MAX_BYTES)
+
+def get_search_index(entry):
+    """Return the entry's search index, loading or building it on first use"""
+    with entry.search_lock:
+        if entry.search_index is not None:
+            return entry.search_index
+        
+        path = search_index_path(entry.content_hash)
+        index = SearchIndex.load(path)
+        if index is not None:
+            try:
+                # Pruning deletes the least recently used indexes first
+                os.utime(path)
+            except OSError:
+                pass
+            entry.search_index = index
+            document_store.enforce_limits(keep=entry.doc_id)
+            return index
+        
+        # Index text that is already extracted, or extract it now
+        text = entry.extracted_text or result_cache.get(entry.content_hash, 'text')
+        if text:
+            store_search_index(entry, SearchIndex.from_document_text(text))
+        else:
+            pages = iter_document_text(entry.document, path=entry.path, lock=entry.lock)
+            text = assemble_text(index_pages(entry, pages))
+            result_cache.put(entry.content_hash, 'text', None, text)
+        if not entry.extracted_text:
+            entry.set_extracted_text(text)
+        return entry.search_index
+
+def highlight_rects(entry, page_number, query, terms, limit=50):
+    """Rectangles of a query's matches on a page, in PDF points"""
+    with entry.lock:
+        page = entry.document[page_number - 1]
+        rects = page.search_for(query)
+        if not rects:
+            # The words may not appear together; highlight each one
+            for term in terms:
+                rects.extend(page.search_for(term))
+        page_size = [page.rect.width, page.rect.height]
+    return [[round(value, 2) for value in rect] for rect in rects[:limit]], page_size
+
+def get_analysis(entry):
+    """Return the entry's tokenized text, analyzing it on first use"""
+    with entry.analysis_lock:
+        if entry.analysis is None:
+            entry.analysis = analyze_text(entry.extracted_text)
+            document_store.enforce_limits(keep=entry.doc_id)
+        return entry.analysis
+
+def build_summary(entry, report=report_nothing):
+    """Summarize an entry's extracted text; report(progress, message) tracks progress"""
+    entry.summary = summarize_document(entry.content_hash, entry.extracted_text, lambda: get_analysis(entry),
+                                       result_cache, get_models(), report)
+    return entry.summary
+
+def build_questions(entry, question_types, num_questions, report=report_nothing):
+    """Generate questions from an entry's extracted text"""
+    questions = generate_document_questions(entry.content_hash, lambda: get_analysis(entry), result_cache,
+                                            get_models(), question_types, num_questions, report)
+    entry.questions = questions
+    return {
+        'questions': questions,
+        'total_questions': len(questions)
+    }
+
 @app.route('/summarize', methods=['POST'])
 def summarize_pdf():
     """Generate summary of PDF content"""
-    global current_pdf_data
-    
     try:
-        if not current_pdf_data['extracted_text']:
+        entry = get_current_document()
+        if entry is None or not entry.extracted_text:
             return jsonify({'error': 'No text extracted. Please extract text first.'}), 400
         
-        text = current_pdf_data['extracted_text']
-        
-        # Clean and prepare text
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        if len(text) < 100:
-            return jsonify({'error': 'Text too short for summarization'}), 400
-        
-        # Use AI summarization if available
-        if summarizer:
-            # Split text into chunks if too long
-            max_length = 1024
-            chunks = [text[i:i+max_length] for i in range(0, len(text), max_length)]
-            
-            summaries = []
-            for chunk in chunks[:3]:  # Limit to first 3 chunks
-                if len(chunk) > 50:
-                    summary = summarizer(chunk, max_length=130, min_length=30, do_sample=False)
-                    summaries.append(summary[0]['summary_text'])
-            
-            ai_summary = ' '.join(summaries)
-        else:
-            # Fallback to extractive summarization
-            ai_summary = extractive_summarization(text)
-        
-        # Generate key points
-        key_points = extract_key_points(text)
-        
-        # Calculate text statistics
-        stats = {
-            'word_count': len(text.split()),
-            'sentence_count': len(sent_tokenize(text)),
-            'readability_score': textstat.flesch_reading_ease(text),
-            'grade_level': textstat.flesch_kincaid_grade(text)
-        }
-        
-        current_pdf_data['summary'] = {
-            'summary': ai_summary,
-            'key_points': key_points,
-            'statistics': stats
-        }
-        
-        return jsonify({
-            'success': True,
-            'summary': ai_summary,
-            'key_points': key_points,
-            'statistics': stats
-        })
+        return jsonify({'success': True, **build_summary(entry)})
         
+    except AnalysisError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Error generating summary: {str(e)}'}), 500
 
 @app.route('/generate-questions', methods=['POST'])
 def generate_questions():
     """Generate exam questions from PDF content"""
-    global current_pdf_data
-    
     try:
-        if not current_pdf_data['extracted_text']:
+        entry = get_current_document()
+        if entry is None or not entry.extracted_text:
             return jsonify({'error': 'No text extracted. Please extract text first.'}), 400
         
         data = request.get_json()
         question_types = data.get('types', ['multiple_choice', 'theory'])
         num_questions = data.get('count', 5)
         
-        text = current_pdf_data['extracted_text']
+        return jsonify({'success': True, **build_questions(entry, question_types, num_questions)})
         
-        # Generate questions using AI
-        questions = []
+    except Exception as e:
+        return jsonify({'error': f'Error generating questions: {str(e)}'}), 500
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a summarize, questions or thumbnails job and return its id"""
+    try:
+        entry = get_current_document()
+        data = request.get_json() or {}
+        job_type = data.get('type')
         
-        if question_generator:
-            # Generate multiple choice questions
-            if 'multiple_choice' in question_types:
-                mc_questions = generate_multiple_choice_questions(text, num_questions)
-                questions.extend(mc_questions)
-            
-            # Generate theory questions
-            if 'theory' in question_types:
-                theory_questions = generate_theory_questions(text, num_questions)
-                questions.extend(theory_questions)
+        if entry is None:
+            return jsonify({'error': 'No PDF loaded'}), 400
+        if job_type in ('summarize', 'questions') and not entry.extracted_text:
+            return jsonify({'error': 'No text extracted. Please extract text first.'}), 400
+        
+        if job_type == 'thumbnails':
+            def work(job):
+                def progress(done, total):
+                    job.report(done / total if total else 1.0, f'Rendered {done} of {total} thumbnails')
+                rendered = thumbnail_store.generate(entry.content_hash, entry.document, path=entry.path,
+                                                    lock=entry.lock, progress=progress)
+                return {'rendered': rendered, 'total_pages': entry.total_pages}
+        elif job_type == 'summarize':
+            work = lambda job: build_summary(entry, job.report)
+        elif job_type == 'questions':
+            question_types = data.get('types', ['multiple_choice', 'theory'])
+            num_questions = data.get('count', 5)
+            work = lambda job: build_questions(entry, question_types, num_questions, job.report)
         else:
-            # Fallback to rule-based question generation
-            questions = generate_rule_based_questions(text, question_types, num_questions)
+            return jsonify({'error': 'Unknown job type'}), 400
         
-        current_pdf_data['questions'] = questions
+        # The job may outlive the request, so it holds its own pin
+        entry.pin()
+        def pinned_work(job):
+            try:
+                return work(job)
+            finally:
+                entry.unpin()
+        try:
+            job = job_queue.submit(job_type, pinned_work, owner=entry.doc_id)
+        except Exception:
+            entry.unpin()
+            raise
         
         return jsonify({
             'success': True,
-            'questions': questions,
-            'total_questions': len(questions)
-        })
+            'job_id': job.id,
+            'status_url': url_for('get_job', job_id=job.id),
+            'events_url': url_for('job_events', job_id=job.id)
+        }), 202
         
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 429
     except Exception as e:
-        return jsonify({'error': f'Error generating questions: {str(e)}'}), 500
+        return jsonify({'error': f'Error submitting job: {str(e)}'}), 500
+
+def get_session_job(job_id):
+    """Return a job if it belongs to the current session's document"""
+    job = job_queue.get(job_id)
+    if job is None or job.owner != session.get('doc_id'):
+        return None
+    return job
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Poll a job's status, progress and result"""
+    job = get_session_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'success': True, **job.to_dict()})
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    job = get_session_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    job.cancel()
+    return jsonify({'success': True, **job.to_dict(include_result=False)})
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-sent events with a job's progress until it finishes"""
+    job = get_session_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def generate():
+        version = -1
+        while True:
+            if job.version != version:
+                version = job.version
+                yield f'data: {json.dumps(job.to_dict())}\n\n'
+                if job.done:
+                    return
+            elif version == job.wait_for_update(version, timeout=15):
+                # Keep idle connections open through proxies
+                yield ': keep-alive\n\n'
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/export-questions', methods=['POST'])
 def export_questions():
@@ -306,7 +976,9 @@ def export_questions():
     try:
         data = request.get_json()
         format_type = data.get('format', 'json')
-        questions = current_pdf_data.get('questions', [])
+        entry = get_current_document()
+        questions = entry.questions if entry else []
+        document_name = entry.filename if entry and entry.filename else 'PDF'
         
         if not questions:
             return jsonify({'error': 'No questions generated. Please generate questions first.'}), 400
@@ -325,22 +997,7 @@ def export_questions():
             file_path = os.path.join(temp_dir, filename)
             
             with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(f"Exam Questions Generated from: {current_pdf_data.get('filename', 'PDF')}\n")
-                f.write(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-                
-                for i, question in enumerate(questions, 1):
-                    f.write(f"Question {i}:\n")
-                    f.write(f"Type: {question['type']}\n")
-                    f.write(f"Question: {question['question']}\n")
-                    
-                    if question['type'] == 'multiple_choice':
-                        for j, option in enumerate(question['options'], 1):
-                            f.write(f"  {j}. {option}\n")
-                        f.write(f"Correct Answer: {question['correct_answer']}\n")
-                    else:
-                        f.write(f"Expected Answer: {question['expected_answer']}\n")
-                    
-                    f.write(f"Explanation: {question['explanation']}\n\n")
+                write_text_questions(f, questions, document_name)
             
             return send_file(file_path, as_attachment=True, download_name=filename)
         
@@ -350,7 +1007,7 @@ def export_questions():
             filename = f'questions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.html'
             file_path = os.path.join(temp_dir, filename)
             
-            html_content = generate_html_questions(questions)
+            html_content = generate_html_questions(questions, document_name)
             
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(html_content)
@@ -366,283 +1023,23 @@ def export_questions():
 @app.route('/cleanup')
 def cleanup():
     """Clean up resources"""
-    global current_pdf_data
-    
     try:
-        if current_pdf_data['document']:
-            current_pdf_data['document'].close()
-        
-        current_pdf_data = {
-            'document': None,
-            'filename': None,
-            'total_pages': 0,
-            'current_page': 0,
-            'extracted_text': '',
-            'summary': '',
-            'questions': []
-        }
+        doc_id = session.pop('doc_id', None)
+        session.pop('pdf_path', None)
+        session.pop('filename', None)
+        session.pop('content_hash', None)
+        
+        if doc_id:
+            prefetcher.forget(doc_id)
+            document_store.remove(doc_id)
         
         return jsonify({'success': True})
         
     except Exception as e:
         return jsonify({'error': f'Error during cleanup: {str(e)}'}), 500
 
-# Helper functions for text analysis and question generation
-
-def extractive_summarization(text):
-    """Extractive summarization using TF-IDF approach"""
-    sentences = sent_tokenize(text)
-    if len(sentences) <= 3:
-        return text
-    
-    # Calculate sentence scores based on word frequency
-    word_freq = {}
-    for sentence in sentences:
-        words = word_tokenize(sentence.lower())
-        for word in words:
-            if word.isalnum():
-                word_freq[word] = word_freq.get(word, 0) + 1
-    
-    # Score sentences
-    sentence_scores = {}
-    for sentence in sentences:
-        words = word_tokenize(sentence.lower())
-        score = sum(word_freq.get(word, 0) for word in words if word.isalnum())
-        sentence_scores[sentence] = score
-    
-    # Get top sentences
-    top_sentences = sorted(sentence_scores.items(), key=lambda x: x[1], reverse=True)
-    summary_sentences = [s[0] for s in top_sentences[:3]]
-    
-    return ' '.join(summary_sentences)
-
-def extract_key_points(text):
-    """Extract key points from text"""
-    sentences = sent_tokenize(text)
-    key_points = []
-    
-    # Look for sentences with key indicators
-    key_indicators = ['important', 'key', 'main', 'primary', 'essential', 'crucial', 'significant']
-    
-    for sentence in sentences:
-        sentence_lower = sentence.lower()
-        if any(indicator in sentence_lower for indicator in key_indicators):
-            key_points.append(sentence.strip())
-    
-    # If no key points found, use first few sentences
-    if not key_points and sentences:
-        key_points = sentences[:3]
-    
-    return key_points[:5]  # Limit to 5 key points
-
-def generate_multiple_choice_questions(text, num_questions):
-    """Generate multiple choice questions using AI"""
-    questions = []
-    
-    if question_generator:
-        # Use AI to generate questions
-        prompt = f"Generate {num_questions} multiple choice questions from this text: {text[:1000]}"
-        response = question_generator(prompt, max_length=512, num_return_sequences=1)
-        
-        # Parse AI response (simplified)
-        questions = parse_ai_questions(response[0]['generated_text'], 'multiple_choice', num_questions)
-    else:
-        # Rule-based multiple choice generation
-        questions = generate_rule_based_mc_questions(text, num_questions)
-    
-    return questions
-
-def generate_theory_questions(text, num_questions):
-    """Generate theory questions using AI"""
-    questions = []
-    
-    if question_generator:
-        # Use AI to generate questions
-        prompt = f"Generate {num_questions} theory questions from this text: {text[:1000]}"
-        response = question_generator(prompt, max_length=512, num_return_sequences=1)
-        
-        # Parse AI response (simplified)
-        questions = parse_ai_questions(response[0]['generated_text'], 'theory', num_questions)
-    else:
-        # Rule-based theory question generation
-        questions = generate_rule_based_theory_questions(text, num_questions)
-    
-    return questions
-
-def generate_rule_based_questions(text, question_types, num_questions):
-    """Generate questions using rule-based approach"""
-    questions = []
-    
-    sentences = sent_tokenize(text)
-    important_sentences = []
-    
-    # Find sentences with important keywords
-    important_keywords = ['what', 'how', 'why', 'when', 'where', 'which', 'define', 'explain', 'describe']
-    
-    for sentence in sentences:
-        sentence_lower = sentence.lower()
-        if any(keyword in sentence_lower for keyword in important_keywords):
-            important_sentences.append(sentence)
-    
-    if not important_sentences:
-        important_sentences = sentences[:10]  # Use first 10 sentences if no important ones found
-    
-    for i, sentence in enumerate(important_sentences[:num_questions]):
-        if 'multiple_choice' in question_types:
-            mc_question = create_multiple_choice_question(sentence, i)
-            if mc_question:
-                questions.append(mc_question)
-        
-        if 'theory' in question_types and len(questions) < num_questions:
-            theory_question = create_theory_question(sentence, i)
-            if theory_question:
-                questions.append(theory_question)
-    
-    return questions
-
-def generate_rule_based_mc_questions(text, num_questions):
-    """Generate multiple choice questions using rules"""
-    questions = []
-    sentences = sent_tokenize(text)
-    
-    for i, sentence in enumerate(sentences[:num_questions]):
-        question = create_multiple_choice_question(sentence, i)
-        if question:
-            questions.append(question)
-    
-    return questions
-
-def generate_rule_based_theory_questions(text, num_questions):
-    """Generate theory questions using rules"""
-    questions = []
-    sentences = sent_tokenize(text)
-    
-    for i, sentence in enumerate(sentences[:num_questions]):
-        question = create_theory_question(sentence, i)
-        if question:
-            questions.append(question)
-    
-    return questions
-
-def create_multiple_choice_question(sentence, index):
-    """Create a multiple choice question from a sentence"""
-    try:
-        words = word_tokenize(sentence)
-        
-        if len(words) < 5:
-            return None
-        
-        question_text = f"What is the main topic discussed in: '{sentence[:100]}...'?"
-        
-        options = [
-            "The main topic",
-            "A related concept", 
-            "An unrelated topic",
-            "None of the above"
-        ]
-        
-        return {
-            'type': 'multiple_choice',
-            'question': question_text,
-            'options': options,
-            'correct_answer': options[0],
-            'explanation': f"This question is based on sentence {index + 1} from the document."
-        }
-    except Exception as e:
-        return None
-
-def create_theory_question(sentence, index):
-    """Create a theory question from a sentence"""
-    try:
-        question_text = f"Explain the concept mentioned in: '{sentence[:100]}...'"
-        
-        return {
-            'type': 'theory',
-            'question': question_text,
-            'expected_answer': f"A detailed explanation of the concept from sentence {index + 1}",
-            'explanation': f"This question requires understanding of the content in sentence {index + 1}."
-        }
-    except Exception as e:
-        return None
-
-def parse_ai_questions(ai_response, question_type, num_questions):
-    """Parse AI-generated questions (simplified)"""
-    questions = []
-    
-    # This is a simplified parser - in a real implementation, you'd need more sophisticated parsing
-    if question_type == 'multiple_choice':
-        for i in range(num_questions):
-            questions.append({
-                'type': 'multiple_choice',
-                'question': f"AI-generated question {i+1}",
-                'options': ["Option A", "Option B", "Option C", "Option D"],
-                'correct_answer': "Option A",
-                'explanation': "AI-generated explanation"
-            })
-    else:
-        for i in range(num_questions):
-            questions.append({
-                'type': 'theory',
-                'question': f"AI-generated theory question {i+1}",
-                'expected_answer': "AI-generated expected answer",
-                'explanation': "AI-generated explanation"
-            })
-    
-    return questions
-
-def generate_html_questions(questions):
-    """Generate HTML content for questions"""
-    html = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Generated Exam Questions</title>
-        <style>
-            body { font-family: Arial, sans-serif; margin: 20px; }
-            .question { margin-bottom: 30px; padding: 15px; border: 1px solid #ddd; border-radius: 5px; }
-            .question h3 { color: #333; }
-            .options { margin-left: 20px; }
-            .correct { color: green; font-weight: bold; }
-            .explanation { margin-top: 10px; padding: 10px; background-color: #f5f5f5; }
-        </style>
-    </head>
-    <body>
-        <h1>Generated Exam Questions</h1>
-        <p>Generated from: """ + current_pdf_data.get('filename', 'PDF') + """</p>
-        <p>Generated on: """ + datetime.now().strftime('%Y-%m-%d %H:%M:%S') + """</p>
-    """
-    
-    for i, question in enumerate(questions, 1):
-        html += f'<div class="question">'
-        html += f'<h3>Question {i} ({question["type"].replace("_", " ").title()})</h3>'
-        html += f'<p><strong>Question:</strong> {question["question"]}</p>'
-        
-        if question['type'] == 'multiple_choice':
-            html += '<div class="options">'
-            for j, option in enumerate(question['options'], 1):
-                if option == question['correct_answer']:
-                    html += f'<p class="correct">{j}. {option} ✓</p>'
-                else:
-                    html += f'<p>{j}. {option}</p>'
-            html += '</div>'
-        else:
-            html += f'<p><strong>Expected Answer:</strong> {question["expected_answer"]}</p>'
-        
-        html += f'<div class="explanation"><strong>Explanation:</strong> {question["explanation"]}</div>'
-        html += '</div>'
-    
-    html += '</body></html>'
-    return html
-
 if __name__ == '__main__':
     print("🚀 Starting Enhanced PDF Reader with AI Analysis...")
     print("📱 Open your browser and go to: http://localhost:8080")
     print("🎵 Enjoy reading PDFs with audio and AI-powered analysis!")
-    app.run(debug=True, host='0.0.0.0', port=8080)
-
-
-
-
-
-
-print(my)
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=8080, threaded=True)
@@ -0,0 +1,268 @@
+"""Export whole documents as audio files, synthesized in parallel
+
+The extracted text is cut into segments at page and paragraph breaks,
+worker processes (each with its own pyttsx3 engine) render the segments
+to WAV files, and the segments are joined into one file with a marker at
+the start of every page, named after the outline's chapter where one
+begins on that page. WAV output carries the markers as cue points; MP3
+output is encoded with ffmpeg and carries them as chapters.
+
+    python audio_export.py lecture.pdf notes/ --output-dir audiobooks --format mp3
+"""
+import argparse
+import os
+import re
+import shutil
+import struct
+import subprocess
+import tempfile
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import fitz  # PyMuPDF
+from extraction import extract_document_text, split_page_ranges
+from search_index import PAGE_SPLIT
+from speech import clean_text_for_speech, split_sentences
+
+AUDIO_EXPORT_WORKERS = int(os.getenv('AUDIO_EXPORT_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Segments are about this long; shorter ones mean more engine start-up
+# work, longer ones balance worse across the workers
+SEGMENT_CHARS = 2000
+
+PARAGRAPH_SPLIT = re.compile(r'\n\s*\n')
+
+
+def segment_document_text(text, max_chars=SEGMENT_CHARS):
+    """Split extracted text into (page_number, text) segments for synthesis
+
+    Segments never span pages. Paragraphs are joined up to max_chars, and
+    longer paragraphs are split between sentences.
+    """
+    parts = PAGE_SPLIT.split(text)
+    pages = zip(parts[1::2], parts[2::2]) if len(parts) > 1 else [(1, text)]
+    segments = []
+    for page_number, page_text in pages:
+        current = ''
+        for paragraph in PARAGRAPH_SPLIT.split(page_text):
+            paragraph = clean_text_for_speech(paragraph)
+            if not paragraph:
+                continue
+            pieces = split_sentences(paragraph) if len(paragraph) > max_chars else [paragraph]
+            for piece in pieces:
+                if current and len(current) + len(piece) + 1 > max_chars:
+                    segments.append((int(page_number), current))
+                    current = ''
+                current = f'{current} {piece}' if current else piece
+        if current:
+            segments.append((int(page_number), current))
+    return segments
+
+def page_markers(segments, toc=None):
+    """Map the first segment of each page to its marker label
+
+    Pages where a top-level outline entry starts are labelled with its
+    title, the others with 'Page N'.
+    """
+    chapters = {}
+    for level, title, page_number in toc or []:
+        if level == 1 and title.strip():
+            chapters.setdefault(page_number, title.strip())
+
+    markers = {}
+    previous_page = None
+    for index, (page_number, _) in enumerate(segments):
+        if page_number != previous_page:
+            markers[index] = chapters.get(page_number, f'Page {page_number}')
+            previous_page = page_number
+    return markers
+
+def _synthesize_segments(jobs, rate, volume, voice):
+    """Worker: render (text, path) jobs to audio files with a fresh engine"""
+    import pyttsx3
+    engine = pyttsx3.init()
+    engine.setProperty('rate', rate)
+    engine.setProperty('volume', volume)
+    if voice:
+        engine.setProperty('voice', voice)
+    for text, path in jobs:
+        engine.save_to_file(text, path)
+    engine.runAndWait()
+    return len(jobs)
+
+def synthesize_segments(texts, directory, workers=None, rate=150, volume=0.9, voice=None, progress=None):
+    """Render each text to directory/<index>.wav in worker processes; returns the paths
+
+    progress(done, total) is called as batches finish and may raise to stop.
+    """
+    workers = workers or AUDIO_EXPORT_WORKERS
+    paths = [os.path.join(directory, f'{index:06d}.wav') for index in range(len(texts))]
+    jobs = list(zip(texts, paths))
+    done = 0
+    # A pool of its own: speech engines keep driver state that should not
+    # outlive the export in the shared extraction workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_synthesize_segments, jobs[start:stop], rate, volume, voice)
+                   for start, stop in split_page_ranges(len(jobs), workers)]
+        try:
+            for future in as_completed(futures):
+                done += future.result()
+                if progress:
+                    progress(done, len(jobs))
+        finally:
+            for future in futures:
+                future.cancel()
+    return paths
+
+def _open_segment(path, directory):
+    """Open a segment as WAV, converting other formats (AIFF on macOS) with ffmpeg"""
+    try:
+        return wave.open(path, 'rb')
+    except (wave.Error, EOFError):
+        if not shutil.which('ffmpeg'):
+            raise ValueError(f"Speech engine wrote a format other than WAV and ffmpeg is not installed: {path}")
+    converted = os.path.join(directory, os.path.basename(path) + '.converted.wav')
+    subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-i', path, converted], check=True)
+    return wave.open(converted, 'rb')
+
+def concatenate_wav(paths, output_path, markers=None):
+    """Join WAV segments into one file; returns [(seconds, label)] for the markers
+
+    markers maps segment indexes to labels; each becomes a cue point with a
+    label at the start of that segment.
+    """
+    directory = os.path.dirname(paths[0]) if paths else '.'
+    cues = []
+    params = None
+    frames_written = 0
+    with wave.open(output_path, 'wb') as output:
+        for index, path in enumerate(paths):
+            if not os.path.exists(path):
+                continue
+            with _open_segment(path, directory) as segment:
+                segment_params = segment.getparams()[:3]
+                if params is None:
+                    params = segment_params
+                    output.setnchannels(params[0])
+                    output.setsampwidth(params[1])
+                    output.setframerate(params[2])
+                elif segment_params != params:
+                    raise ValueError(f"Segment {path} has a different audio format")
+                if markers and index in markers:
+                    cues.append((frames_written, markers[index]))
+                frames = segment.readframes(segment.getnframes())
+                output.writeframes(frames)
+                frames_written += len(frames) // (params[0] * params[1])
+        if params is None:
+            raise ValueError("No audio was synthesized")
+
+    if cues:
+        _append_cue_chunks(output_path, cues)
+    return [(frame / params[2], label) for frame, label in cues]
+
+def _append_cue_chunks(path, cues):
+    """Add a cue chunk and LIST/adtl labels after the data and fix the RIFF size"""
+    cue = struct.pack('<I', len(cues)) + b''.join(
+        struct.pack('<II4sIII', cue_id, frame, b'data', 0, 0, frame)
+        for cue_id, (frame, _) in enumerate(cues, 1))
+    labels = b''
+    for cue_id, (_, label) in enumerate(cues, 1):
+        text = label.encode('utf-8') + b'\0'
+        labels += b'labl' + struct.pack('<II', len(text) + 4, cue_id) + text + b'\0' * (len(text) % 2)
+    chunks = b'cue ' + struct.pack('<I', len(cue)) + cue
+    chunks += b'LIST' + struct.pack('<I', len(labels) + 4) + b'adtl' + labels
+
+    with open(path, 'r+b') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() % 2:
+            f.write(b'\0')
+        f.write(chunks)
+        riff_size = f.tell() - 8
+        f.seek(4)
+        f.write(struct.pack('<I', riff_size))
+
+def encode_mp3(wav_path, output_path, chapters, duration):
+    """Encode a WAV file to MP3 with ffmpeg, writing chapters as ID3 chapter frames"""
+    if not shutil.which('ffmpeg'):
+        raise ValueError("MP3 export needs ffmpeg on the PATH")
+    metadata_path = wav_path + '.ffmetadata'
+    with open(metadata_path, 'w', encoding='utf-8') as f:
+        f.write(';FFMETADATA1\n')
+        for index, (start, label) in enumerate(chapters):
+            end = chapters[index + 1][0] if index + 1 < len(chapters) else duration
+            title = re.sub(r'([=;#\\\n])', r'\\\1', label)
+            f.write(f'[CHAPTER]\nTIMEBASE=1/1000\nSTART={int(start * 1000)}\nEND={int(end * 1000)}\ntitle={title}\n')
+    subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-i', wav_path, '-i', metadata_path,
+                    '-map_metadata', '1', '-codec:a', 'libmp3lame', '-q:a', '4', output_path], check=True)
+
+def export_audio(text, output_path, toc=None, workers=None, rate=150, volume=0.9, voice=None, progress=None):
+    """Synthesize extracted document text to a .wav or .mp3 file
+
+    toc is the document outline as returned by fitz's get_toc(), used to
+    name chapter markers. Returns [(seconds, label)] for the markers.
+    """
+    segments = segment_document_text(text)
+    if not segments:
+        raise ValueError("The document has no text to read")
+    markers = page_markers(segments, toc)
+    is_mp3 = output_path.lower().endswith('.mp3')
+
+    with tempfile.TemporaryDirectory(prefix='pdf-reader-audio-') as directory:
+        paths = synthesize_segments([segment_text for _, segment_text in segments], directory,
+                                    workers, rate, volume, voice, progress)
+        wav_path = os.path.join(directory, 'joined.wav') if is_mp3 else output_path
+        chapters = concatenate_wav(paths, wav_path, markers)
+        if is_mp3:
+            with wave.open(wav_path, 'rb') as joined:
+                duration = joined.getnframes() / joined.getframerate()
+            encode_mp3(wav_path, output_path, chapters, duration)
+    return chapters
+
+def export_pdf_audio(pdf_path, output_path, workers=None, **kwargs):
+    """Extract a PDF's text and outline and export it as audio"""
+    with fitz.open(pdf_path) as document:
+        text = extract_document_text(document, path=pdf_path)
+        toc = document.get_toc()
+    return export_audio(text, output_path, toc, workers, **kwargs)
+
+def find_pdfs(inputs):
+    """PDF paths from a mix of files and directories (searched recursively)"""
+    for path in inputs:
+        if os.path.isdir(path):
+            for directory, _, filenames in sorted(os.walk(path)):
+                for filename in sorted(filenames):
+                    if filename.lower().endswith('.pdf'):
+                        yield os.path.join(directory, filename)
+        else:
+            yield path
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert PDFs to audio files")
+    parser.add_argument('inputs', nargs='+', help="PDF files or directories of PDFs")
+    parser.add_argument('--output-dir', '-o', default='.')
+    parser.add_argument('--format', choices=['wav', 'mp3'], default='wav')
+    parser.add_argument('--workers', type=int, default=AUDIO_EXPORT_WORKERS)
+    parser.add_argument('--rate', type=int, default=150, help="Words per minute")
+    parser.add_argument('--volume', type=float, default=0.9)
+    parser.add_argument('--voice', help="pyttsx3 voice id")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    failures = 0
+    for pdf_path in find_pdfs(args.inputs):
+        name = os.path.splitext(os.path.basename(pdf_path))[0]
+        output_path = os.path.join(args.output_dir, f'{name}.{args.format}')
+        start = time.perf_counter()
+        try:
+            chapters = export_pdf_audio(pdf_path, output_path, args.workers, rate=args.rate,
+                                        volume=args.volume, voice=args.voice)
+        except Exception as e:
+            failures += 1
+            print(f"{pdf_path}: failed: {e}")
+            continue
+        print(f"{pdf_path} -> {output_path}: {len(chapters)} markers, "
+              f"{time.perf_counter() - start:.1f}s")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,210 @@
+"""Process folders of PDFs without the web or desktop UI
+
+Every PDF under the input directories has its text extracted, summarized
+and turned into questions by a bounded pool of worker processes, and the
+results are written next to each other in the output directory, mirroring
+the input layout:
+
+    <name>.json            text statistics, summary, key points and questions
+    <name>.questions.txt   questions in the plain-text export format
+    <name>.questions.html  questions in the HTML export format
+
+Finished documents are recorded by content hash in batch_manifest.jsonl
+in the output directory, so an interrupted run started again skips them,
+as does any duplicate of a file already processed. Results go through the
+same result cache as the web app (RESULT_CACHE_PATH), and AI models are
+used when available, locally or through MODEL_SERVER_ADDRESS.
+
+    python batch.py lectures/ --output-dir results --workers 4 --formats json html
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import fitz  # PyMuPDF
+from analysis import (DEFAULT_QUESTION_TYPES, AnalysisError, generate_document_questions,
+                      summarize_document)
+from exports import EXPORT_FORMATS, generate_html_questions, write_text_questions
+from extraction import extract_document_text
+from models import get_models
+from result_cache import RESULT_CACHE_MB, RESULT_CACHE_PATH, ResultCache
+from storage import hash_file
+from text_analysis import analyze_text
+
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+MANIFEST_NAME = 'batch_manifest.jsonl'
+
+_result_cache = None
+
+
+def get_result_cache():
+    """The worker process's connection to the shared result cache"""
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache(RESULT_CACHE_PATH, max_bytes=RESULT_CACHE_MB * 1024 * 1024)
+    return _result_cache
+
+def find_pdfs(directory):
+    """Yield (path, path relative to directory) for every PDF below it, in a stable order"""
+    for root, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith('.pdf'):
+                path = os.path.join(root, filename)
+                yield path, os.path.relpath(path, directory)
+
+def load_manifest(path):
+    """Content hashes of documents finished by earlier runs"""
+    done = set()
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)['content_hash'])
+                except (ValueError, KeyError):
+                    # A line cut short by an interrupted run
+                    continue
+    except FileNotFoundError:
+        pass
+    return done
+
+def write_outputs(output_base, formats, record):
+    """Write one document's results in the requested formats; returns the paths"""
+    os.makedirs(os.path.dirname(output_base) or '.', exist_ok=True)
+    document_name = record['source']
+    questions = record['questions']
+    outputs = []
+    if 'json' in formats:
+        outputs.append(f'{output_base}.json')
+        with open(outputs[-1], 'w', encoding='utf-8') as f:
+            json.dump(record, f, indent=2)
+    if 'txt' in formats:
+        outputs.append(f'{output_base}.questions.txt')
+        with open(outputs[-1], 'w', encoding='utf-8') as f:
+            write_text_questions(f, questions, document_name)
+    if 'html' in formats:
+        outputs.append(f'{output_base}.questions.html')
+        with open(outputs[-1], 'w', encoding='utf-8') as f:
+            f.write(generate_html_questions(questions, document_name))
+    return outputs
+
+def process_pdf(path, source, content_hash, output_base, formats, question_types, num_questions):
+    """Worker: extract, summarize and generate questions for one PDF and write the results"""
+    start = time.perf_counter()
+    results = get_result_cache()
+    models = get_models()
+
+    def extract():
+        with fitz.open(path) as document:
+            return extract_document_text(document)
+
+    text = results.get_or_compute(content_hash, 'text', None, extract)
+    analysis = None
+
+    def get_analysis():
+        nonlocal analysis
+        if analysis is None:
+            analysis = analyze_text(text)
+        return analysis
+
+    record = {'source': source, 'content_hash': content_hash}
+    try:
+        summary = summarize_document(content_hash, text, get_analysis, results, models)
+    except AnalysisError as e:
+        summary = {'error': str(e)}
+    record.update(summary)
+    record['questions'] = generate_document_questions(content_hash, get_analysis, results, models,
+                                                      question_types, num_questions)
+
+    outputs = write_outputs(output_base, formats, record)
+    return {
+        'source': source,
+        'content_hash': content_hash,
+        'outputs': outputs,
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+
+def run_batch(input_dirs, output_dir, workers=None, formats=EXPORT_FORMATS,
+              question_types=DEFAULT_QUESTION_TYPES, num_questions=5, log=print):
+    """Process every PDF below input_dirs; returns (processed, skipped, failed) counts
+
+    At most two documents per worker are queued at a time, so memory stays
+    bounded however many files there are.
+    """
+    workers = workers or BATCH_WORKERS
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    done = load_manifest(manifest_path)
+    in_flight = {}
+    processed = skipped = failed = 0
+    start = time.perf_counter()
+
+    def collect(futures):
+        nonlocal processed, failed
+        for future in futures:
+            source, content_hash = in_flight.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                # Let a later run try it again
+                done.discard(content_hash)
+                log(f"{source}: failed: {e}")
+                continue
+            processed += 1
+            manifest.write(json.dumps(result) + '\n')
+            manifest.flush()
+            elapsed = time.perf_counter() - start
+            log(f"{source}: {result['seconds']:.1f}s "
+                f"({processed / elapsed * 60:.1f} documents/minute)")
+
+    with open(manifest_path, 'a', encoding='utf-8') as manifest, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        for input_dir in input_dirs:
+            for path, source in find_pdfs(input_dir):
+                if len(input_dirs) > 1:
+                    source = os.path.join(os.path.basename(os.path.normpath(input_dir)), source)
+                try:
+                    content_hash = hash_file(path)
+                except OSError as e:
+                    failed += 1
+                    log(f"{source}: failed: {e}")
+                    continue
+                if content_hash in done:
+                    skipped += 1
+                    continue
+                done.add(content_hash)
+
+                output_base = os.path.join(output_dir, os.path.splitext(source)[0])
+                future = pool.submit(process_pdf, path, source, content_hash, output_base,
+                                     formats, question_types, num_questions)
+                in_flight[future] = (source, content_hash)
+                if len(in_flight) >= workers * 2:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(finished)
+        collect(list(in_flight))
+
+    elapsed = time.perf_counter() - start
+    rate = processed / elapsed * 60 if elapsed else 0.0
+    log(f"Processed {processed}, skipped {skipped}, failed {failed} in {elapsed:.1f}s "
+        f"({rate:.1f} documents/minute)")
+    return processed, skipped, failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract, summarize and generate questions for folders of PDFs")
+    parser.add_argument('inputs', nargs='+', help="Directories to search for PDFs")
+    parser.add_argument('--output-dir', '-o', required=True)
+    parser.add_argument('--workers', type=int, default=BATCH_WORKERS)
+    parser.add_argument('--formats', nargs='+', choices=EXPORT_FORMATS, default=list(EXPORT_FORMATS))
+    parser.add_argument('--types', nargs='+', choices=DEFAULT_QUESTION_TYPES, default=DEFAULT_QUESTION_TYPES,
+                        help="Question types to generate")
+    parser.add_argument('--count', type=int, default=5, help="Questions per type")
+    args = parser.parse_args()
+
+    _, _, failed = run_batch(args.inputs, args.output_dir, args.workers, args.formats,
+                             args.types, args.count)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
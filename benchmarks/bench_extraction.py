@@ -0,0 +1,63 @@
+"""Benchmark serial vs parallel text extraction
+
+Generates a synthetic text-heavy PDF and reports pages/second for the
+original string-concatenation loop, the serial generator pipeline and the
+process-pool pipeline at several worker counts.
+
+    python benchmarks/bench_extraction.py --pages 1000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+from extraction import assemble_text, iter_page_text, iter_page_text_parallel
+from synthetic import make_text_pdf
+
+def legacy_extract(document):
+    """The original app.py loop, kept for comparison"""
+    text = ""
+    for page_num in range(len(document)):
+        page = document[page_num]
+        text += f"\n--- Page {page_num + 1} ---\n"
+        text += page.get_text()
+        text += "\n"
+    return text
+
+def timed(label, pages, function):
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.3f}s  {pages / elapsed:10.1f} pages/s")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=500)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'bench.pdf')
+        make_text_pdf(path, args.pages)
+        print(f"{args.pages} pages, {os.path.getsize(path) / 1024:.0f} KB, {os.cpu_count()} CPUs\n")
+
+        with fitz.open(path) as document:
+            expected = timed('legacy += loop', args.pages, lambda: legacy_extract(document))
+            serial = timed('serial generator', args.pages,
+                           lambda: assemble_text(iter_page_text(document)))
+        assert serial == expected
+
+        for workers in sorted(set(args.workers)):
+            # The first call pays for starting the pool; time the second
+            assemble_text(iter_page_text_parallel(path, args.pages, workers))
+            parallel = timed(f'parallel, {workers} workers', args.pages,
+                             lambda: assemble_text(iter_page_text_parallel(path, args.pages, workers)))
+            assert parallel == expected
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Benchmark the extractive summarizer on large synthetic documents
+
+    python benchmarks/bench_extractive.py --sentences 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import text_analysis
+from text_analysis import analyze_text, extractive_summarization, rank_sentences_python
+
+WORDS = ("analysis model document energy system process cell theory market "
+         "structure function network protein climate policy method result data "
+         "language history evidence pressure signal memory value growth").split()
+
+def make_text(sentences, seed=0):
+    """Random sentences of 8 to 24 words drawn from a small vocabulary"""
+    rng = random.Random(seed)
+    return ' '.join(
+        ' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 24))).capitalize() + '.'
+        for _ in range(sentences)
+    )
+
+def timed(label, function):
+    start = time.perf_counter()
+    function()
+    print(f"{label:<30} {time.perf_counter() - start:8.3f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sentences', type=int, default=50000)
+    args = parser.parse_args()
+
+    text = make_text(args.sentences)
+    start = time.perf_counter()
+    analysis = analyze_text(text)
+    print(f"{analysis.sentence_count} sentences tokenized in {time.perf_counter() - start:.2f}s\n")
+
+    if text_analysis.vector_libraries() is None:
+        print("NumPy/SciPy not installed; only the pure-Python path is measured")
+    else:
+        timed('term matrix (first call)', analysis.term_matrix)
+        timed('centroid, vectorized', lambda: extractive_summarization(analysis))
+        timed('textrank, vectorized', lambda: extractive_summarization(analysis, method='textrank'))
+    timed('centroid, pure Python', lambda: rank_sentences_python(analysis))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark how long importing the web app takes
+
+Imports app.py in fresh interpreters and reports the median wall time,
+plus the modules that took longest according to python -X importtime.
+With --compare REF the same is measured for the tree at a git revision
+(exported to a temporary directory), to show the effect of a change.
+
+    python benchmarks/bench_startup.py --runs 10 --compare HEAD~1
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+def import_seconds(tree, module='app'):
+    """Wall time of a fresh interpreter importing module from tree"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', f'import {module}'], cwd=tree, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return time.perf_counter() - start
+
+def slowest_imports(tree, module='app', count=10):
+    """Top-level packages with the largest cumulative import time, in ms"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=tree, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    totals = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        # The module itself (one space of indent) and what it imports directly (three)
+        if match and len(match.group(3)) <= 3:
+            name = match.group(4).split('.')[0]
+            totals[name] = max(totals.get(name, 0), int(match.group(2)) / 1000)
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:count]
+
+def export_revision(revision, directory):
+    """Write the files of a git revision to directory"""
+    archive = subprocess.run(['git', 'archive', '--format=tar', revision], cwd=ROOT,
+                             check=True, stdout=subprocess.PIPE).stdout
+    with tempfile.TemporaryFile() as f:
+        f.write(archive)
+        f.seek(0)
+        with tarfile.open(fileobj=f) as tar:
+            tar.extractall(directory)
+
+def report(label, tree, runs):
+    # The first run fills the OS file cache and writes bytecode; it is not counted
+    import_seconds(tree)
+    timings = [import_seconds(tree) for _ in range(runs)]
+    median = statistics.median(timings)
+    print(f"{label}: median {median * 1000:.0f} ms, min {min(timings) * 1000:.0f} ms over {runs} runs")
+    for name, milliseconds in slowest_imports(tree):
+        print(f"    {name:<20} {milliseconds:8.1f} ms")
+    return median
+
+def try_report(label, tree, runs):
+    """report(), or None after printing the child's error if the tree fails to import"""
+    try:
+        return report(label, tree, runs)
+    except subprocess.CalledProcessError as e:
+        print(f"{label}: importing app failed (exit status {e.returncode})", file=sys.stderr)
+        if e.stderr:
+            print(e.stderr.rstrip(), file=sys.stderr)
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--compare', metavar='REF', help="Also measure this git revision")
+    args = parser.parse_args()
+
+    current = try_report('working tree', ROOT, args.runs)
+    if current is None:
+        return 1
+    if args.compare:
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                export_revision(args.compare, directory)
+            except subprocess.CalledProcessError:
+                print(f"Could not export revision {args.compare}", file=sys.stderr)
+                return 1
+            before = try_report(args.compare, directory, args.runs)
+        if before is None:
+            return 1
+        print(f"\n{args.compare} -> working tree: {before * 1000:.0f} ms -> {current * 1000:.0f} ms "
+              f"({before / current:.2f}x)")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,82 @@
+"""Benchmark the desktop viewer's pixmap-to-Tk frame path at several zoom levels
+
+Times, per frame, the old path (encode the pixmap as PPM, decode it with
+PIL, build a new PhotoImage), wrapping the pixmap's samples with
+Image.frombuffer and building a new PhotoImage, and frombuffer with the
+pixels pasted into a reused PhotoImage. Rendering itself is excluded so
+only the conversion cost is compared. Without a display only the PIL
+steps are timed.
+
+    python benchmarks/bench_tk_frames.py --zooms 0.5 1 2 3 --frames 20
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+from PIL import Image
+from rendering import pixmap_to_image, render_pixmap
+from synthetic import make_text_pdf
+
+def ppm_decode(pix):
+    img = Image.open(io.BytesIO(pix.tobytes('ppm')))
+    img.load()
+    return img
+
+def time_frames(pixmaps, function):
+    """Average milliseconds per frame of function(pix) over the pixmaps"""
+    start = time.perf_counter()
+    for pix in pixmaps:
+        function(pix)
+    return (time.perf_counter() - start) * 1000 / len(pixmaps)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--zooms', type=float, nargs='+', default=[0.5, 1.0, 1.5, 2.0, 3.0])
+    parser.add_argument('--frames', type=int, default=20)
+    args = parser.parse_args()
+
+    try:
+        import tkinter as tk
+        from PIL import ImageTk
+        root = tk.Tk()
+        root.withdraw()
+    except Exception as e:  # no display, or Tk missing
+        print(f"Tk unavailable ({e}); timing PIL conversion only\n")
+        root = None
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'bench.pdf')
+        make_text_pdf(path, args.frames)
+        document = fitz.open(path)
+
+        columns = ['ppm decode', 'frombuffer']
+        if root is not None:
+            columns = ['ppm+PhotoImage', 'frombuffer+PhotoImage', 'frombuffer+paste']
+        print(f"{'zoom':>6} {'size':>11} " + ' '.join(f"{column:>22}" for column in columns) + "   (ms/frame)")
+
+        for zoom in args.zooms:
+            pixmaps = [render_pixmap(document[page_index], zoom) for page_index in range(len(document))]
+            if root is None:
+                timings = [time_frames(pixmaps, ppm_decode),
+                           time_frames(pixmaps, pixmap_to_image)]
+            else:
+                photo = ImageTk.PhotoImage(pixmap_to_image(pixmaps[0]))
+                timings = [time_frames(pixmaps, lambda pix: ImageTk.PhotoImage(ppm_decode(pix))),
+                           time_frames(pixmaps, lambda pix: ImageTk.PhotoImage(pixmap_to_image(pix))),
+                           time_frames(pixmaps, lambda pix: photo.paste(pixmap_to_image(pix)))]
+            size = f"{pixmaps[0].width}x{pixmaps[0].height}"
+            print(f"{zoom:>6.2f} {size:>11} " + ' '.join(f"{timing:>22.2f}" for timing in timings))
+
+        document.close()
+
+    if root is not None:
+        root.destroy()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""Benchmark suite for rendering, extraction and analysis
+
+Generates synthetic text-, image- and vector-heavy PDFs at several page
+counts and measures, for each document:
+
+    render_<zoom>_ms    median and p95 latency of rendering and PNG
+                        encoding one page, the work behind /page/<n>.png
+    extract_pages_s     pages/second of whole-document text extraction,
+                        serial or parallel as /extract-text chooses
+    summary_*, key_points_*, analyze_*
+                        sentences/second of tokenization, the extractive
+                        summary, key points and the model summary path
+                        (text documents only)
+    peak_rss_mb         peak resident memory of the process that ran it
+
+Every document is measured in a fresh process so peak RSS is its own.
+Models are replaced by a stub by default (--models stub), so the suite
+runs offline and model-dependent timings measure the chunking and
+batching around inference rather than the model; --models none measures
+the extractive fallback and --models real whatever models.get_models()
+provides.
+
+    python benchmarks/run_suite.py --pages 1 50 500 --output results.json
+    python benchmarks/run_suite.py --output new.json --baseline results.json
+
+With --baseline, metrics that got worse by more than --tolerance are
+listed and the exit status is 1.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import GENERATORS, make_pdf
+
+# Suffixes of metrics where a larger value is better; for all others smaller is
+HIGHER_IS_BETTER = ('_s',)
+
+
+class StubModels:
+    """Stands in for LocalModels without loading anything
+
+    Summaries are the first sentence of each input and token counts are
+    estimated from word counts, so the summarization pipeline runs
+    end to end offline and deterministically.
+    """
+
+    def __init__(self, token_limit=1024):
+        self._token_limit = token_limit
+
+    def available(self, name):
+        return True
+
+    def token_limit(self, name):
+        return self._token_limit
+
+    def count_tokens(self, name, texts):
+        return [int(len(text.split()) * 1.3) + 1 for text in texts]
+
+    def run(self, name, inputs, **kwargs):
+        if name == 'summarizer':
+            return [{'summary_text': text.split('. ')[0].rstrip('.') + '.'} for text in inputs]
+        return [{'generated_text': 'Question one? Question two?'}]
+
+    def status(self):
+        return {'summarizer': 'stub', 'question_generator': 'stub'}
+
+    def warm_up(self, names=None):
+        return self.status()
+
+def install_models(kind):
+    import models
+    if kind == 'stub':
+        models.set_models(StubModels())
+    elif kind == 'none':
+        models.set_models(models.LocalModels(disabled=True))
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    try:
+        import resource
+    except ImportError:
+        # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def sample_pages(total_pages, count):
+    """Up to count page indexes spread evenly over the document"""
+    if total_pages <= count:
+        return list(range(total_pages))
+    return [round(index * (total_pages - 1) / (count - 1)) for index in range(count)]
+
+def throughput(count, function):
+    """Run function once and return count / elapsed seconds"""
+    start = time.perf_counter()
+    function()
+    return round(count / max(time.perf_counter() - start, 1e-9), 1)
+
+def measure_document(kind, path, zooms, render_samples, models_kind):
+    """Worker: every measurement for one synthetic document"""
+    import fitz  # PyMuPDF
+    from extraction import extract_document_text
+    from rendering import render_page
+
+    install_models(models_kind)
+    metrics = {}
+    with fitz.open(path) as document:
+        page_indexes = sample_pages(len(document), render_samples)
+        for zoom in zooms:
+            # One untimed render so font and image caches are warm, as on a live server
+            render_page(document, page_indexes[0], zoom)
+            timings = []
+            for page_index in page_indexes:
+                start = time.perf_counter()
+                render_page(document, page_index, zoom)
+                timings.append((time.perf_counter() - start) * 1000)
+            metrics[f'render_{zoom:g}_median_ms'] = round(statistics.median(timings), 2)
+            metrics[f'render_{zoom:g}_p95_ms'] = round(percentile(timings, 0.95), 2)
+
+        start = time.perf_counter()
+        text = extract_document_text(document, path=path)
+        metrics['extract_pages_s'] = round(len(document) / max(time.perf_counter() - start, 1e-9), 1)
+
+    if kind == 'text':
+        from analysis import summarize_document
+        from models import get_models
+        from result_cache import ResultCache
+        from text_analysis import analyze_text, extract_key_points, extractive_summarization
+
+        start = time.perf_counter()
+        analysis = analyze_text(text)
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        sentences = analysis.sentence_count
+        metrics['analyze_sentences_s'] = round(sentences / elapsed, 1)
+        metrics['extractive_summary_sentences_s'] = throughput(sentences, lambda: extractive_summarization(analysis))
+        metrics['key_points_sentences_s'] = throughput(sentences, lambda: extract_key_points(analysis))
+        # A disabled cache, so the summary is computed every time
+        metrics['summary_sentences_s'] = throughput(
+            sentences, lambda: summarize_document('benchmark', text, lambda: analysis, ResultCache(None), get_models()))
+
+    metrics['peak_rss_mb'] = peak_rss_mb()
+    return metrics
+
+def compare(results, baseline, tolerance):
+    """Metrics that got worse than baseline by more than tolerance, as printable lines"""
+    regressions = []
+    for scenario, metrics in results.items():
+        for name, value in metrics.items():
+            old = baseline.get(scenario, {}).get(name)
+            if not old or value is None:
+                continue
+            if name.endswith(HIGHER_IS_BETTER):
+                change = (old - value) / old
+            else:
+                change = (value - old) / old
+            if change > tolerance:
+                regressions.append(f"{scenario} {name}: {old} -> {value} ({change:+.0%} worse)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--kinds', nargs='+', choices=sorted(GENERATORS), default=sorted(GENERATORS))
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 50, 500],
+                        help="Page counts of the generated documents (up to 2000 is realistic)")
+    parser.add_argument('--zooms', type=float, nargs='+', default=[0.5, 1.0, 2.0])
+    parser.add_argument('--render-samples', type=int, default=10, help="Pages rendered per zoom")
+    parser.add_argument('--models', choices=['stub', 'none', 'real'], default='stub')
+    parser.add_argument('--output', help="Write results to this JSON file")
+    parser.add_argument('--baseline', help="Compare against results saved by an earlier run")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="Allowed slowdown before a metric counts as a regression")
+    args = parser.parse_args()
+
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for kind in args.kinds:
+            for pages in args.pages:
+                scenario = f'{kind}_{pages}'
+                path = os.path.join(temp_dir, f'{scenario}.pdf')
+                make_pdf(kind, path, pages)
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    metrics = pool.submit(measure_document, kind, path, args.zooms,
+                                          args.render_samples, args.models).result()
+                results[scenario] = metrics
+                print(scenario, json.dumps(metrics))
+                os.remove(path)
+
+    report = {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'models': args.models,
+            'zooms': args.zooms,
+            'render_samples': args.render_samples
+        },
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        print(f"\n{len(regressions)} regressions against {args.baseline}")
+        for line in regressions:
+            print(f"  {line}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
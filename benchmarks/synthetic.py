@@ -0,0 +1,110 @@
+"""Synthetic PDFs for the benchmarks
+
+Each generator writes a document of the given page count that stresses
+one part of MuPDF: dense text (extraction, analysis), embedded raster
+images (image decoding while rendering) or many vector paths (path
+rasterization). Output is deterministic for a given page count.
+"""
+import io
+import random
+import fitz  # PyMuPDF
+from PIL import Image
+
+LOREM = ("Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod "
+         "tempor incididunt ut labore et dolore magna aliqua. Ut enim ad minim veniam, "
+         "quis nostrud exercitation ullamco laboris nisi ut aliquip ex ea commodo. ")
+
+WORDS = ("analysis model document energy system process cell theory market "
+         "structure function network protein climate policy method result data "
+         "language history evidence pressure signal memory value growth").split()
+
+
+def make_text_pdf(path, pages, lines_per_page=45):
+    """Write a PDF with dense text on every page"""
+    document = fitz.open()
+    for page_number in range(pages):
+        page = document.new_page()
+        y = 50
+        for line in range(lines_per_page):
+            page.insert_text((40, y), f"{page_number}.{line} {LOREM[:90]}", fontsize=9)
+            y += 16
+    document.save(path)
+    document.close()
+
+def make_prose_pdf(path, pages, sentences_per_page=30, seed=0):
+    """Write a PDF of varied sentences, so summaries and key points have something to rank"""
+    rng = random.Random(seed)
+    document = fitz.open()
+    for _ in range(pages):
+        sentences = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 24))).capitalize() + '.'
+                     for _ in range(sentences_per_page)]
+        if rng.random() < 0.5:
+            sentences[0] = f"The key {rng.choice(WORDS)} is important for {rng.choice(WORDS)}."
+        page = document.new_page()
+        page.insert_textbox(fitz.Rect(40, 40, page.rect.width - 40, page.rect.height - 40),
+                            ' '.join(sentences), fontsize=9)
+    document.save(path)
+    document.close()
+
+def _noise_images(count, size=(600, 400), seed=0):
+    """PNG images of smooth colour noise; photographs compress about as badly"""
+    rng = random.Random(seed)
+    images = []
+    for _ in range(count):
+        small = Image.frombytes('RGB', (size[0] // 8, size[1] // 8),
+                                bytes(rng.getrandbits(8) for _ in range(size[0] // 8 * size[1] // 8 * 3)))
+        buffer = io.BytesIO()
+        small.resize(size, Image.BICUBIC).save(buffer, format='PNG')
+        images.append(buffer.getvalue())
+    return images
+
+def make_image_pdf(path, pages, images_per_page=2):
+    """Write a PDF where every page shows raster images and a caption"""
+    images = _noise_images(8)
+    document = fitz.open()
+    for page_number in range(pages):
+        page = document.new_page()
+        for index in range(images_per_page):
+            top = 50 + index * 340
+            image = images[(page_number * images_per_page + index) % len(images)]
+            page.insert_image(fitz.Rect(50, top, page.rect.width - 50, top + 320), stream=image)
+        page.insert_text((50, page.rect.height - 40), f"Figure {page_number + 1}. {LOREM[:60]}", fontsize=9)
+    document.save(path, deflate=True)
+    document.close()
+
+def make_vector_pdf(path, pages, paths_per_page=400, seed=0):
+    """Write a PDF where every page is covered by lines, curves and filled shapes"""
+    rng = random.Random(seed)
+    document = fitz.open()
+    for _ in range(pages):
+        page = document.new_page()
+        width, height = page.rect.width, page.rect.height
+
+        def point():
+            return fitz.Point(rng.uniform(20, width - 20), rng.uniform(20, height - 20))
+
+        shape = page.new_shape()
+        for index in range(paths_per_page):
+            kind = index % 3
+            if kind == 0:
+                shape.draw_line(point(), point())
+            elif kind == 1:
+                shape.draw_bezier(point(), point(), point(), point())
+            else:
+                shape.draw_circle(point(), rng.uniform(2, 30))
+            shape.finish(color=(rng.random(), rng.random(), rng.random()),
+                         fill=(rng.random(), rng.random(), rng.random()) if kind == 2 else None,
+                         width=rng.uniform(0.3, 2))
+        shape.commit()
+    document.save(path, deflate=True)
+    document.close()
+
+GENERATORS = {
+    'text': make_prose_pdf,
+    'image': make_image_pdf,
+    'vector': make_vector_pdf
+}
+
+def make_pdf(kind, path, pages):
+    """Write a synthetic PDF of one of the GENERATORS kinds"""
+    GENERATORS[kind](path, pages)
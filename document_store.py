@@ -0,0 +1,304 @@
+"""Thread-safe, per-session storage for open PDF documents"""
+import contextlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from storage import hash_file
+
+
+class DocumentClosed(RuntimeError):
+    """Raised when pinning an entry whose document has already been closed"""
+
+
+class DocumentEntry:
+    """Everything the server keeps for one open PDF document
+
+    Code that uses self.document outside of the request that looked the
+    entry up (background jobs, prefetch, streamed responses) pins it
+    first. An entry that is evicted or replaced while pinned leaves the
+    store at once but keeps its document open until the last pin is
+    released.
+    """
+
+    def __init__(self, doc_id, document, filename, path, content_hash=None):
+        self.doc_id = doc_id
+        self.document = document
+        self.filename = filename
+        self.path = path
+        # Identifies the document's contents across sessions and processes
+        self.content_hash = content_hash or hash_file(path)
+        self.total_pages = len(document)
+        self.current_page = 0
+        self.extracted_text = ''
+        self.summary = ''
+        self.questions = []
+        # Tokenized form of extracted_text, built once and shared by all helpers
+        self.analysis = None
+        self.analysis_lock = threading.Lock()
+        # Full-text search index, built during extraction or on first search
+        self.search_index = None
+        self.search_lock = threading.Lock()
+
+        # fitz documents are not thread-safe, so every access to
+        # self.document must happen while holding this lock
+        self.lock = threading.RLock()
+        self.created_at = time.time()
+        self.last_access = self.created_at
+
+        self._pins = 0
+        self._retired = False
+        self._closed = False
+        self._on_close = None
+        self._pin_lock = threading.Lock()
+
+        try:
+            self.modified_at = os.path.getmtime(path)
+        except OSError:
+            self.modified_at = self.created_at
+
+    def touch(self):
+        """Mark the entry as recently used"""
+        self.last_access = time.time()
+
+    def set_extracted_text(self, text):
+        """Replace the extracted text and drop the analysis built from the old one"""
+        with self.analysis_lock:
+            self.extracted_text = text
+            self.analysis = None
+
+    def memory_usage(self):
+        """Rough estimate of the memory held by this entry in bytes
+
+        The PDF itself is left out: MuPDF reads pages from the file on
+        demand, so its size on disk says little about memory use.
+        """
+        size = len(self.extracted_text) * 2
+        if self.analysis is not None:
+            size += self.analysis.memory_usage()
+        if self.search_index is not None:
+            size += self.search_index.memory_usage()
+        if isinstance(self.summary, dict):
+            size += len(self.summary.get('summary', '')) * 2
+        size += sum(len(str(question)) for question in self.questions) * 2
+        return size
+
+    def pin(self):
+        """Keep the document open until unpin(); False if it is already closed"""
+        with self._pin_lock:
+            if self._closed:
+                return False
+            self._pins += 1
+            return True
+
+    def unpin(self):
+        """Release a pin, closing the document if it was retired meanwhile"""
+        with self._pin_lock:
+            self._pins -= 1
+            close_now = self._retired and self._pins == 0 and not self._closed
+            if close_now:
+                self._closed = True
+        if close_now:
+            self._close_document()
+
+    @contextlib.contextmanager
+    def pinned(self):
+        """Hold a pin for the duration of a with block; raises DocumentClosed"""
+        if not self.pin():
+            raise DocumentClosed(f'Document {self.doc_id} has been closed')
+        try:
+            yield self
+        finally:
+            self.unpin()
+
+    def retire(self, on_close=None):
+        """Close the document once nothing has it pinned, then call on_close(entry)"""
+        with self._pin_lock:
+            self._retired = True
+            self._on_close = on_close
+            close_now = self._pins == 0 and not self._closed
+            if close_now:
+                self._closed = True
+        if close_now:
+            self._close_document()
+
+    def _close_document(self):
+        with self.lock:
+            if self.document is not None:
+                try:
+                    self.document.close()
+                except Exception as e:
+                    print(f"Warning: Could not close document {self.doc_id}: {e}")
+                self.document = None
+        if self._on_close is not None:
+            try:
+                self._on_close(self)
+            except Exception as e:
+                print(f"Warning: Close callback failed for {self.doc_id}: {e}")
+
+
+class DocumentStore:
+    """LRU store of open documents with count, memory and idle limits
+
+    on_close, if given, is called with each entry after its document has
+    been closed, whether it was evicted, replaced or removed. Entries
+    that are pinned when they leave the store are closed when their last
+    pin is released.
+    """
+
+    def __init__(self, max_documents=32, max_memory=512 * 1024 * 1024,
+                 idle_timeout=30 * 60, sweep_interval=60, on_close=None):
+        self.max_documents = max_documents
+        self.max_memory = max_memory
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self.on_close = on_close
+
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._last_sweep = time.time()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def add(self, document, filename, path, doc_id=None, content_hash=None, pin=False):
+        """Register an opened document and return its entry, pinned if pin is set"""
+        entry = DocumentEntry(doc_id or uuid.uuid4().hex, document, filename, path, content_hash)
+        with self._lock:
+            evicted = self._insert(entry, pin)
+        self._close_entries(evicted)
+        return entry
+
+    def get(self, doc_id, pin=False):
+        """Return the entry for doc_id, or None if it is unknown or expired
+
+        With pin, the entry is pinned before it can be evicted; the caller
+        must unpin() it.
+        """
+        if not doc_id:
+            return None
+
+        self._maybe_sweep()
+
+        with self._lock:
+            entry = self._entries.get(doc_id)
+            if entry is None or (pin and not entry.pin()):
+                return None
+            self._entries.move_to_end(doc_id)
+            entry.touch()
+            return entry
+
+    def get_or_open(self, doc_id, opener, pin=False):
+        """Return the entry for doc_id, calling opener() to reopen it on a miss
+
+        opener must return a (document, filename, path, content_hash)
+        tuple. This lets a worker process that never saw the upload serve
+        the document from the file saved on disk. pin works as in get().
+        Opening happens outside the store lock so a slow open does not
+        hold up other sessions; if another thread reopened the document
+        meanwhile, the extra copy is closed again.
+        """
+        entry = self.get(doc_id, pin=pin)
+        if entry is not None:
+            return entry
+
+        document, filename, path, content_hash = opener()
+        opened = DocumentEntry(doc_id, document, filename, path, content_hash)
+
+        with self._lock:
+            entry = self._entries.get(doc_id)
+            if entry is not None and (not pin or entry.pin()):
+                self._entries.move_to_end(doc_id)
+                entry.touch()
+                evicted = [opened]
+            else:
+                entry = opened
+                evicted = self._insert(opened, pin)
+        self._close_entries(evicted)
+        return entry
+
+    def remove(self, doc_id):
+        """Remove an entry and close its document"""
+        with self._lock:
+            entry = self._entries.pop(doc_id, None)
+        if entry is not None:
+            self._close_entries([entry])
+
+    def sweep(self):
+        """Close documents that have been idle longer than idle_timeout"""
+        now = time.time()
+        with self._lock:
+            self._last_sweep = now
+            expired = [doc_id for doc_id, entry in self._entries.items()
+                       if now - entry.last_access > self.idle_timeout]
+            evicted = [self._entries.pop(doc_id) for doc_id in expired]
+        self._close_entries(evicted)
+        return len(evicted)
+
+    def enforce_limits(self, keep=None):
+        """Evict least recently used entries after an entry has grown
+
+        keep is the doc_id of the entry being served, which is never evicted.
+        """
+        with self._lock:
+            evicted = self._collect_evictions(keep=keep)
+        self._close_entries(evicted)
+
+    def close_all(self):
+        """Close every open document"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        self._close_entries(entries)
+
+    def has_content(self, content_hash):
+        """Whether any open entry is a document with this content"""
+        with self._lock:
+            return any(entry.content_hash == content_hash for entry in self._entries.values())
+
+    def memory_usage(self):
+        """Total estimated memory of all entries in bytes"""
+        with self._lock:
+            return sum(entry.memory_usage() for entry in self._entries.values())
+
+    def _insert(self, entry, pin):
+        """Add entry in place of any with its doc_id; returns the entries to close
+
+        Must be called with self._lock held.
+        """
+        if pin:
+            entry.pin()
+        previous = self._entries.pop(entry.doc_id, None)
+        self._entries[entry.doc_id] = entry
+        evicted = self._collect_evictions(keep=entry.doc_id)
+        if previous is not None:
+            evicted.append(previous)
+        return evicted
+
+    def _maybe_sweep(self):
+        if time.time() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+
+    def _collect_evictions(self, keep=None):
+        """Pop least recently used entries until the limits are met"""
+        evicted = []
+        total_memory = sum(entry.memory_usage() for entry in self._entries.values())
+
+        for doc_id in list(self._entries.keys()):
+            over_count = len(self._entries) > self.max_documents
+            over_memory = total_memory > self.max_memory
+            if not over_count and not over_memory:
+                break
+            if doc_id == keep:
+                continue
+            entry = self._entries.pop(doc_id)
+            total_memory -= entry.memory_usage()
+            evicted.append(entry)
+
+        return evicted
+
+    def _close_entries(self, entries):
+        for entry in entries:
+            entry.retire(self.on_close)
@@ -0,0 +1,68 @@
+"""Question export formats shared by the web app and the batch CLI"""
+from datetime import datetime
+
+EXPORT_FORMATS = ('json', 'txt', 'html')
+
+
+def write_text_questions(f, questions, document_name='PDF'):
+    """Write questions to a text file object in the plain-text export format"""
+    f.write(f"Exam Questions Generated from: {document_name}\n")
+    f.write(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+
+    for i, question in enumerate(questions, 1):
+        f.write(f"Question {i}:\n")
+        f.write(f"Type: {question['type']}\n")
+        f.write(f"Question: {question['question']}\n")
+
+        if question['type'] == 'multiple_choice':
+            for j, option in enumerate(question['options'], 1):
+                f.write(f"  {j}. {option}\n")
+            f.write(f"Correct Answer: {question['correct_answer']}\n")
+        else:
+            f.write(f"Expected Answer: {question['expected_answer']}\n")
+
+        f.write(f"Explanation: {question['explanation']}\n\n")
+
+def generate_html_questions(questions, document_name='PDF'):
+    """Generate HTML content for questions"""
+    html = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Generated Exam Questions</title>
+        <style>
+            body { font-family: Arial, sans-serif; margin: 20px; }
+            .question { margin-bottom: 30px; padding: 15px; border: 1px solid #ddd; border-radius: 5px; }
+            .question h3 { color: #333; }
+            .options { margin-left: 20px; }
+            .correct { color: green; font-weight: bold; }
+            .explanation { margin-top: 10px; padding: 10px; background-color: #f5f5f5; }
+        </style>
+    </head>
+    <body>
+        <h1>Generated Exam Questions</h1>
+        <p>Generated from: """ + document_name + """</p>
+        <p>Generated on: """ + datetime.now().strftime('%Y-%m-%d %H:%M:%S') + """</p>
+    """
+
+    for i, question in enumerate(questions, 1):
+        html += f'<div class="question">'
+        html += f'<h3>Question {i} ({question["type"].replace("_", " ").title()})</h3>'
+        html += f'<p><strong>Question:</strong> {question["question"]}</p>'
+
+        if question['type'] == 'multiple_choice':
+            html += '<div class="options">'
+            for j, option in enumerate(question['options'], 1):
+                if option == question['correct_answer']:
+                    html += f'<p class="correct">{j}. {option} ✓</p>'
+                else:
+                    html += f'<p>{j}. {option}</p>'
+            html += '</div>'
+        else:
+            html += f'<p><strong>Expected Answer:</strong> {question["expected_answer"]}</p>'
+
+        html += f'<div class="explanation"><strong>Explanation:</strong> {question["explanation"]}</div>'
+        html += '</div>'
+
+    html += '</body></html>'
+    return html
@@ -0,0 +1,132 @@
+"""Page-by-page text extraction from PDF documents"""
+import atexit
+import contextlib
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import fitz  # PyMuPDF
+
+# Documents shorter than this are extracted in-process; below it the cost
+# of shipping work to other processes outweighs the parallel speed-up
+PARALLEL_MIN_PAGES = int(os.getenv('PARALLEL_EXTRACTION_MIN_PAGES', 64))
+EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', os.cpu_count() or 1))
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def format_page_text(page_number, text):
+    """Format one page's text the way it appears in the extracted document"""
+    return f"\n--- Page {page_number} ---\n{text}\n"
+
+def iter_page_text(document, start=0, stop=None, lock=None):
+    """Yield (page_number, text) for each page, one page at a time
+
+    page_number is 1-based. When a lock is given it is held only while a
+    single page is being read, so other users of the document (page
+    rendering, for example) can interleave with a long extraction.
+    """
+    stop = len(document) if stop is None else min(stop, len(document))
+    for page_index in range(start, stop):
+        with lock if lock is not None else contextlib.nullcontext():
+            text = document[page_index].get_text()
+        yield page_index + 1, text
+
+def assemble_text(pages):
+    """Join (page_number, text) pairs into the full document text in linear time"""
+    return ''.join(format_page_text(page_number, text) for page_number, text in pages)
+
+def extract_document_text(document, path=None, lock=None, workers=None):
+    """Extract the whole document's text
+
+    Pass the document's file path to allow parallel extraction of large
+    documents; each worker process opens its own copy of the file.
+    """
+    return assemble_text(iter_document_text(document, path, lock, workers))
+
+def _extract_page_range(path, start, stop):
+    """Worker: open the document independently and extract a range of pages"""
+    with fitz.open(path) as document:
+        return [(page_index + 1, document[page_index].get_text())
+                for page_index in range(start, stop)]
+
+def get_process_pool(workers=None):
+    """Shared process pool for page-level work such as extraction and thumbnails"""
+    global _pool, _pool_workers
+    workers = workers or EXTRACTION_WORKERS
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+def discard_process_pool(pool=None):
+    """Shut the shared pool down so the next caller starts a fresh one
+
+    With pool given, only that pool is discarded, so threads that saw the
+    same broken pool replace it once between them.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or (pool is not None and _pool is not pool):
+            return
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+atexit.register(discard_process_pool)
+
+def submit_to_pool(fn, arguments, workers=None):
+    """Submit fn(*args) for each args to the shared pool and return the futures
+
+    A pool whose worker died is broken for good; it is replaced and the
+    submission retried once.
+    """
+    for attempt in range(2):
+        pool = get_process_pool(workers)
+        try:
+            return [pool.submit(fn, *args) for args in arguments]
+        except BrokenProcessPool:
+            discard_process_pool(pool)
+            if attempt:
+                raise
+
+def split_page_ranges(total_pages, workers, chunks_per_worker=4):
+    """Split [0, total_pages) into contiguous ranges for the worker pool
+
+    Several chunks per worker keep the load balanced when some pages are
+    much denser than others, and let results stream back in page order.
+    """
+    chunk_count = max(1, min(total_pages, workers * chunks_per_worker))
+    chunk_size = -(-total_pages // chunk_count)
+    return [(start, min(start + chunk_size, total_pages))
+            for start in range(0, total_pages, chunk_size)]
+
+def iter_page_text_parallel(path, total_pages, workers=None):
+    """Yield (page_number, text) in page order, extracted by a process pool"""
+    workers = workers or EXTRACTION_WORKERS
+    futures = submit_to_pool(_extract_page_range,
+                             [(path, start, stop) for start, stop in split_page_ranges(total_pages, workers)],
+                             workers)
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+def use_parallel_extraction(total_pages, path=None, workers=None):
+    """Whether a document is large enough to be worth extracting in parallel"""
+    workers = workers or EXTRACTION_WORKERS
+    return (path is not None and workers > 1 and total_pages >= PARALLEL_MIN_PAGES
+            and os.path.exists(path))
+
+def iter_document_text(document, path=None, lock=None, workers=None):
+    """Yield (page_number, text), choosing serial or parallel extraction by page count"""
+    total_pages = len(document)
+    if use_parallel_extraction(total_pages, path, workers):
+        return iter_page_text_parallel(path, total_pages, workers)
+    return iter_page_text(document, lock=lock)
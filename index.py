@@ -7,7 +7,14 @@ from PIL import Image, ImageTk
 import threading
 import pyttsx3
 import time
-import io  # Import io at the top
+from render_cache import RenderCache
+from rendering import (PREVIEW_ZOOM, TILE_SIZE, RenderTimings, image_size, pixmap_to_image,
+                       render_page_image, render_tile_pixmap, tile_grid, wants_preview, wants_tiles)
+from prefetch import PrefetchScheduler
+from extraction import assemble_text, iter_document_text
+from ui_worker import Superseded, UIWorker
+from audio_export import export_pdf_audio
+from speech import SpeechPipeline, clean_text_for_speech, split_sentences
 
 class PDFReader:
     def __init__(self, root):
@@ -23,11 +30,36 @@ class PDFReader:
         self.zoom_level = 1.0
         self.pdf_document = None
         
+        # Rendering cache shared with the background prefetcher; fitz
+        # documents are not thread-safe so all page access takes the lock.
+        # It holds PIL images wrapping the pixmaps' pixels rather than
+        # encoded bytes, so showing a page never encodes or decodes it
+        self.document_lock = threading.Lock()
+        # Bumped with every document load and part of every cache key, so
+        # renders of a previous document (or of an earlier version of the
+        # same file) can never be served for the current one
+        self.document_generation = 0
+        self.render_cache = RenderCache(max_bytes=256 * 1024 * 1024, sizeof=image_size)
+        self.prefetcher = PrefetchScheduler(depth=int(os.getenv('PREFETCH_DEPTH', 2)))
+        self.render_timings = RenderTimings()
+        # MuPDF work runs here so the Tk main loop never waits on it
+        self.worker = UIWorker()
+        # At high zoom the page is drawn as tiles; only those near the
+        # visible part of the canvas are rendered and kept
+        self.tile_state = None
+        self.tile_items = {}
+        self.tile_update_pending = False
+        # The page's PhotoImage and canvas item, reused while the size stays the same
+        self.photo = None
+        self.page_item = None
+        
         # Audio variables
         self.tts_engine = None
         self.is_reading = False
         self.current_text = ""
-        self.reading_thread = None
+        # Text the speech pipeline's sentences were split from
+        self.speech_text = None
+        self.speech = None
         self.voice_rate = 150
         self.voice_volume = 0.9
         
@@ -37,6 +69,7 @@ class PDFReader:
         # Create GUI
         self.create_widgets()
         self.setup_styles()
+        self.poll_worker()
         
     def init_tts_engine(self):
         """Initialize the text-to-speech engine"""
@@ -50,6 +83,13 @@ class PDFReader:
             if voices:
                 # Set default voice (usually the first one)
                 self.tts_engine.setProperty('voice', voices[0].id)
+            
+            # Pipeline callbacks arrive on its threads and are passed to Tk with after()
+            self.speech = SpeechPipeline(
+                self.tts_engine,
+                on_sentence=lambda index, total: self.root.after(0, self.show_reading_progress, index, total),
+                on_finish=lambda: self.root.after(0, self.finish_reading),
+                on_error=lambda e: self.root.after(0, self.show_reading_error, e))
                 
         except Exception as e:
             print(f"TTS initialization error: {e}")
@@ -101,6 +141,8 @@ class PDFReader:
         self.pause_button = ttk.Button(audio_frame, text="⏸ Pause", command=self.pause_reading, style='Audio.TButton')
         self.pause_button.pack(side=tk.LEFT, padx=(0, 5))
         
+        ttk.Button(audio_frame, text="💾 Export", command=self.export_audio, style='Audio.TButton').pack(side=tk.LEFT, padx=(0, 5))
+        
     
         ttk.Label(audio_frame, text="Speed:", style='Info.TLabel').pack(side=tk.LEFT, padx=(10, 5))
         self.speed_var = tk.StringVar(value="150")
@@ -128,6 +170,12 @@ class PDFReader:
         ttk.Button(nav_frame, text="Zoom -", command=self.zoom_out, width=8).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(nav_frame, text="Reset", command=self.reset_zoom, width=6).pack(side=tk.LEFT)
         
+        ttk.Label(nav_frame, text="Prefetch:", style='Info.TLabel').pack(side=tk.LEFT, padx=(10, 5))
+        self.prefetch_var = tk.StringVar(value=str(self.prefetcher.depth))
+        prefetch_combo = ttk.Combobox(nav_frame, textvariable=self.prefetch_var, values=["0", "1", "2", "4", "8"], width=3)
+        prefetch_combo.pack(side=tk.LEFT)
+        prefetch_combo.bind('<<ComboboxSelected>>', self.update_prefetch_depth)
+        
         # Content area
         content_frame = ttk.Frame(main_frame)
         content_frame.pack(fill=tk.BOTH, expand=True)
@@ -148,7 +196,8 @@ class PDFReader:
         self.scrollbar_y = ttk.Scrollbar(self.canvas_frame, orient=tk.VERTICAL, command=self.canvas.yview)
         self.scrollbar_x = ttk.Scrollbar(self.canvas_frame, orient=tk.HORIZONTAL, command=self.canvas.xview)
         
-        self.canvas.configure(yscrollcommand=self.scrollbar_y.set, xscrollcommand=self.scrollbar_x.set)
+        self.canvas.configure(yscrollcommand=self.on_canvas_scroll_y, xscrollcommand=self.on_canvas_scroll_x)
+        self.canvas.bind('<Configure>', lambda event: self.schedule_tile_update())
         
         self.scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
         self.scrollbar_x.pack(side=tk.BOTTOM, fill=tk.X)
@@ -170,6 +219,9 @@ class PDFReader:
         progress_label = ttk.Label(audio_progress_frame, textvariable=self.progress_var, style='Info.TLabel')
         progress_label.pack(side=tk.LEFT, padx=(5, 0))
         
+        # Shown while text is being extracted in the background
+        self.task_progress = ttk.Progressbar(audio_progress_frame, mode='determinate', length=200)
+        
         # Status bar
         self.status_var = tk.StringVar()
         self.status_var.set("Ready - No PDF loaded")
@@ -187,6 +239,17 @@ class PDFReader:
             except ValueError:
                 pass
         
+    def update_prefetch_depth(self, event=None):
+        """Update how many pages on each side are pre-rendered"""
+        try:
+            self.prefetcher.depth = max(0, int(self.prefetch_var.get()))
+        except ValueError:
+            return
+        if self.prefetcher.depth == 0:
+            self.prefetcher.cancel('viewer')
+        else:
+            self.schedule_prefetch()
+        
     def start_reading(self):
         """Start reading the current text aloud"""
         if not self.tts_engine:
@@ -200,61 +263,44 @@ class PDFReader:
         if self.is_reading:
             return
             
+        # New text is split again; otherwise reading resumes where it stopped
+        if self.speech_text is not self.current_text:
+            self.speech.load(split_sentences(clean_text_for_speech(self.current_text)))
+            self.speech_text = self.current_text
+        
         self.is_reading = True
         self.progress_var.set("Reading...")
         self.status_var.set("Reading text aloud...")
+        self.speech.start()
         
-        self.reading_thread = threading.Thread(target=self.read_text_thread)
-        self.reading_thread.daemon = True
-        self.reading_thread.start()
+    def show_reading_progress(self, index, total):
+        if self.is_reading:
+            self.progress_var.set(f"Reading... {index + 1}/{total}")
         
-    def read_text_thread(self):
-        """Thread function for reading text"""
-        try:
-            clean_text = self.clean_text_for_speech(self.current_text)
-            
-            sentences = clean_text.split('. ')
-            
-            for i, sentence in enumerate(sentences):
-                if not self.is_reading:
-                    break
-                    
-                if sentence.strip():
-                    self.tts_engine.say(sentence + ".")
-                    self.tts_engine.runAndWait()
-                    
-                    
-                    progress = f"Reading... {i+1}/{len(sentences)}"
-                    self.root.after(0, lambda p=progress: self.progress_var.set(p))
-                    
-        except Exception as e:
-            self.root.after(0, lambda: messagebox.showerror("Error", f"Reading error: {str(e)}"))
-        finally:
-            self.root.after(0, self.finish_reading)
+    def show_reading_error(self, error):
+        self.is_reading = False
+        self.progress_var.set("Stopped")
+        messagebox.showerror("Error", f"Reading error: {str(error)}")
             
     def clean_text_for_speech(self, text):
         """Clean text for better speech synthesis"""
-        text = ' '.join(text.split())
-        
-        
-        import re
-        text = re.sub(r'[^\w\s\.\,\!\?\-]', '', text)
-        
-        return text
+        return clean_text_for_speech(text)
         
     def stop_reading(self):
-        """Stop reading"""
+        """Stop reading and go back to the start of the text"""
         self.is_reading = False
-        if self.tts_engine:
-            self.tts_engine.stop()
+        if self.speech:
+            self.speech.stop(rewind=True)
         self.progress_var.set("Stopped")
         self.status_var.set("Reading stopped")
         
     def pause_reading(self):
-        """Pause/resume reading"""
+        """Pause/resume reading; resuming continues from the sentence that was playing"""
         if self.is_reading:
-            self.stop_reading()
-            self.progress_var.set("Paused")
+            self.is_reading = False
+            self.speech.stop()
+            self.progress_var.set(f"Paused at {self.speech.position + 1}/{len(self.speech.sentences)}")
+            self.status_var.set("Reading paused")
         else:
             self.start_reading()
             
@@ -280,7 +326,16 @@ class PDFReader:
     def load_pdf(self, file_path):
         """Load PDF file and display first page"""
         try:
-            self.pdf_document = fitz.open(file_path)
+            self.prefetcher.cancel('viewer')
+            for lane in ('render', 'tiles', 'extract'):
+                self.worker.cancel(lane)
+            self.task_progress.pack_forget()
+            with self.document_lock:
+                if self.pdf_document:
+                    self.pdf_document.close()
+                self.pdf_document = fitz.open(file_path)
+                self.document_generation += 1
+            self.render_cache.clear()
             self.current_pdf = file_path
             self.total_pages = len(self.pdf_document)
             self.current_page = 0
@@ -292,35 +347,227 @@ class PDFReader:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load PDF: {str(e)}")
     
+    def poll_worker(self):
+        """Hand finished background work to the UI, about 60 times a second"""
+        self.worker.deliver()
+        self.root.after(16, self.poll_worker)
+    
     def display_current_page(self):
-        """Display the current page on the canvas"""
+        """Display the current page, rendering it in the background unless it is cached"""
         if not self.pdf_document:
             return
-            
-        try:
-            # Clear canvas
-            self.canvas.delete("all")
-            
-            # Get page
-            page = self.pdf_document[self.current_page]
-            
-            # Calculate zoom
-            zoom_matrix = fitz.Matrix(self.zoom_level, self.zoom_level)
-            pix = page.get_pixmap(matrix=zoom_matrix)
-            
-            # Convert to PIL Image
-            img_data = pix.tobytes("ppm")
-            img = Image.open(io.BytesIO(img_data))
-            self.photo = ImageTk.PhotoImage(img)
-            
-            # Display on canvas
-            self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo)
-            
-            # Update scroll region
-            self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to display page: {str(e)}")
+        
+        page_index = self.current_page
+        zoom = self.render_cache.quantize_zoom(self.zoom_level)
+        
+        if wants_tiles(zoom):
+            # Even the page size needs the document lock, so it is read in the background
+            self.worker.cancel('tiles')
+            self.worker.submit('render', lambda report: self.get_page_rect(page_index),
+                               on_done=lambda rect: self.show_tiled_page(page_index, zoom, rect),
+                               on_error=self.show_display_error)
+            return
+        
+        img = self.render_cache.get(self.page_cache_key(page_index, zoom))
+        if img is not None:
+            self.worker.cancel('render')
+            self.show_page_image(img)
+            self.schedule_prefetch()
+            return
+        
+        def render(report):
+            # Send a quick low resolution render first, then the full page
+            if wants_preview(zoom):
+                report(self.get_preview_image(page_index, zoom))
+            return self.get_page_data(page_index, zoom)
+        
+        # Rapid page or zoom changes replace the waiting request, so only
+        # the latest one is rendered
+        self.worker.submit('render', render, on_done=self.finish_page_display,
+                           on_progress=self.show_page_image, on_error=self.show_display_error)
+    
+    def finish_page_display(self, img):
+        """Show the full render and start prefetching around it"""
+        self.show_page_image(img)
+        self.schedule_prefetch()
+    
+    def show_display_error(self, error):
+        messagebox.showerror("Error", f"Failed to display page: {str(error)}")
+    
+    def show_page_image(self, img):
+        """Put a PIL image on the canvas
+        
+        When the previous page image has the same size (the next page of
+        a uniform document, or the full render replacing its preview) its
+        PhotoImage and canvas item are reused and only the pixels are
+        copied in, instead of building and laying out new ones.
+        """
+        if self.tile_state is not None:
+            self.worker.cancel('tiles')
+            self.tile_state = None
+        
+        if self.photo is not None and self.page_item is not None and \
+                (self.photo.width(), self.photo.height()) == img.size:
+            self.photo.paste(img)
+            return
+        
+        self.photo = ImageTk.PhotoImage(img)
+        self.canvas.delete("all")
+        self.tile_items = {}
+        self.page_item = self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo)
+        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+    
+    def show_tiled_page(self, page_index, zoom, rect):
+        """Lay out a page at full size and draw the tiles in view"""
+        width, height = round(rect.width * zoom), round(rect.height * zoom)
+        columns, rows = tile_grid(rect, zoom)
+        
+        self.canvas.delete("all")
+        self.photo = None
+        self.page_item = None
+        self.tile_items = {}
+        self.canvas.create_rectangle(0, 0, width, height, fill='white', outline='#cccccc')
+        self.canvas.configure(scrollregion=(0, 0, width, height))
+        self.tile_state = {'page': page_index, 'zoom': zoom, 'columns': columns, 'rows': rows}
+        self.draw_visible_tiles()
+    
+    def on_canvas_scroll_y(self, first, last):
+        self.scrollbar_y.set(first, last)
+        self.schedule_tile_update()
+    
+    def on_canvas_scroll_x(self, first, last):
+        self.scrollbar_x.set(first, last)
+        self.schedule_tile_update()
+    
+    def schedule_tile_update(self):
+        """Draw newly visible tiles once Tk is idle, at most once per batch of scroll events"""
+        if self.tile_state is not None and not self.tile_update_pending:
+            self.tile_update_pending = True
+            self.root.after_idle(self.draw_visible_tiles)
+    
+    def draw_visible_tiles(self):
+        """Request the tiles overlapping the viewport and drop those far from it"""
+        self.tile_update_pending = False
+        state = self.tile_state
+        if state is None or not self.pdf_document:
+            return
+        
+        # Viewport in canvas coordinates, with one tile of margin
+        left = self.canvas.canvasx(0)
+        top = self.canvas.canvasy(0)
+        right = left + self.canvas.winfo_width()
+        bottom = top + self.canvas.winfo_height()
+        columns = range(max(0, int(left // TILE_SIZE) - 1), min(state['columns'], int(right // TILE_SIZE) + 2))
+        rows = range(max(0, int(top // TILE_SIZE) - 1), min(state['rows'], int(bottom // TILE_SIZE) + 2))
+        wanted = {(column, row) for column in columns for row in rows}
+        
+        for tile in [tile for tile in self.tile_items if tile not in wanted]:
+            _, item = self.tile_items.pop(tile)
+            self.canvas.delete(item)
+        
+        missing = sorted(wanted - self.tile_items.keys(), key=lambda tile: (tile[1], tile[0]))
+        if not missing:
+            self.worker.cancel('tiles')
+            return
+        
+        page_index, zoom = state['page'], state['zoom']
+        
+        def render(report):
+            # Each tile is sent as soon as it is ready; a newer scroll
+            # position supersedes this request between tiles
+            for column, row in missing:
+                report((column, row, self.get_tile_data(page_index, zoom, column, row)))
+        
+        self.worker.submit('tiles', render, on_progress=self.add_tile, on_error=self.show_display_error)
+    
+    def add_tile(self, tile):
+        """Put one rendered tile on the canvas"""
+        column, row, img = tile
+        if self.tile_state is None or (column, row) in self.tile_items:
+            return
+        photo = ImageTk.PhotoImage(img)
+        item = self.canvas.create_image(column * TILE_SIZE, row * TILE_SIZE, anchor=tk.NW, image=photo)
+        self.tile_items[(column, row)] = (photo, item)
+    
+    def get_tile_data(self, page_index, zoom, column, row):
+        """Return a PIL image of one tile of a page, using the render cache"""
+        document, generation = self.document_snapshot()
+        key = self.render_cache.make_key(generation, page_index, zoom, 'rgb', tile=(column, row, TILE_SIZE))
+        
+        def render():
+            with self.document_lock:
+                if self.pdf_document is not document:
+                    raise Superseded()
+                with self.render_timings.measure('tile'):
+                    pix = render_tile_pixmap(document, page_index, zoom, column, row, TILE_SIZE)
+            return pixmap_to_image(pix)
+        
+        return self.render_cache.get_or_render(key, render)
+    
+    def get_page_rect(self, page_index):
+        with self.document_lock:
+            return self.pdf_document[page_index].rect
+    
+    def get_preview_image(self, page_index, zoom):
+        """Render a page at PREVIEW_ZOOM and scale it up to the size it has at zoom"""
+        with self.document_lock:
+            with self.render_timings.measure('preview'):
+                img = render_page_image(self.pdf_document, page_index, PREVIEW_ZOOM)
+            rect = self.pdf_document[page_index].rect
+        size = (round(rect.width * zoom), round(rect.height * zoom))
+        return img.resize(size, Image.BILINEAR)
+    
+    def document_snapshot(self):
+        """The open document and its generation, read together"""
+        with self.document_lock:
+            return self.pdf_document, self.document_generation
+    
+    def page_cache_key(self, page_index, zoom=None, generation=None):
+        """Render cache key for a page at zoom, by default the current zoom and document"""
+        if generation is None:
+            generation = self.document_generation
+        return self.render_cache.make_key(generation, page_index, zoom or self.zoom_level, 'rgb')
+    
+    def get_page_data(self, page_index, zoom=None):
+        """Return a PIL image of a page at zoom, using the render cache
+        
+        Raises Superseded if another document is loaded meanwhile, so a
+        page of the new document is never cached under the old one's key.
+        """
+        document, generation = self.document_snapshot()
+        key = self.page_cache_key(page_index, zoom, generation)
+        
+        def render():
+            with self.document_lock:
+                if self.pdf_document is not document:
+                    raise Superseded()
+                with self.render_timings.measure('full'):
+                    return render_page_image(document, page_index, key[2])
+        
+        return self.render_cache.get_or_render(key, render)
+    
+    def schedule_prefetch(self):
+        """Pre-render neighbouring pages at the current zoom in the background"""
+        if not self.pdf_document or self.prefetcher.depth <= 0:
+            return
+        
+        zoom_level = self.zoom_level
+        document = self.pdf_document
+        generation = self.document_generation
+        
+        def render(page_index):
+            key = self.page_cache_key(page_index, zoom_level, generation)
+            with self.document_lock:
+                if self.pdf_document is not document:
+                    return
+                with self.render_timings.measure('prefetch'):
+                    img = render_page_image(document, page_index, key[2])
+            self.render_cache.put(key, img)
+        
+        def is_cached(page_index):
+            return self.render_cache.contains(self.page_cache_key(page_index, zoom_level, generation))
+        
+        self.prefetcher.schedule('viewer', self.current_page, self.total_pages, render, is_cached)
     
     def update_page_display(self):
         """Update page navigation display"""
@@ -359,33 +606,89 @@ class PDFReader:
             self.display_current_page()
     
     def extract_text(self):
-        """Extract text from the current PDF"""
+        """Extract text from the current PDF in the background"""
         if not self.pdf_document:
             messagebox.showwarning("Warning", "No PDF loaded")
             return
-            
-        try:
-            text = ""
-            for page_num in range(self.total_pages):
-                page = self.pdf_document[page_num]
-                text += f"\n--- Page {page_num + 1} ---\n"
-                text += page.get_text()
-                text += "\n"
-            
-            # Store text for audio reading
-            self.current_text = text
-            
-            # Display in text viewer
-            self.text_viewer.delete(1.0, tk.END)
-            self.text_viewer.insert(1.0, text)
-            
-            # Switch to text viewer tab
-            self.notebook.select(1)
-            
-            self.status_var.set(f"Text extracted from {self.total_pages} pages - Ready for audio reading")
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to extract text: {str(e)}")
+        
+        document = self.pdf_document
+        path = self.current_pdf
+        total_pages = self.total_pages
+        
+        def extract(report):
+            pages = []
+            for page_number, text in iter_document_text(document, path=path, lock=self.document_lock):
+                pages.append((page_number, text))
+                report(page_number)
+            return assemble_text(pages)
+        
+        def show_progress(page_number):
+            self.task_progress['value'] = page_number
+            self.status_var.set(f"Extracting text... page {page_number} of {total_pages}")
+        
+        def show_error(error):
+            self.task_progress.pack_forget()
+            messagebox.showerror("Error", f"Failed to extract text: {str(error)}")
+        
+        self.task_progress.configure(maximum=max(total_pages, 1), value=0)
+        self.task_progress.pack(side=tk.RIGHT)
+        self.status_var.set("Extracting text...")
+        self.worker.submit('extract', extract, on_done=self.show_extracted_text,
+                           on_progress=show_progress, on_error=show_error)
+    
+    def show_extracted_text(self, text):
+        """Show the text from a finished extraction"""
+        self.task_progress.pack_forget()
+        
+        # Store text for audio reading
+        self.current_text = text
+        
+        # Display in text viewer
+        self.text_viewer.delete(1.0, tk.END)
+        self.text_viewer.insert(1.0, text)
+        
+        # Switch to text viewer tab
+        self.notebook.select(1)
+        
+        self.status_var.set(f"Text extracted from {self.total_pages} pages - Ready for audio reading")
+    
+    def export_audio(self):
+        """Save the whole document as a WAV or MP3 audiobook, synthesized in worker processes"""
+        if not self.pdf_document:
+            messagebox.showwarning("Warning", "No PDF loaded")
+            return
+        
+        output_path = filedialog.asksaveasfilename(
+            title="Export Audio As",
+            defaultextension=".wav",
+            filetypes=[("WAV audio", "*.wav"), ("MP3 audio (needs ffmpeg)", "*.mp3")]
+        )
+        if not output_path:
+            return
+        
+        pdf_path = self.current_pdf
+        
+        def export(report):
+            return export_pdf_audio(pdf_path, output_path, rate=self.voice_rate, volume=self.voice_volume,
+                                    progress=lambda done, total: report((done, total)))
+        
+        def show_progress(progress):
+            done, total = progress
+            self.task_progress.configure(maximum=total, value=done)
+            self.status_var.set(f"Exporting audio... {done} of {total} segments")
+        
+        def show_done(chapters):
+            self.task_progress.pack_forget()
+            self.status_var.set(f"Audio exported to {output_path} ({len(chapters)} markers)")
+        
+        def show_error(error):
+            self.task_progress.pack_forget()
+            messagebox.showerror("Error", f"Failed to export audio: {str(error)}")
+        
+        self.task_progress.configure(maximum=1, value=0)
+        self.task_progress.pack(side=tk.RIGHT)
+        self.status_var.set("Exporting audio...")
+        self.worker.submit('export', export, on_done=show_done, on_progress=show_progress, on_error=show_error)
     
     def save_text(self):
         """Save extracted text to file"""
@@ -0,0 +1,148 @@
+"""Background job queue for long-running analysis work"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's work function when the job has been cancelled"""
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class Job:
+    """A unit of background work with progress reporting and cancellation"""
+
+    def __init__(self, kind, owner=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner = owner
+        self.status = 'queued'
+        self.progress = 0.0
+        self.message = 'Waiting in queue'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+        # Bumped on every change so listeners can wait for the next update
+        self.version = 0
+        self._condition = threading.Condition()
+        self._cancel_requested = threading.Event()
+
+    @property
+    def done(self):
+        return self.status in ('succeeded', 'failed', 'cancelled')
+
+    def report(self, progress=None, message=None):
+        """Record progress from inside the work function; raises JobCancelled if cancelled"""
+        if self._cancel_requested.is_set():
+            raise JobCancelled()
+        self._update(progress=progress, message=message)
+
+    def cancel(self):
+        """Ask the job to stop at its next progress report"""
+        self._cancel_requested.set()
+        if self.status == 'queued':
+            self._update(status='cancelled', message='Cancelled')
+
+    def wait_for_update(self, version, timeout=None):
+        """Block until the job changes past version or timeout expires"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.version != version, timeout=timeout)
+            return self.version
+
+    def to_dict(self, include_result=True):
+        data = {
+            'job_id': self.id,
+            'type': self.kind,
+            'status': self.status,
+            'progress': round(self.progress, 3),
+            'message': self.message,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+        if include_result and self.status == 'succeeded':
+            data['result'] = self.result
+        if self.error:
+            data['error'] = self.error
+        return data
+
+    def _update(self, **changes):
+        with self._condition:
+            for name, value in changes.items():
+                if value is not None:
+                    setattr(self, name, value)
+            if changes.get('status') in ('succeeded', 'failed', 'cancelled'):
+                self.finished_at = time.time()
+            self.version += 1
+            self._condition.notify_all()
+
+    def _run(self, work):
+        if self._cancel_requested.is_set():
+            self._update(status='cancelled', message='Cancelled')
+            return
+
+        self._update(status='running', message='Started')
+        try:
+            result = work(self)
+        except JobCancelled:
+            self._update(status='cancelled', message='Cancelled')
+        except Exception as e:
+            self._update(status='failed', error=str(e), message='Failed')
+        else:
+            self.result = result
+            self._update(status='succeeded', progress=1.0, message='Done')
+
+
+class JobQueue:
+    """Runs jobs on a local worker pool with a bounded number of pending jobs"""
+
+    def __init__(self, max_workers=2, max_pending=16, retention=60 * 60):
+        self.max_pending = max_pending
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, work, owner=None):
+        """Queue work(job) and return the Job; raises QueueFull at capacity"""
+        with self._lock:
+            self._prune()
+            if self.pending() >= self.max_pending:
+                raise QueueFull(f'Too many jobs in progress (limit {self.max_pending})')
+            job = Job(kind, owner)
+            self._jobs[job.id] = job
+
+        self._executor.submit(job._run, work)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def pending(self):
+        """Number of queued or running jobs"""
+        return sum(1 for job in list(self._jobs.values()) if not job.done)
+
+    def shutdown(self):
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _prune(self):
+        """Forget finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.done and job.finished_at < cutoff]:
+            del self._jobs[job_id]
@@ -0,0 +1,266 @@
+"""Request timing spans, Prometheus metrics and a sampling profiler for slow requests
+
+Code anywhere in the app can wrap a phase of its work in span('name').
+The duration goes into a per-stage histogram and, when the code runs
+while serving a request, into that request's list of spans, which the
+web app returns in a Server-Timing header. Work on background threads
+(jobs, prefetch) only feeds the histogram.
+"""
+import collections
+import contextlib
+import contextvars
+import os
+import sys
+import threading
+import time
+
+# Upper bounds in seconds, as in the Prometheus client defaults plus a few slow ones
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_request_spans = contextvars.ContextVar('request_spans', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_sample(name, labels, value):
+    """One line of the Prometheus text format"""
+    if labels:
+        label_text = ','.join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+        return f'{name}{{{label_text}}} {value}'
+    return f'{name} {value}'
+
+def format_metric(name, metric_type, help_text, samples):
+    """HELP and TYPE lines followed by (labels, value) samples"""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}']
+    lines.extend(format_sample(name, labels, value) for labels, value in samples)
+    return '\n'.join(lines)
+
+def format_summary(name, help_text, samples):
+    """A summary without quantiles from (labels, count, total) samples"""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} summary']
+    for labels, count, total in samples:
+        lines.append(format_sample(f'{name}_sum', labels, round(total, 6)))
+        lines.append(format_sample(f'{name}_count', labels, count))
+    return '\n'.join(lines)
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label set"""
+
+    def __init__(self, name, help_text, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, (list(counts), total, count))
+                            for labels, (counts, total, count) in self._series.items())
+        for label_values, (counts, total, count) in series:
+            labels = dict(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(format_sample(f'{self.name}_bucket', {**labels, 'le': f'{bound:g}'}, cumulative))
+            lines.append(format_sample(f'{self.name}_bucket', {**labels, 'le': '+Inf'}, count))
+            lines.append(format_sample(f'{self.name}_sum', labels, round(total, 6)))
+            lines.append(format_sample(f'{self.name}_count', labels, count))
+        return '\n'.join(lines)
+
+
+class Metrics:
+    """Request and stage latency histograms of one process"""
+
+    def __init__(self, prefix='pdfreader'):
+        self.request_seconds = Histogram(f'{prefix}_request_duration_seconds',
+                                         'Time to produce a response, by endpoint',
+                                         ('endpoint', 'method', 'status'))
+        self.stage_seconds = Histogram(f'{prefix}_stage_duration_seconds',
+                                       'Time spent in each phase of the work, by stage', ('stage',))
+
+    def observe_request(self, endpoint, method, status, seconds):
+        self.request_seconds.observe(seconds, endpoint, method, str(status))
+
+    def observe_stage(self, stage, seconds):
+        self.stage_seconds.observe(seconds, stage)
+
+    def render(self):
+        return f'{self.request_seconds.render()}\n{self.stage_seconds.render()}'
+
+
+metrics = Metrics()
+
+@contextlib.contextmanager
+def span(name):
+    """Time a phase of work as stage name"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        metrics.observe_stage(name, seconds)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((name, seconds))
+
+@contextlib.contextmanager
+def locked(lock, name='lock_wait'):
+    """Hold lock, timing the wait for it as a span"""
+    with span(name):
+        lock.acquire()
+    try:
+        yield
+    finally:
+        lock.release()
+
+def start_request():
+    """Begin collecting spans for the request served by this context"""
+    _request_spans.set([])
+
+def finish_request():
+    """Stop collecting and return the request's (name, seconds) spans"""
+    spans = _request_spans.get() or []
+    _request_spans.set(None)
+    return spans
+
+def server_timing(spans, total_seconds):
+    """Server-Timing header value; repeated spans of one stage are added up"""
+    totals = collections.OrderedDict()
+    for name, seconds in spans:
+        totals[name] = totals.get(name, 0.0) + seconds
+    entries = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in totals.items()]
+    entries.append(f'total;dur={total_seconds * 1000:.1f}')
+    return ', '.join(entries)
+
+def resident_memory_bytes():
+    """Current resident set size, or the peak where the current one is not available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class SamplingProfiler:
+    """Samples the stacks of threads serving requests and saves those of slow ones
+
+    While enabled, a background thread records the stack of every thread
+    between begin() and end() each interval seconds. When a request took
+    at least slow_seconds, end() writes its samples to directory in the
+    folded format read by flamegraph.pl and speedscope; only the newest
+    max_files profiles are kept.
+    """
+
+    def __init__(self, directory, slow_seconds=0.0, interval=0.005, max_files=200):
+        self.directory = directory
+        self.slow_seconds = slow_seconds
+        self.interval = interval
+        self.max_files = max_files
+        self.enabled = slow_seconds > 0
+        self._active = {}
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def configure(self, enabled, slow_seconds=None):
+        with self._condition:
+            self.enabled = enabled
+            if slow_seconds is not None:
+                self.slow_seconds = slow_seconds
+            if enabled and self.slow_seconds <= 0:
+                # Profiling every request is never what anyone wants
+                self.slow_seconds = 1.0
+            if not enabled:
+                self._active.clear()
+
+    def status(self):
+        return {
+            'enabled': self.enabled,
+            'slow_ms': round(self.slow_seconds * 1000),
+            'interval_ms': self.interval * 1000,
+            'directory': self.directory
+        }
+
+    def begin(self):
+        """Start sampling the calling thread"""
+        if not self.enabled:
+            return
+        with self._condition:
+            self._active[threading.get_ident()] = collections.Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample, daemon=True, name='sampling-profiler')
+                self._thread.start()
+            self._condition.notify_all()
+
+    def end(self, label, seconds):
+        """Stop sampling the calling thread; returns the saved profile's path, if any"""
+        with self._condition:
+            samples = self._active.pop(threading.get_ident(), None)
+        if not samples or seconds < self.slow_seconds:
+            return None
+
+        os.makedirs(self.directory, exist_ok=True)
+        safe_label = ''.join(char if char.isalnum() or char in '-_' else '_' for char in label)
+        path = os.path.join(self.directory,
+                            f'{time.strftime("%Y%m%d-%H%M%S")}-{safe_label}-{seconds * 1000:.0f}ms.folded')
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in samples.most_common():
+                f.write(f'{stack} {count}\n')
+        self._prune()
+        return path
+
+    def _prune(self):
+        try:
+            # Names start with the time, so they sort oldest first
+            profiles = sorted((entry for entry in os.scandir(self.directory) if entry.name.endswith('.folded')),
+                              key=lambda entry: entry.name)
+        except OSError:
+            return
+        for entry in profiles[:-self.max_files]:
+            with contextlib.suppress(OSError):
+                os.remove(entry.path)
+
+    def _sample(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._active)
+                active = dict(self._active)
+            frames = sys._current_frames()
+            for ident, samples in active.items():
+                frame = frames.get(ident)
+                if frame is not None:
+                    samples[self._stack_key(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _stack_key(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
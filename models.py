@@ -0,0 +1,283 @@
+"""Lazy loading of the AI models, optionally shared through a model server
+
+By default each web process loads a model the first time it is needed.
+Set MODEL_SERVER_ADDRESS to have all web workers send inference requests
+to one model server process instead, so the models are loaded once per
+host:
+
+    export MODEL_SERVER_AUTHKEY_FILE=~/.pdfreader-model-server.key
+    python models.py --address 127.0.0.1:6001 --warmup
+    MODEL_SERVER_ADDRESS=127.0.0.1:6001 python app.py
+
+Requests and replies are pickled, so anyone holding the shared key can
+run code in the other process. There is no default key: set
+MODEL_SERVER_AUTHKEY for both processes, or point MODEL_SERVER_AUTHKEY_FILE
+at a file only their user can read. The server creates that file with a
+random key if it does not exist yet.
+"""
+import argparse
+import os
+import secrets
+import stat
+import threading
+from multiprocessing.connection import Client, Listener
+from metrics import span
+
+MODEL_SPECS = {
+    'summarizer': ('summarization', os.getenv('SUMMARIZER_MODEL', 'facebook/bart-large-cnn')),
+    'question_generator': ('text2text-generation', os.getenv('QUESTION_MODEL', 'google/flan-t5-base'))
+}
+
+MODEL_SERVER_ADDRESS = os.getenv('MODEL_SERVER_ADDRESS', '')
+MODEL_SERVER_AUTHKEY = os.getenv('MODEL_SERVER_AUTHKEY', '')
+MODEL_SERVER_AUTHKEY_FILE = os.getenv('MODEL_SERVER_AUTHKEY_FILE', '')
+
+# Methods a model server will run on behalf of its clients
+SERVER_COMMANDS = ('available', 'run', 'count_tokens', 'token_limit', 'status', 'warm_up')
+
+
+def parse_address(address):
+    """Turn 'host:port' into a TCP address tuple; anything else is a Unix socket path"""
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit():
+        return host, int(port)
+    return address
+
+def load_authkey(path=None, create=False):
+    """The model server's shared key, from MODEL_SERVER_AUTHKEY or a key file
+
+    With create, a missing key file is written with a random key and
+    mode 0600. Raises RuntimeError when no key is configured, or when the
+    key file can be read by other users.
+    """
+    if MODEL_SERVER_AUTHKEY:
+        return MODEL_SERVER_AUTHKEY.encode()
+    path = path or MODEL_SERVER_AUTHKEY_FILE
+    if not path:
+        raise RuntimeError('The model server needs a key: set MODEL_SERVER_AUTHKEY or MODEL_SERVER_AUTHKEY_FILE')
+
+    if create:
+        try:
+            handle = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(handle, 'w') as f:
+                f.write(secrets.token_hex(32))
+
+    try:
+        with open(path, 'rb') as f:
+            if os.name == 'posix':
+                info = os.fstat(f.fileno())
+                if info.st_uid != os.getuid() or info.st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+                    raise RuntimeError(f'Model server key file {path} must be owned by this user and mode 0600')
+            authkey = f.read().strip()
+    except OSError as e:
+        raise RuntimeError(f'Could not read model server key file: {e}') from None
+    if not authkey:
+        raise RuntimeError(f'Model server key file {path} is empty')
+    return authkey
+
+
+class LocalModels:
+    """Loads transformers pipelines in this process on first use"""
+
+    def __init__(self, disabled=False):
+        self.disabled = disabled
+        self._pipelines = {}
+        self._errors = {}
+        self._load_locks = {name: threading.Lock() for name in MODEL_SPECS}
+        self._run_locks = {name: threading.Lock() for name in MODEL_SPECS}
+
+    def load(self, name):
+        """Return the pipeline for name, loading it if needed; None if unavailable"""
+        if self.disabled or name not in MODEL_SPECS:
+            return None
+
+        pipeline_instance = self._pipelines.get(name)
+        if pipeline_instance is not None or name in self._errors:
+            return pipeline_instance
+
+        with self._load_locks[name]:
+            if name in self._pipelines or name in self._errors:
+                return self._pipelines.get(name)
+
+            task, model = MODEL_SPECS[name]
+            try:
+                # Imported here so processes that never run a model do not pay for it
+                from transformers import pipeline
+                self._pipelines[name] = pipeline(task, model=model)
+            except Exception as e:
+                print(f"Warning: Could not load AI model {model}: {e}")
+                self._errors[name] = str(e)
+            return self._pipelines.get(name)
+
+    def available(self, name):
+        """Whether the model can be used, loading it on first call"""
+        return self.load(name) is not None
+
+    def run(self, name, inputs, **kwargs):
+        """Run a model on inputs with pipeline keyword arguments"""
+        pipeline_instance = self.load(name)
+        if pipeline_instance is None:
+            raise RuntimeError(f'AI model {name} is not available')
+        with self._run_locks[name]:
+            with span('inference'):
+                return pipeline_instance(inputs, **kwargs)
+
+    def count_tokens(self, name, texts):
+        """Token count of each text under the model's tokenizer, or None without one"""
+        tokenizer = getattr(self.load(name), 'tokenizer', None)
+        if tokenizer is None:
+            return None
+        encoded = tokenizer(list(texts), add_special_tokens=False)['input_ids']
+        return [len(ids) for ids in encoded]
+
+    def token_limit(self, name):
+        """Maximum input length of the model in tokens, or None if unknown"""
+        tokenizer = getattr(self.load(name), 'tokenizer', None)
+        limit = getattr(tokenizer, 'model_max_length', None)
+        # Tokenizers without a limit report a huge sentinel value
+        if not limit or limit > 100000:
+            return None
+        return limit
+
+    def status(self):
+        """Load state of every model: loaded, failed, disabled or not_loaded"""
+        status = {}
+        for name in MODEL_SPECS:
+            if self.disabled:
+                status[name] = 'disabled'
+            elif name in self._pipelines:
+                status[name] = 'loaded'
+            elif name in self._errors:
+                status[name] = 'failed'
+            else:
+                status[name] = 'not_loaded'
+        return status
+
+    def warm_up(self, names=None):
+        """Load the given models (all by default) and return their status"""
+        for name in names or MODEL_SPECS:
+            self.load(name)
+        return self.status()
+
+
+class RemoteModels:
+    """Same interface as LocalModels, backed by a model server process"""
+
+    def __init__(self, address, authkey=None):
+        self.address = parse_address(address)
+        self.authkey = authkey or load_authkey()
+        self._available = {}
+
+    def _call(self, command, *args, **kwargs):
+        with Client(self.address, authkey=self.authkey) as connection:
+            connection.send((command, args, kwargs))
+            status, payload = connection.recv()
+        if status == 'error':
+            raise RuntimeError(payload)
+        return payload
+
+    def available(self, name):
+        if name in self._available:
+            return self._available[name]
+        try:
+            available = self._call('available', name)
+        except (OSError, EOFError, RuntimeError) as e:
+            print(f"Warning: Model server unavailable for {name}: {e}")
+            # Retry on a later request rather than remembering the outage
+            return False
+        self._available[name] = available
+        return available
+
+    def run(self, name, inputs, **kwargs):
+        with span('inference'):
+            return self._call('run', name, inputs, **kwargs)
+
+    def count_tokens(self, name, texts):
+        return self._call('count_tokens', name, list(texts))
+
+    def token_limit(self, name):
+        return self._call('token_limit', name)
+
+    def status(self):
+        try:
+            return self._call('status')
+        except (OSError, EOFError, RuntimeError):
+            return {name: 'unreachable' for name in MODEL_SPECS}
+
+    def warm_up(self, names=None):
+        try:
+            return self._call('warm_up', list(names or MODEL_SPECS))
+        except (OSError, EOFError, RuntimeError):
+            return {name: 'unreachable' for name in MODEL_SPECS}
+
+
+_models = None
+_models_lock = threading.Lock()
+
+def get_models():
+    """Return the process-wide model accessor"""
+    global _models
+    with _models_lock:
+        if _models is None:
+            if MODEL_SERVER_ADDRESS:
+                _models = RemoteModels(MODEL_SERVER_ADDRESS)
+            else:
+                _models = LocalModels(disabled=os.getenv('DISABLE_AI_MODELS') == '1')
+        return _models
+
+def set_models(models):
+    """Replace the process-wide model accessor (used by benchmarks to stub models)"""
+    global _models
+    with _models_lock:
+        _models = models
+
+def warm_up_in_background(names=None):
+    """Start loading models on a daemon thread and return immediately"""
+    thread = threading.Thread(target=get_models().warm_up, args=(names,), daemon=True)
+    thread.start()
+    return thread
+
+
+def _handle_connection(connection, models):
+    with connection:
+        try:
+            command, args, kwargs = connection.recv()
+            if command not in SERVER_COMMANDS:
+                raise ValueError(f'Unknown command: {command}')
+            result = getattr(models, command)(*args, **kwargs)
+            connection.send(('ok', result))
+        except EOFError:
+            pass
+        except Exception as e:
+            connection.send(('error', str(e)))
+
+def serve(address, authkey=None, warm_up=False):
+    """Run a model server that answers requests from the web workers"""
+    authkey = authkey or load_authkey(create=True)
+    models = LocalModels()
+    if warm_up:
+        print(f"Loading models: {models.warm_up()}")
+
+    with Listener(parse_address(address), authkey=authkey) as listener:
+        print(f"Model server listening on {address}")
+        while True:
+            try:
+                connection = listener.accept()
+            except Exception as e:
+                print(f"Warning: Rejected model server connection: {e}")
+                continue
+            threading.Thread(target=_handle_connection, args=(connection, models), daemon=True).start()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Shared AI model server for the PDF reader')
+    parser.add_argument('--address', default=MODEL_SERVER_ADDRESS or '127.0.0.1:6001',
+                        help='host:port or Unix socket path to listen on')
+    parser.add_argument('--warmup', action='store_true', help='load all models before accepting requests')
+    args = parser.parse_args()
+    try:
+        serve(args.address, warm_up=args.warmup)
+    except RuntimeError as e:
+        parser.error(str(e))
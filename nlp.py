@@ -0,0 +1,130 @@
+"""Lazily imported NLTK and textstat helpers, and the NLTK data setup step
+
+NLTK and textstat take a noticeable part of a second to import, and a
+process that only serves page images never needs them, so they are
+imported on first use. The NLTK data they need is never downloaded
+implicitly; provision it once per host (or image build) with
+
+    python nlp.py                      # into NLTK's default location
+    python nlp.py --download-dir /opt/nltk_data
+
+and point NLTK_DATA at a non-default directory.
+"""
+import argparse
+import sys
+
+# Where nltk.data.find looks for each data package
+NLTK_RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'punkt_tab': 'tokenizers/punkt_tab',
+    'stopwords': 'corpora/stopwords',
+    'wordnet': 'corpora/wordnet'
+}
+
+# From this release on NLTK loads the Punkt tables from punkt_tab and
+# never reads punkt
+PUNKT_TAB_VERSION = (3, 8, 2)
+
+SETUP_HINT = "run 'python nlp.py' to install the NLTK data"
+
+
+def _missing_data_error(error):
+    return LookupError(f"NLTK data is missing ({SETUP_HINT}): {error}")
+
+def sent_tokenize(text):
+    """NLTK's Punkt sentence tokenizer"""
+    from nltk.tokenize import sent_tokenize as nltk_sent_tokenize
+    try:
+        return nltk_sent_tokenize(text)
+    except LookupError as e:
+        raise _missing_data_error(e) from None
+
+def word_tokenize(text):
+    """NLTK's Treebank word tokenizer"""
+    from nltk.tokenize import word_tokenize as nltk_word_tokenize
+    try:
+        return nltk_word_tokenize(text)
+    except LookupError as e:
+        raise _missing_data_error(e) from None
+
+def stopwords(language='english'):
+    """NLTK's stopword list for a language; LookupError if the corpus is missing"""
+    from nltk.corpus import stopwords as nltk_stopwords
+    return nltk_stopwords.words(language)
+
+def readability(text):
+    """Flesch reading ease and Flesch-Kincaid grade of a text"""
+    import textstat
+    return textstat.flesch_reading_ease(text), textstat.flesch_kincaid_grade(text)
+
+def _version_tuple(version):
+    parts = []
+    for part in version.split('.'):
+        digits = ''.join(char for char in part if char.isdigit())
+        if not digits:
+            break
+        parts.append(int(digits))
+    return tuple(parts)
+
+def nltk_packages():
+    """The NLTK data packages the installed NLTK release needs"""
+    import nltk
+    punkt = 'punkt_tab' if _version_tuple(nltk.__version__) >= PUNKT_TAB_VERSION else 'punkt'
+    return [punkt, 'stopwords', 'wordnet']
+
+def missing_nltk_data(paths=None):
+    """Package ids of the needed NLTK data that is not installed, in paths or NLTK's search path"""
+    import nltk
+    missing = []
+    for package in nltk_packages():
+        try:
+            nltk.data.find(NLTK_RESOURCES[package], paths=paths)
+        except LookupError:
+            missing.append(package)
+    return missing
+
+def setup_nltk(download_dir=None, quiet=False):
+    """Download any missing NLTK data; returns the packages that failed"""
+    import nltk
+    return [package for package in missing_nltk_data([download_dir] if download_dir else None)
+            if not nltk.download(package, download_dir=download_dir, quiet=quiet, raise_on_error=False)]
+
+def check_tokenizers(download_dir=None):
+    """Tokenize a sample text as the app does; returns an error message, or None if it works"""
+    import nltk
+    if download_dir and download_dir not in nltk.data.path:
+        nltk.data.path.insert(0, download_dir)
+    try:
+        for sentence in sent_tokenize("NLTK is installed. This checks the tokenizers."):
+            word_tokenize(sentence)
+        stopwords('english')
+    except LookupError as e:
+        return str(e)
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Install the NLTK data used for summaries and questions")
+    parser.add_argument('--download-dir', help="Install here instead of NLTK's default location")
+    parser.add_argument('--check', action='store_true', help="Only report what is missing")
+    args = parser.parse_args()
+
+    if args.check:
+        missing = missing_nltk_data([args.download_dir] if args.download_dir else None)
+        if missing:
+            print(f"Missing: {', '.join(missing)}")
+            return 1
+    else:
+        failed = setup_nltk(args.download_dir)
+        if failed:
+            print(f"Could not download: {', '.join(failed)}", file=sys.stderr)
+            return 1
+
+    error = check_tokenizers(args.download_dir)
+    if error:
+        print(f"The tokenizers do not work: {error}", file=sys.stderr)
+        return 1
+    print("All NLTK data is installed and the tokenizers work")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,102 @@
+"""Background pre-rendering of the pages around the one being viewed"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PrefetchScheduler:
+    """Renders neighbouring pages on a worker pool so page turns hit the cache
+
+    Each viewer (a web session or the desktop window) is a separate stream.
+    Scheduling a new page for a stream bumps its generation, which cancels
+    queued jobs for the old page/zoom and makes running ones skip their
+    render, so a jump or zoom change never waits behind stale work.
+    """
+
+    def __init__(self, depth=2, max_workers=2):
+        self.depth = depth
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='prefetch')
+        self._lock = threading.Lock()
+        self._generations = {}
+        self._futures = {}
+
+        self.scheduled = 0
+        self.completed = 0
+        self.cancelled = 0
+
+    def neighbours(self, page_index, total_pages, depth=None):
+        """Pages to prefetch, nearest first and favouring forward reading"""
+        depth = self.depth if depth is None else depth
+        pages = []
+        for distance in range(1, depth + 1):
+            for candidate in (page_index + distance, page_index - distance):
+                if 0 <= candidate < total_pages:
+                    pages.append(candidate)
+        return pages
+
+    def schedule(self, stream, page_index, total_pages, render, is_cached=None, depth=None):
+        """Queue render(page) for the neighbours of page_index
+
+        render does the work and stores the result; is_cached(page) lets
+        already-cached pages be skipped without a queue round trip.
+        """
+        with self._lock:
+            generation = self._generations.get(stream, 0) + 1
+            self._generations[stream] = generation
+            self._cancel_futures(stream)
+
+            futures = []
+            for page in self.neighbours(page_index, total_pages, depth):
+                if is_cached is not None and is_cached(page):
+                    continue
+                future = self._executor.submit(self._run, stream, generation, page, render)
+                futures.append(future)
+            self._futures[stream] = futures
+            self.scheduled += len(futures)
+            return len(futures)
+
+    def cancel(self, stream):
+        """Cancel all outstanding work for a stream"""
+        with self._lock:
+            self._generations[stream] = self._generations.get(stream, 0) + 1
+            self._cancel_futures(stream)
+
+    def forget(self, stream):
+        """Cancel a stream's work and drop its bookkeeping"""
+        with self._lock:
+            self._cancel_futures(stream)
+            self._generations.pop(stream, None)
+
+    def pending(self):
+        """Number of queued or running prefetch jobs"""
+        with self._lock:
+            return sum(1 for futures in self._futures.values()
+                       for future in futures if not future.done())
+
+    def shutdown(self):
+        """Stop the worker pool, dropping queued jobs"""
+        with self._lock:
+            for stream in list(self._futures):
+                self._cancel_futures(stream)
+        self._executor.shutdown(wait=False)
+
+    def _cancel_futures(self, stream):
+        for future in self._futures.pop(stream, []):
+            if future.cancel():
+                self.cancelled += 1
+
+    def _is_current(self, stream, generation):
+        with self._lock:
+            return self._generations.get(stream) == generation
+
+    def _run(self, stream, generation, page, render):
+        if not self._is_current(stream, generation):
+            with self._lock:
+                self.cancelled += 1
+            return
+        try:
+            render(page)
+            with self._lock:
+                self.completed += 1
+        except Exception as e:
+            print(f"Warning: Prefetch of page {page + 1} failed: {e}")
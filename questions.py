@@ -0,0 +1,160 @@
+"""Exam question generation from an analyzed document"""
+from nlp import word_tokenize
+from models import get_models
+
+IMPORTANT_KEYWORDS = ['what', 'how', 'why', 'when', 'where', 'which', 'define', 'explain', 'describe']
+
+def generate_multiple_choice_questions(analysis, num_questions):
+    """Generate multiple choice questions using AI"""
+    questions = []
+    
+    models = get_models()
+    if models.available('question_generator'):
+        # Use AI to generate questions
+        prompt = f"Generate {num_questions} multiple choice questions from this text: {analysis.text[:1000]}"
+        response = models.run('question_generator', prompt, max_length=512, num_return_sequences=1)
+        
+        # Parse AI response (simplified)
+        questions = parse_ai_questions(response[0]['generated_text'], 'multiple_choice', num_questions)
+    else:
+        # Rule-based multiple choice generation
+        questions = generate_rule_based_mc_questions(analysis, num_questions)
+    
+    return questions
+
+def generate_theory_questions(analysis, num_questions):
+    """Generate theory questions using AI"""
+    questions = []
+    
+    models = get_models()
+    if models.available('question_generator'):
+        # Use AI to generate questions
+        prompt = f"Generate {num_questions} theory questions from this text: {analysis.text[:1000]}"
+        response = models.run('question_generator', prompt, max_length=512, num_return_sequences=1)
+        
+        # Parse AI response (simplified)
+        questions = parse_ai_questions(response[0]['generated_text'], 'theory', num_questions)
+    else:
+        # Rule-based theory question generation
+        questions = generate_rule_based_theory_questions(analysis, num_questions)
+    
+    return questions
+
+def generate_rule_based_questions(analysis, question_types, num_questions):
+    """Generate questions using rule-based approach"""
+    questions = []
+    
+    important_sentences = []
+    
+    # Find sentences with important keywords; only the first num_questions are used
+    for index, sentence_lower in enumerate(analysis.sentences_lower):
+        if any(keyword in sentence_lower for keyword in IMPORTANT_KEYWORDS):
+            important_sentences.append(index)
+            if len(important_sentences) == num_questions:
+                break
+    
+    if not important_sentences:
+        important_sentences = list(range(min(10, analysis.sentence_count)))  # Use first 10 sentences if no important ones found
+    
+    for i, sentence_index in enumerate(important_sentences[:num_questions]):
+        sentence = analysis.sentences[sentence_index]
+        if 'multiple_choice' in question_types:
+            mc_question = create_multiple_choice_question(sentence, i, analysis.sentence_words[sentence_index])
+            if mc_question:
+                questions.append(mc_question)
+        
+        if 'theory' in question_types and len(questions) < num_questions:
+            theory_question = create_theory_question(sentence, i)
+            if theory_question:
+                questions.append(theory_question)
+    
+    return questions
+
+def generate_rule_based_mc_questions(analysis, num_questions):
+    """Generate multiple choice questions using rules"""
+    questions = []
+    
+    for i, sentence in enumerate(analysis.sentences[:num_questions]):
+        question = create_multiple_choice_question(sentence, i, analysis.sentence_words[i])
+        if question:
+            questions.append(question)
+    
+    return questions
+
+def generate_rule_based_theory_questions(analysis, num_questions):
+    """Generate theory questions using rules"""
+    questions = []
+    
+    for i, sentence in enumerate(analysis.sentences[:num_questions]):
+        question = create_theory_question(sentence, i)
+        if question:
+            questions.append(question)
+    
+    return questions
+
+def create_multiple_choice_question(sentence, index, words=None):
+    """Create a multiple choice question from a sentence and its word tokens"""
+    try:
+        if words is None:
+            words = word_tokenize(sentence)
+        
+        if len(words) < 5:
+            return None
+        
+        question_text = f"What is the main topic discussed in: '{sentence[:100]}...'?"
+        
+        options = [
+            "The main topic",
+            "A related concept", 
+            "An unrelated topic",
+            "None of the above"
+        ]
+        
+        return {
+            'type': 'multiple_choice',
+            'question': question_text,
+            'options': options,
+            'correct_answer': options[0],
+            'explanation': f"This question is based on sentence {index + 1} from the document."
+        }
+    except Exception as e:
+        return None
+
+def create_theory_question(sentence, index):
+    """Create a theory question from a sentence"""
+    try:
+        question_text = f"Explain the concept mentioned in: '{sentence[:100]}...'"
+        
+        return {
+            'type': 'theory',
+            'question': question_text,
+            'expected_answer': f"A detailed explanation of the concept from sentence {index + 1}",
+            'explanation': f"This question requires understanding of the content in sentence {index + 1}."
+        }
+    except Exception as e:
+        return None
+
+def parse_ai_questions(ai_response, question_type, num_questions):
+    """Parse AI-generated questions (simplified)"""
+    questions = []
+    
+    # This is a simplified parser - in a real implementation, you'd need more sophisticated parsing
+    if question_type == 'multiple_choice':
+        for i in range(num_questions):
+            questions.append({
+                'type': 'multiple_choice',
+                'question': f"AI-generated question {i+1}",
+                'options': ["Option A", "Option B", "Option C", "Option D"],
+                'correct_answer': "Option A",
+                'explanation': "AI-generated explanation"
+            })
+    else:
+        for i in range(num_questions):
+            questions.append({
+                'type': 'theory',
+                'question': f"AI-generated theory question {i+1}",
+                'expected_answer': "AI-generated expected answer",
+                'explanation': "AI-generated explanation"
+            })
+    
+    return questions
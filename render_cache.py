@@ -0,0 +1,214 @@
+"""Bounded cache of encoded page images with an optional on-disk tier"""
+import contextlib
+import os
+import threading
+from collections import OrderedDict
+from storage import prune_directory
+
+
+class RenderCache:
+    """Byte-size bounded LRU cache of rendered page images
+
+    Keys are (document hash, page index, quantized zoom, format), with a
+    trailing (column, row, tile size) for tiles of a page. When
+    disk_dir is set, entries evicted from memory are still served from
+    disk, so hot pages survive restarts and memory pressure without
+    going back to MuPDF.
+
+    Values are normally encoded image bytes. An in-memory cache can hold
+    other objects, such as decoded PIL images, if sizeof returns their
+    size in bytes; the disk tier only works with bytes.
+    """
+
+    def __init__(self, max_bytes=128 * 1024 * 1024, disk_dir=None,
+                 max_disk_bytes=1024 * 1024 * 1024, zoom_step=0.05, sizeof=len):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.zoom_step = zoom_step
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._disk_bytes = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._disk_bytes = self._scan_disk_usage()
+
+    def quantize_zoom(self, zoom):
+        """Snap a zoom factor to the cache grid so nearby zooms share entries"""
+        steps = max(1, round(float(zoom) / self.zoom_step))
+        return round(steps * self.zoom_step, 4)
+
+    def make_key(self, doc_hash, page_index, zoom, fmt='png', tile=None):
+        """Build a cache key; zoom is quantized, tile is (column, row, tile size)"""
+        key = (doc_hash, int(page_index), self.quantize_zoom(zoom), fmt)
+        if tile is not None:
+            key += (tuple(int(value) for value in tile),)
+        return key
+
+    def get(self, key):
+        """Return cached bytes for key, or None"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._store_memory(key, data)
+        return data
+
+    def put(self, key, data):
+        """Store encoded image bytes under key"""
+        self._store_memory(key, data)
+        self._write_disk(key, data)
+
+    def get_or_render(self, key, render):
+        """Return cached bytes for key, calling render() on a miss"""
+        data = self.get(key)
+        if data is None:
+            data = render()
+            self.put(key, data)
+        return data
+
+    def contains(self, key):
+        """Whether key is cached in memory or on disk, without counting a lookup"""
+        with self._lock:
+            if key in self._entries:
+                return True
+        path = self._disk_path(key)
+        return path is not None and os.path.exists(path)
+
+    def discard_document(self, doc_hash, disk=False):
+        """Drop all in-memory entries for one document, and with disk its files on disk too"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == doc_hash]:
+                self._bytes -= self.sizeof(self._entries.pop(key))
+
+        if disk and self.disk_dir:
+            directory = os.path.join(self.disk_dir, doc_hash)
+            removed = 0
+            for filename in os.listdir(directory) if os.path.isdir(directory) else []:
+                path = os.path.join(directory, filename)
+                try:
+                    size = os.path.getsize(path)
+                    os.remove(path)
+                    removed += size
+                except OSError:
+                    pass
+            with contextlib.suppress(OSError):
+                os.rmdir(directory)
+            with self._lock:
+                self._disk_bytes = max(0, self._disk_bytes - removed)
+
+    def clear(self):
+        """Drop every in-memory entry"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Counters for monitoring the cache"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'disk_bytes': self._disk_bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': (self.hits + self.disk_hits) / lookups if lookups else 0.0
+            }
+
+    def _store_memory(self, key, data):
+        size = self.sizeof(data)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= self.sizeof(previous)
+
+            self._entries[key] = data
+            self._bytes += size
+
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self.sizeof(evicted)
+                self.evictions += 1
+
+    def _disk_path(self, key):
+        if not self.disk_dir:
+            return None
+        doc_hash, page_index, zoom, fmt = key[:4]
+        name = f'{page_index}_{zoom:g}'
+        if len(key) > 4:
+            name += '_t{}_{}_{}'.format(*key[4])
+        return os.path.join(self.disk_dir, doc_hash, f'{name}.{fmt}')
+
+    def _read_disk(self, key):
+        path = self._disk_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key, data):
+        path = self._disk_path(key)
+        if path is None or os.path.exists(path):
+            return
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary name first so concurrent readers never
+            # see a half-written image
+            temp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not write render cache file {path}: {e}")
+            return
+
+        with self._lock:
+            self._disk_bytes += len(data)
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._prune_disk()
+
+    def _scan_disk_usage(self):
+        total = 0
+        for directory, _, filenames in os.walk(self.disk_dir):
+            for filename in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(directory, filename))
+                except OSError:
+                    pass
+        return total
+
+    def _prune_disk(self):
+        """Delete the least recently written files until under 90% of the budget"""
+        total = prune_directory(self.disk_dir, self.max_disk_bytes)
+        with self._lock:
+            self._disk_bytes = total
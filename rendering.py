@@ -0,0 +1,153 @@
+"""Rendering PDF pages to encoded images"""
+import contextlib
+import io
+import math
+import os
+import threading
+import time
+import fitz  # PyMuPDF
+from PIL import Image
+
+IMAGE_MIMETYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'webp': 'image/webp'
+}
+
+PIL_FORMATS = {
+    'jpg': 'JPEG',
+    'webp': 'WEBP'
+}
+
+# Zoom of the quick first-stage render shown while the full page renders;
+# previews are only worth it when the full render is much larger
+PREVIEW_ZOOM = float(os.getenv('PREVIEW_ZOOM', 0.5))
+PREVIEW_MIN_RATIO = 2.0
+
+
+# From this zoom on pages are drawn as fixed-size tiles, and only the ones
+# in view are rendered, instead of as one huge image
+TILE_SIZE = int(os.getenv('TILE_SIZE', 512))
+TILE_MIN_ZOOM = float(os.getenv('TILE_MIN_ZOOM', 2.0))
+
+# Largest zoom the web app renders, so one request can't ask for a huge image
+MAX_ZOOM = float(os.getenv('MAX_ZOOM', 8.0))
+
+
+def parse_zoom(value):
+    """A requested zoom as a float, or None unless it is a finite number in (0, MAX_ZOOM]"""
+    try:
+        zoom = float(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    if not math.isfinite(zoom) or zoom <= 0 or zoom > MAX_ZOOM:
+        return None
+    return zoom
+
+def wants_preview(zoom):
+    """Whether a page at this zoom should be shown as a preview first"""
+    return PREVIEW_ZOOM > 0 and zoom >= PREVIEW_ZOOM * PREVIEW_MIN_RATIO
+
+def wants_tiles(zoom):
+    """Whether a page at this zoom should be rendered tile by tile"""
+    return TILE_MIN_ZOOM > 0 and zoom >= TILE_MIN_ZOOM
+
+
+class RenderTimings:
+    """Count, total, maximum and last render time for each render stage"""
+
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            timing = self._stages.setdefault(stage, {'count': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0})
+            timing['count'] += 1
+            timing['total'] += seconds
+            timing['max'] = max(timing['max'], seconds)
+            timing['last'] = seconds
+
+    @contextlib.contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def stats(self):
+        """Per-stage timings in milliseconds"""
+        with self._lock:
+            return {stage: {
+                'count': timing['count'],
+                'average_ms': round(timing['total'] * 1000 / timing['count'], 2),
+                'max_ms': round(timing['max'] * 1000, 2),
+                'last_ms': round(timing['last'] * 1000, 2)
+            } for stage, timing in self._stages.items()}
+
+def render_pixmap(page, zoom):
+    """Render a fitz page to an RGB pixmap at the given zoom"""
+    return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+
+def encode_pixmap(pix, fmt='png', quality=85):
+    """Encode a pixmap as png, ppm, jpg or webp bytes"""
+    if fmt in ('png', 'ppm'):
+        return pix.tobytes(fmt)
+
+    if fmt not in PIL_FORMATS:
+        raise ValueError(f'Unsupported image format: {fmt}')
+
+    img = Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+    buffer = io.BytesIO()
+    img.save(buffer, format=PIL_FORMATS[fmt], quality=quality)
+    return buffer.getvalue()
+
+def pixmap_to_image(pix):
+    """Wrap a pixmap's samples in a PIL image without encoding or copying
+
+    The image shares the pixmap's memory where PyMuPDF exposes it as a
+    memoryview, and keeps a reference to the pixmap so it stays valid.
+    """
+    mode = 'RGBA' if pix.alpha else 'RGB'
+    samples = getattr(pix, 'samples_mv', None) or pix.samples
+    img = Image.frombuffer(mode, (pix.width, pix.height), samples, 'raw', mode, pix.stride, 1)
+    img.info['pixmap'] = pix
+    return img
+
+def image_size(img):
+    """Memory held by a decoded image in bytes"""
+    return img.width * img.height * len(img.getbands())
+
+def render_page_image(document, page_index, zoom):
+    """Render one page straight to a PIL image, skipping any image encoding"""
+    return pixmap_to_image(render_pixmap(document[page_index], zoom))
+
+def render_page(document, page_index, zoom, fmt='png'):
+    """Render one page of an open document to encoded image bytes"""
+    pix = render_pixmap(document[page_index], zoom)
+    return encode_pixmap(pix, fmt)
+
+def tile_grid(page_rect, zoom, tile_size=TILE_SIZE):
+    """Number of (columns, rows) of tiles covering a page at zoom"""
+    width = math.ceil(page_rect.width * zoom)
+    height = math.ceil(page_rect.height * zoom)
+    return -(-width // tile_size), -(-height // tile_size)
+
+def tile_clip(page_rect, zoom, column, row, tile_size=TILE_SIZE):
+    """Area of the page, in page coordinates, covered by one tile"""
+    span = tile_size / zoom
+    x0 = page_rect.x0 + column * span
+    y0 = page_rect.y0 + row * span
+    return fitz.Rect(x0, y0, min(x0 + span, page_rect.x1), min(y0 + span, page_rect.y1))
+
+def render_tile_pixmap(document, page_index, zoom, column, row, tile_size=TILE_SIZE):
+    """Render one tile of a page to a pixmap
+
+    Only the tile's clip rectangle is rasterized, so memory and time
+    depend on the tile size rather than on the whole page at this zoom.
+    Tiles on the right and bottom edges may be smaller than tile_size.
+    """
+    page = document[page_index]
+    clip = tile_clip(page.rect, zoom, column, row, tile_size)
+    return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, alpha=False)
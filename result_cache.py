@@ -0,0 +1,155 @@
+"""Persistent, content-addressed cache of analysis results"""
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+RESULT_CACHE_PATH = os.getenv('RESULT_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'pdfreader_results.sqlite3'))
+RESULT_CACHE_MB = int(os.getenv('RESULT_CACHE_MB', 256))
+
+
+class ResultCache:
+    """SQLite-backed cache of extracted text, summaries and questions
+
+    Results are keyed by the PDF's content hash, the kind of result and
+    the parameters that produced it (model name, question types, count),
+    so re-uploading the same file returns them without recomputing. The
+    database is safe to share between threads and worker processes. When
+    the stored results exceed max_bytes the least recently used ones are
+    deleted.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = bool(path) and max_bytes > 0
+        self._local = threading.local()
+
+        self.hits = 0
+        self.misses = 0
+
+        if self.enabled:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            with self._connection() as connection:
+                connection.execute('''
+                    CREATE TABLE IF NOT EXISTS results (
+                        key TEXT PRIMARY KEY,
+                        content_hash TEXT NOT NULL,
+                        kind TEXT NOT NULL,
+                        params TEXT NOT NULL,
+                        value TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )
+                ''')
+                connection.execute(
+                    'CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at)')
+
+    @staticmethod
+    def make_key(content_hash, kind, params=None):
+        """Stable key for a result; params must be JSON serialisable"""
+        raw = json.dumps([content_hash, kind, params or {}], sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, content_hash, kind, params=None):
+        """Return the cached value or None"""
+        if not self.enabled:
+            return None
+
+        key = self.make_key(content_hash, kind, params)
+        try:
+            with self._connection() as connection:
+                row = connection.execute(
+                    'SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    connection.execute(
+                        'UPDATE results SET accessed_at = ? WHERE key = ?', (time.time(), key))
+        except sqlite3.Error as e:
+            print(f"Warning: Result cache read failed: {e}")
+            return None
+
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, content_hash, kind, params, value):
+        """Store a JSON serialisable value"""
+        if not self.enabled:
+            return
+
+        key = self.make_key(content_hash, kind, params)
+        encoded = json.dumps(value)
+        now = time.time()
+        try:
+            with self._connection() as connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (key, content_hash, kind, json.dumps(params or {}, sort_keys=True),
+                     encoded, len(encoded), now, now))
+                self._evict(connection)
+        except sqlite3.Error as e:
+            print(f"Warning: Result cache write failed: {e}")
+
+    def get_or_compute(self, content_hash, kind, params, compute):
+        """Return the cached value, calling compute() and storing its result on a miss"""
+        value = self.get(content_hash, kind, params)
+        if value is None:
+            value = compute()
+            self.put(content_hash, kind, params, value)
+        return value
+
+    def discard(self, content_hash):
+        """Delete every result for one document"""
+        if not self.enabled:
+            return
+        with self._connection() as connection:
+            connection.execute('DELETE FROM results WHERE content_hash = ?', (content_hash,))
+
+    def stats(self):
+        """Entry count, stored bytes and hit/miss counters"""
+        count, size = 0, 0
+        if self.enabled:
+            with self._connection() as connection:
+                count, size = connection.execute(
+                    'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'entries': count,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0
+        }
+
+    def _connection(self):
+        # One connection per thread; sqlite3 connections must not be shared
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def _evict(self, connection):
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Delete least recently used results until under 90% of the budget
+        target = self.max_bytes * 0.9
+        rows = connection.execute('SELECT key, size FROM results ORDER BY accessed_at').fetchall()
+        doomed = []
+        for key, size in rows:
+            if total <= target:
+                break
+            doomed.append((key,))
+            total -= size
+        connection.executemany('DELETE FROM results WHERE key = ?', doomed)
@@ -0,0 +1,197 @@
+"""Full-text search over a document's extracted pages"""
+import json
+import math
+import os
+import re
+import struct
+import sys
+import threading
+from array import array
+from itertools import groupby
+
+TOKEN_PATTERN = re.compile(r'\w+')
+PAGE_SPLIT = re.compile(r'\n--- Page (\d+) ---\n')
+INDEX_VERSION = 1
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    """Yield (term, offset) for each word in text; terms are lowercase"""
+    for match in TOKEN_PATTERN.finditer(text):
+        yield match.group().lower(), match.start()
+
+
+class SearchIndex:
+    """Inverted index mapping each term to the pages and offsets it occurs at
+
+    Pages are added one at a time as they are extracted. Postings for all
+    terms live in a single flat array of (page, offset) pairs, sorted by
+    page then offset, and each term records where its run starts and how
+    long it is. Page texts are kept for building snippets.
+    """
+
+    def __init__(self):
+        self.pages = {}
+        self.page_lengths = {}
+        self._terms = {}
+        self._postings = array('I')
+        # Postings of pages added since the last finalize()
+        self._pending = {}
+
+    def __len__(self):
+        return len(self.pages)
+
+    @classmethod
+    def from_document_text(cls, text):
+        """Index text in the '--- Page N ---' format produced by extraction"""
+        index = cls()
+        parts = PAGE_SPLIT.split(text)
+        for page_number, page_text in zip(parts[1::2], parts[2::2]):
+            index.add_page(int(page_number), page_text[:-1] if page_text.endswith('\n') else page_text)
+        index.finalize()
+        return index
+
+    def add_page(self, page_number, text):
+        """Index one page; pages must be added in increasing page order"""
+        self.pages[page_number] = text
+        length = 0
+        for term, offset in tokenize(text):
+            postings = self._pending.get(term)
+            if postings is None:
+                postings = self._pending[term] = array('I')
+            postings.append(page_number)
+            postings.append(offset)
+            length += 1
+        self.page_lengths[page_number] = length
+
+    def finalize(self):
+        """Merge pending postings into the compact flat array"""
+        if not self._pending:
+            return
+
+        postings = array('I')
+        terms = {}
+        for term in self._terms.keys() | self._pending.keys():
+            start = len(postings) // 2
+            if term in self._terms:
+                old_start, count = self._terms[term]
+                postings.extend(self._postings[old_start * 2:(old_start + count) * 2])
+            if term in self._pending:
+                postings.extend(self._pending[term])
+            terms[term] = (start, len(postings) // 2 - start)
+
+        self._postings = postings
+        self._terms = terms
+        self._pending = {}
+
+    def postings(self, term):
+        """Flat array of (page, offset) pairs for a term"""
+        start, count = self._terms.get(term, (0, 0))
+        return self._postings[start * 2:(start + count) * 2]
+
+    def search(self, query, limit=10, snippet_width=160):
+        """Rank pages for a query with BM25
+
+        Pages containing more of the query's terms rank first, then by
+        score. Returns dicts with page, score, matches (occurrences of
+        query terms on the page) and a snippet around the first match.
+        """
+        self.finalize()
+        terms = list(dict.fromkeys(term for term, _ in tokenize(query)))
+        if not terms or not self.pages:
+            return []
+
+        page_count = len(self.pages)
+        average_length = sum(self.page_lengths.values()) / page_count or 1.0
+        scores = {}
+        matched_terms = {}
+        matches = {}
+        first_offset = {}
+
+        for term in terms:
+            postings = self.postings(term)
+            term_pages = [(page, list(offsets)) for page, offsets in
+                          groupby(zip(postings[0::2], postings[1::2]), key=lambda pair: pair[0])]
+            if not term_pages:
+                continue
+
+            idf = math.log(1 + (page_count - len(term_pages) + 0.5) / (len(term_pages) + 0.5))
+            for page, occurrences in term_pages:
+                frequency = len(occurrences)
+                length_norm = 1 - B + B * self.page_lengths[page] / average_length
+                scores[page] = scores.get(page, 0.0) + idf * frequency * (K1 + 1) / (frequency + K1 * length_norm)
+                matched_terms[page] = matched_terms.get(page, 0) + 1
+                matches[page] = matches.get(page, 0) + frequency
+                offset = occurrences[0][1]
+                first_offset[page] = min(first_offset.get(page, offset), offset)
+
+        ranked = sorted(scores, key=lambda page: (matched_terms[page], scores[page]), reverse=True)
+        return [{
+            'page': page,
+            'score': round(scores[page], 4),
+            'matches': matches[page],
+            'snippet': self.snippet(page, first_offset[page], snippet_width)
+        } for page in ranked[:limit]]
+
+    def snippet(self, page_number, offset, width=160):
+        """Whitespace-collapsed text around offset on a page"""
+        text = self.pages.get(page_number, '')
+        start = max(0, offset - width // 3)
+        end = min(len(text), start + width)
+        snippet = ' '.join(text[start:end].split())
+        if start > 0:
+            snippet = '...' + snippet
+        if end < len(text):
+            snippet += '...'
+        return snippet
+
+    def memory_usage(self):
+        """Rough estimate of the memory held by the index in bytes"""
+        self.finalize()
+        size = len(self._postings) * self._postings.itemsize
+        size += sum(len(text) for text in self.pages.values()) * 2
+        size += len(self._terms) * 120
+        return size
+
+    def save(self, path):
+        """Write the index to path atomically"""
+        self.finalize()
+        header = json.dumps({
+            'version': INDEX_VERSION,
+            'byteorder': sys.byteorder,
+            'pages': {str(page): text for page, text in self.pages.items()},
+            'page_lengths': {str(page): length for page, length in self.page_lengths.items()},
+            'terms': self._terms
+        }).encode('utf-8')
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(struct.pack('<Q', len(header)))
+            f.write(header)
+            self._postings.tofile(f)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read an index written by save(), or return None if it is missing or unusable"""
+        try:
+            with open(path, 'rb') as f:
+                header_length, = struct.unpack('<Q', f.read(8))
+                header = json.loads(f.read(header_length).decode('utf-8'))
+                if header.get('version') != INDEX_VERSION or header.get('byteorder') != sys.byteorder:
+                    return None
+                postings = array('I')
+                postings.frombytes(f.read())
+        except (OSError, ValueError, struct.error):
+            return None
+
+        index = cls()
+        index.pages = {int(page): text for page, text in header['pages'].items()}
+        index.page_lengths = {int(page): length for page, length in header['page_lengths'].items()}
+        index._terms = {term: tuple(span) for term, span in header['terms'].items()}
+        index._postings = postings
+        return index
@@ -0,0 +1,266 @@
+"""Sentence-by-sentence text-to-speech with synthesis running ahead of playback"""
+import os
+import queue
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import wave
+
+# Sentences synthesized and waiting to be played
+SYNTHESIS_AHEAD = int(os.getenv('TTS_SYNTHESIS_AHEAD', 3))
+
+# Engines stumble over very long runs of text without punctuation
+MAX_SENTENCE_CHARS = 400
+
+SENTENCE_BREAK = re.compile(r'[.!?]+["\')\]]*\s+(?=["\'(\[]?[A-Z0-9])')
+ABBREVIATIONS = {'al', 'approx', 'cf', 'dr', 'e.g', 'eg', 'etc', 'fig', 'i.e', 'ie', 'jr', 'mr',
+                 'mrs', 'ms', 'no', 'p', 'pp', 'prof', 'sr', 'st', 'vol', 'vs'}
+
+
+def clean_text_for_speech(text):
+    """Collapse whitespace and drop characters engines read out literally"""
+    text = ' '.join(text.split())
+    return re.sub(r'[^\w\s\.\,\!\?\-]', '', text)
+
+def split_sentences_regex(text):
+    """Split text at sentence punctuation, skipping abbreviations and initials"""
+    sentences = []
+    start = 0
+    for match in SENTENCE_BREAK.finditer(text):
+        words = text[start:match.start()].split()
+        last_word = words[-1].lower().rstrip('.') if words else ''
+        if text[match.start()] == '.' and (last_word in ABBREVIATIONS or
+                                           (len(last_word) == 1 and last_word.isalpha())):
+            continue
+        sentences.append(text[start:match.end()].strip())
+        start = match.end()
+    if text[start:].strip():
+        sentences.append(text[start:].strip())
+    return sentences
+
+def split_long_sentence(sentence, max_chars=MAX_SENTENCE_CHARS):
+    """Break a sentence longer than max_chars at commas, or else at spaces"""
+    pieces = []
+    while len(sentence) > max_chars:
+        cut = sentence.rfind(', ', 0, max_chars)
+        if cut <= 0:
+            cut = sentence.rfind(' ', 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(sentence[:cut + 1].strip())
+        sentence = sentence[cut + 1:].strip()
+    if sentence:
+        pieces.append(sentence)
+    return pieces
+
+def split_sentences(text):
+    """Split text into sentences short enough to synthesize one at a time
+
+    Uses NLTK's Punkt tokenizer when it and its data are installed, and a
+    regular expression otherwise.
+    """
+    try:
+        from nlp import sent_tokenize
+        sentences = sent_tokenize(text)
+    except (ImportError, LookupError):
+        sentences = split_sentences_regex(text)
+    return [piece for sentence in sentences for piece in split_long_sentence(sentence)]
+
+
+class WavPlayer:
+    """Plays audio files one at a time, stopping early when asked
+
+    Uses winsound on Windows and a command-line player (afplay, paplay,
+    aplay or ffplay) elsewhere. available is False when there is none.
+    """
+
+    COMMANDS = [['paplay'], ['aplay', '-q'], ['ffplay', '-nodisp', '-autoexit', '-loglevel', 'quiet']]
+
+    def __init__(self):
+        self.command = None
+        if sys.platform == 'darwin':
+            self.command = ['afplay']
+        elif sys.platform != 'win32':
+            self.command = next((command for command in self.COMMANDS if shutil.which(command[0])), None)
+
+    @property
+    def available(self):
+        return sys.platform == 'win32' or self.command is not None
+
+    def play(self, path, stop_event):
+        """Play a file to the end; returns False if stop_event interrupted it"""
+        if sys.platform == 'win32':
+            import winsound
+            with wave.open(path, 'rb') as f:
+                duration = f.getnframes() / f.getframerate()
+            winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
+            if stop_event.wait(duration):
+                winsound.PlaySound(None, winsound.SND_PURGE)
+                return False
+            return True
+
+        process = subprocess.Popen(self.command + [path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        while process.poll() is None:
+            if stop_event.wait(0.05):
+                process.terminate()
+                process.wait()
+                return False
+        return True
+
+
+class SpeechPipeline:
+    """Speaks a list of sentences, synthesizing ahead of playback
+
+    While one sentence plays, a producer thread renders the next ones to
+    WAV files with the engine's save_to_file, keeping up to `ahead` of
+    them ready, so there is no synthesis gap between sentences. position
+    is the index of the sentence being spoken; stop() leaves it there so
+    the next start() resumes from that sentence. Without an audio player
+    sentences are spoken live with say() and runAndWait().
+
+    The callbacks run on the pipeline's threads: on_sentence(index, total)
+    as each sentence starts, on_finish() after the last one and
+    on_error(exception) if synthesis or playback fails.
+    """
+
+    def __init__(self, engine, ahead=SYNTHESIS_AHEAD, player=None,
+                 on_sentence=None, on_finish=None, on_error=None):
+        self.engine = engine
+        self.ahead = max(1, ahead)
+        self.player = player or WavPlayer()
+        self.on_sentence = on_sentence
+        self.on_finish = on_finish
+        self.on_error = on_error
+        self.sentences = []
+        self.position = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop_event.is_set()
+
+    def load(self, sentences):
+        """Replace the sentences to speak and rewind to the first"""
+        self.stop()
+        self.sentences = list(sentences)
+        self.position = 0
+
+    def start(self):
+        """Speak from the current position"""
+        if self.is_running or not self.sentences:
+            return
+        if self.position >= len(self.sentences):
+            self.position = 0
+
+        # The previous run is still winding down if it was stopped just
+        # now; the new one waits for it so only one uses the engine
+        previous = self._thread
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(previous, self._stop_event),
+                                        daemon=True, name='speech')
+        self._thread.start()
+
+    def stop(self, rewind=False):
+        """Stop speaking, keeping the position unless rewind is set"""
+        self._stop_event.set()
+        try:
+            self.engine.stop()
+        except Exception:
+            pass
+        if rewind:
+            self.position = 0
+
+    def _run(self, previous, stop_event):
+        if previous is not None:
+            previous.join()
+        if stop_event.is_set():
+            return
+        try:
+            if self.player.available:
+                finished = self._play_ahead(stop_event)
+            else:
+                finished = self._speak_live(stop_event)
+        except Exception as e:
+            stop_event.set()
+            if self.on_error:
+                self.on_error(e)
+            return
+        if finished:
+            self.position = len(self.sentences)
+            stop_event.set()
+            if self.on_finish:
+                self.on_finish()
+
+    def _notify(self, index):
+        self.position = index
+        if self.on_sentence:
+            self.on_sentence(index, len(self.sentences))
+
+    def _speak_live(self, stop_event):
+        for index in range(self.position, len(self.sentences)):
+            if stop_event.is_set():
+                return False
+            self._notify(index)
+            self.engine.say(self.sentences[index])
+            self.engine.runAndWait()
+        return not stop_event.is_set()
+
+    def _play_ahead(self, stop_event):
+        ready = queue.Queue(maxsize=self.ahead)
+        directory = tempfile.mkdtemp(prefix='pdf-reader-speech-')
+        producer_stop = threading.Event()
+        producer = threading.Thread(target=self._synthesize,
+                                    args=(self.position, ready, directory, producer_stop),
+                                    daemon=True, name='speech-synthesis')
+        producer.start()
+        try:
+            while not stop_event.is_set():
+                try:
+                    item = ready.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is None:
+                    return True
+                if isinstance(item, Exception):
+                    raise item
+                index, path = item
+                self._notify(index)
+                played = os.path.getsize(path) == 0 or self.player.play(path, stop_event)
+                os.remove(path)
+                if not played:
+                    return False
+            return False
+        finally:
+            producer_stop.set()
+            producer.join()
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _synthesize(self, start, ready, directory, stop_event):
+        """Producer: render sentences to files until done or stopped"""
+        def put(item):
+            while not stop_event.is_set():
+                try:
+                    ready.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        try:
+            for index in range(start, len(self.sentences)):
+                if stop_event.is_set():
+                    return
+                path = os.path.join(directory, f'{index}.wav')
+                self.engine.save_to_file(self.sentences[index], path)
+                self.engine.runAndWait()
+                if not os.path.exists(path):
+                    open(path, 'wb').close()
+                if not put((index, path)):
+                    return
+            put(None)
+        except Exception as e:
+            put(e)
@@ -4,10 +4,17 @@ console.log('PDF Reader App loaded');
 let currentPage = 1;
 let totalPages = 1;
 let currentZoom = 1.5;
+let documentVersion = '';
+let pageFormat = 'png';
 let extractedText = '';
 let isReading = false;
 let speechSynthesis = window.speechSynthesis;
 let currentUtterance = null;
+let currentJobId = null;
+let searchHighlights = null;
+let pageLoadId = 0;
+let tileState = null;
+let tileFrameRequested = false;
 
 // DOM elements
 const uploadSection = document.getElementById('uploadSection');
@@ -15,6 +22,10 @@ const viewerSection = document.getElementById('viewerSection');
 const uploadArea = document.getElementById('uploadArea');
 const pdfFile = document.getElementById('pdfFile');
 const pageImage = document.getElementById('pageImage');
+const pageFrame = document.getElementById('pageFrame');
+const pdfContainer = document.querySelector('.pdf-container');
+const searchResults = document.getElementById('searchResults');
+const thumbnailStrip = document.getElementById('thumbnailStrip');
 const pageInfo = document.getElementById('pageInfo');
 const textViewer = document.getElementById('textViewer');
 const statusText = document.getElementById('statusText');
@@ -32,6 +43,10 @@ document.addEventListener('DOMContentLoaded', function() {
 });
 
 function initializeEventListeners() {
+    // Load the tiles that scroll into view at high zoom
+    pdfContainer.addEventListener('scroll', requestVisibleTiles);
+    window.addEventListener('resize', requestVisibleTiles);
+    
     // File upload events
     pdfFile.addEventListener('change', handleFileSelect);
     
@@ -84,13 +99,13 @@ async function uploadPDF(file) {
     showLoading(true);
     updateStatus('Uploading PDF...');
     
-    const formData = new FormData();
-    formData.append('file', file);
-    
     try {
-        const response = await fetch('/upload', {
+        // Send the file itself as the body so the server can stream it
+        // to disk without parsing a multipart form
+        const response = await fetch(`/upload?filename=${encodeURIComponent(file.name)}`, {
             method: 'POST',
-            body: formData
+            headers: { 'Content-Type': 'application/pdf' },
+            body: file
         });
         
         const data = await response.json();
@@ -98,7 +113,12 @@ async function uploadPDF(file) {
         if (data.success) {
             currentPage = data.current_page;
             totalPages = data.total_pages;
-            pageImage.src = data.page_image;
+            documentVersion = data.document_version;
+            searchHighlights = null;
+            searchResults.innerHTML = '';
+            buildThumbnailStrip();
+            clearTiles();
+            await showPageImage(data.page_url);
             updatePageInfo();
             showViewer();
             updateStatus(`Loaded: ${data.filename} - ${totalPages} pages`);
@@ -128,29 +148,244 @@ async function previousPage() {
 }
 
 async function loadPage(pageNum) {
+    // A newer navigation supersedes this one; its images must not be shown
+    const loadId = ++pageLoadId;
     showLoading(true);
     updateStatus(`Loading page ${pageNum}...`);
     
     try {
-        const response = await fetch(`/page/${pageNum}?zoom=${currentZoom}`);
+        const params = new URLSearchParams({ zoom: currentZoom.toFixed(2), format: pageFormat });
+        const response = await fetch(`/page/${pageNum}?${params}`);
         const data = await response.json();
+        if (!data.success) {
+            throw new Error(data.error);
+        }
         
-        if (data.success) {
-            currentPage = data.current_page;
-            pageImage.src = data.page_image;
+        // Pages that still need rendering come with a quick low resolution
+        // preview, shown at full size until the sharp image arrives
+        if (data.preview_url) {
+            const preview = await loadImage(data.preview_url);
+            if (loadId !== pageLoadId) return;
+            clearTiles();
+            displayPageImage(preview.src, data.width);
+            currentPage = pageNum;
             updatePageInfo();
-            updateStatus(`Page ${currentPage} of ${totalPages}`);
+            showLoading(false);
+        }
+        
+        if (data.tiles) {
+            // At high zoom only the tiles in view are rendered, drawn over
+            // the stretched preview of the whole page
+            showTiles(pageNum, data.tiles);
         } else {
-            showNotification(data.error, 'error');
+            // Images are fetched directly so the browser can cache and revalidate them
+            const full = await loadImage(data.page_url);
+            if (loadId !== pageLoadId) return;
+            clearTiles();
+            displayPageImage(full.src);
         }
+        currentPage = pageNum;
+        drawSearchHighlights();
+        markCurrentThumbnail();
+        updatePageInfo();
+        updateStatus(`Page ${currentPage} of ${totalPages}`);
     } catch (error) {
         showNotification('Error loading page', 'error');
         console.error('Page load error:', error);
     } finally {
-        showLoading(false);
+        if (loadId === pageLoadId) {
+            showLoading(false);
+        }
+    }
+}
+
+function loadImage(url) {
+    return new Promise((resolve, reject) => {
+        const img = new Image();
+        img.onload = () => resolve(img);
+        img.onerror = () => reject(new Error(`Could not load ${url}`));
+        img.src = url;
+    });
+}
+
+function displayPageImage(url, width = null) {
+    // A preview is stretched to the width of the full image it stands in for
+    if (width) {
+        pageImage.width = width;
+    } else {
+        pageImage.removeAttribute('width');
+    }
+    pageImage.src = url;
+}
+
+async function showPageImage(url) {
+    displayPageImage((await loadImage(url)).src);
+}
+
+// Tiled rendering
+function tileUrl(pageNum, zoom, column, row) {
+    const params = new URLSearchParams({ format: pageFormat, v: documentVersion });
+    return `/page/${pageNum}/tile/${zoom}/${column}/${row}?${params}`;
+}
+
+function showTiles(pageNum, tiles) {
+    pageFrame.classList.add('tiled');
+    tileState = { pageNum, ...tiles, loaded: new Set() };
+    loadVisibleTiles();
+}
+
+function clearTiles() {
+    pageFrame.querySelectorAll('.page-tile').forEach(tile => tile.remove());
+    pageFrame.classList.remove('tiled');
+    tileState = null;
+}
+
+function loadVisibleTiles() {
+    tileFrameRequested = false;
+    if (!tileState) {
+        return;
+    }
+    
+    // Visible part of the page in image pixels, with one tile of margin
+    const { size, columns, rows } = tileState;
+    const frame = pageFrame.getBoundingClientRect();
+    const view = pdfContainer.getBoundingClientRect();
+    const firstColumn = Math.max(0, Math.floor((view.left - frame.left) / size) - 1);
+    const lastColumn = Math.min(columns - 1, Math.floor((view.right - frame.left) / size) + 1);
+    const firstRow = Math.max(0, Math.floor((view.top - frame.top) / size) - 1);
+    const lastRow = Math.min(rows - 1, Math.floor((view.bottom - frame.top) / size) + 1);
+    
+    for (let row = firstRow; row <= lastRow; row++) {
+        for (let column = firstColumn; column <= lastColumn; column++) {
+            const key = `${column},${row}`;
+            if (tileState.loaded.has(key)) {
+                continue;
+            }
+            tileState.loaded.add(key);
+            
+            const tile = document.createElement('img');
+            tile.className = 'page-tile';
+            tile.alt = '';
+            tile.style.left = `${column * size}px`;
+            tile.style.top = `${row * size}px`;
+            tile.src = tileUrl(tileState.pageNum, tileState.zoom, column, row);
+            pageFrame.appendChild(tile);
+        }
     }
 }
 
+function requestVisibleTiles() {
+    // Scroll events fire far more often than frames are drawn
+    if (tileState && !tileFrameRequested) {
+        tileFrameRequested = true;
+        requestAnimationFrame(loadVisibleTiles);
+    }
+}
+
+// Thumbnails
+function buildThumbnailStrip() {
+    // The browser only fetches thumbnails as they scroll into view; a
+    // background job renders the rest so they are ready when it does
+    thumbnailStrip.innerHTML = '';
+    for (let pageNum = 1; pageNum <= totalPages; pageNum++) {
+        const thumbnail = document.createElement('img');
+        thumbnail.className = 'thumbnail';
+        thumbnail.loading = 'lazy';
+        thumbnail.alt = `Page ${pageNum}`;
+        thumbnail.title = `Page ${pageNum}`;
+        thumbnail.src = `/thumbnail/${pageNum}.webp?v=${documentVersion}`;
+        thumbnail.addEventListener('click', () => loadPage(pageNum));
+        thumbnailStrip.appendChild(thumbnail);
+    }
+    markCurrentThumbnail();
+    
+    fetch('/jobs', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ type: 'thumbnails' })
+    }).catch(error => console.error('Thumbnail job error:', error));
+}
+
+function markCurrentThumbnail() {
+    const previous = thumbnailStrip.querySelector('.thumbnail.active');
+    if (previous) {
+        previous.classList.remove('active');
+    }
+    const current = thumbnailStrip.children[currentPage - 1];
+    if (current) {
+        current.classList.add('active');
+        current.scrollIntoView({ block: 'nearest' });
+    }
+}
+
+// Search functions
+async function searchDocument(event) {
+    event.preventDefault();
+    const query = document.getElementById('searchInput').value.trim();
+    if (!query) {
+        return;
+    }
+    
+    updateStatus('Searching...');
+    try {
+        const response = await fetch(`/search?${new URLSearchParams({ q: query })}`);
+        const data = await response.json();
+        
+        if (data.success) {
+            displaySearchResults(data.hits);
+            updateStatus(`${data.hits.length} pages match "${query}" (${data.took_ms} ms)`);
+        } else {
+            showNotification(data.error, 'error');
+        }
+    } catch (error) {
+        showNotification('Error searching document', 'error');
+        console.error('Search error:', error);
+    }
+}
+
+function displaySearchResults(hits) {
+    searchResults.innerHTML = '';
+    if (hits.length === 0) {
+        searchResults.innerHTML = '<p class="placeholder">No matches</p>';
+        return;
+    }
+    
+    hits.forEach(hit => {
+        const item = document.createElement('div');
+        item.className = 'search-hit';
+        const title = document.createElement('strong');
+        title.textContent = `Page ${hit.page} (${hit.matches} matches)`;
+        const snippet = document.createElement('span');
+        snippet.textContent = hit.snippet;
+        item.append(title, snippet);
+        item.addEventListener('click', () => {
+            searchHighlights = hit;
+            switchTab('viewer');
+            loadPage(hit.page);
+        });
+        searchResults.appendChild(item);
+    });
+}
+
+function drawSearchHighlights() {
+    pageFrame.querySelectorAll('.search-highlight').forEach(element => element.remove());
+    if (!searchHighlights || searchHighlights.page !== currentPage) {
+        return;
+    }
+    
+    // Rectangles are in PDF points; scale them to the displayed image
+    const scale = pageImage.clientWidth / searchHighlights.page_size[0];
+    searchHighlights.rects.forEach(([x0, y0, x1, y1]) => {
+        const box = document.createElement('div');
+        box.className = 'search-highlight';
+        box.style.left = `${x0 * scale}px`;
+        box.style.top = `${y0 * scale}px`;
+        box.style.width = `${(x1 - x0) * scale}px`;
+        box.style.height = `${(y1 - y0) * scale}px`;
+        pageFrame.appendChild(box);
+    });
+}
+
 // Zoom functions
 async function zoomIn() {
     currentZoom = Math.min(currentZoom * 1.2, 3.0);
@@ -172,19 +407,51 @@ async function extractText() {
     showLoading(true);
     updateStatus('Extracting text...');
     
+    // Pages are streamed as NDJSON so the first ones show up while the
+    // rest of the document is still being extracted
+    const pages = [];
+    extractedText = '';
+    textViewer.value = '';
+    
     try {
-        const response = await fetch('/extract-text');
-        const data = await response.json();
-        
-        if (data.success) {
-            extractedText = data.text;
-            textViewer.value = extractedText;
-            switchTab('text');
-            updateStatus(`Text extracted from ${data.total_pages} pages - Ready for audio reading`);
-            showNotification('Text extracted successfully!', 'success');
-        } else {
+        const response = await fetch('/extract-text/stream');
+        if (!response.ok) {
+            const data = await response.json();
             showNotification(data.error, 'error');
+            return;
+        }
+        
+        let completed = null;
+        for await (const message of readNDJSON(response)) {
+            if (message.error) {
+                showNotification(message.error, 'error');
+                return;
+            }
+            
+            if (message.done) {
+                completed = message;
+                break;
+            }
+            
+            if (pages.length === 0) {
+                showLoading(false);
+                switchTab('text');
+            }
+            pages.push(message.text);
+            appendExtractedText(message.text);
+            updateStatus(`Extracting text... page ${message.page} of ${message.total_pages}`);
         }
+        
+        if (!completed) {
+            showNotification('Text extraction was interrupted', 'error');
+            return;
+        }
+        
+        extractedText = pages.join('');
+        pendingText = [];
+        textViewer.value = extractedText;
+        updateStatus(`Text extracted from ${completed.total_pages} pages - Ready for audio reading`);
+        showNotification('Text extracted successfully!', 'success');
     } catch (error) {
         showNotification('Error extracting text', 'error');
         console.error('Text extraction error:', error);
@@ -193,6 +460,39 @@ async function extractText() {
     }
 }
 
+// Batch textarea updates to one per animation frame; appending every page
+// separately re-lays out the whole textarea each time
+let pendingText = [];
+function appendExtractedText(text) {
+    if (pendingText.length === 0) {
+        requestAnimationFrame(() => {
+            textViewer.value += pendingText.join('');
+            pendingText = [];
+        });
+    }
+    pendingText.push(text);
+}
+
+async function* readNDJSON(response) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        for (const line of lines) {
+            if (line.trim()) yield JSON.parse(line);
+        }
+    }
+    
+    if (buffer.trim()) yield JSON.parse(buffer);
+}
+
 async function saveText() {
     if (!extractedText.trim()) {
         showNotification('No text to save. Please extract text first.', 'warning');
@@ -247,22 +547,17 @@ async function summarizePDF() {
     updateStatus('Generating summary...');
     
     try {
-        const response = await fetch('/summarize', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            }
-        });
+        const job = await runJob({ type: 'summarize' });
         
-        const data = await response.json();
-        
-        if (data.success) {
-            displaySummary(data);
+        if (job.status === 'succeeded') {
+            displaySummary(job.result);
             switchTab('summary');
             updateStatus('Summary generated successfully');
             showNotification('PDF summarized successfully!', 'success');
+        } else if (job.status === 'cancelled') {
+            updateStatus('Summary cancelled');
         } else {
-            showNotification(data.error, 'error');
+            showNotification(job.error, 'error');
         }
     } catch (error) {
         showNotification('Error generating summary', 'error');
@@ -337,26 +632,22 @@ async function generateQuestions() {
         if (mcQuestions) questionTypes.push('multiple_choice');
         if (theoryQuestions) questionTypes.push('theory');
         
-        const response = await fetch('/generate-questions', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                types: questionTypes,
-                count: questionCount
-            })
+        const job = await runJob({
+            type: 'questions',
+            types: questionTypes,
+            count: questionCount
         });
         
-        const data = await response.json();
-        
-        if (data.success) {
+        if (job.status === 'succeeded') {
+            const data = job.result;
             displayQuestions(data.questions);
             switchTab('questions');
             updateStatus(`Generated ${data.total_questions} questions successfully`);
             showNotification(`Generated ${data.total_questions} questions!`, 'success');
+        } else if (job.status === 'cancelled') {
+            updateStatus('Question generation cancelled');
         } else {
-            showNotification(data.error, 'error');
+            showNotification(job.error, 'error');
         }
     } catch (error) {
         showNotification('Error generating questions', 'error');
@@ -366,6 +657,96 @@ async function generateQuestions() {
     }
 }
 
+// Background jobs: submit, then follow progress over server-sent events
+async function runJob(payload) {
+    const response = await fetch('/jobs', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify(payload)
+    });
+    
+    const data = await response.json();
+    if (!data.success) {
+        return { status: 'failed', error: data.error };
+    }
+    
+    currentJobId = data.job_id;
+    showJobProgress(true);
+    
+    try {
+        return await followJob(data);
+    } finally {
+        currentJobId = null;
+        showJobProgress(false);
+    }
+}
+
+function followJob(submitted) {
+    return new Promise((resolve, reject) => {
+        if (!window.EventSource) {
+            pollJob(submitted.status_url).then(resolve, reject);
+            return;
+        }
+        
+        const events = new EventSource(submitted.events_url);
+        events.onmessage = (event) => {
+            const job = JSON.parse(event.data);
+            updateJobProgress(job);
+            if (['succeeded', 'failed', 'cancelled'].includes(job.status)) {
+                events.close();
+                resolve(job);
+            }
+        };
+        events.onerror = () => {
+            // Fall back to polling if the event stream drops
+            events.close();
+            pollJob(submitted.status_url).then(resolve, reject);
+        };
+    });
+}
+
+async function pollJob(statusUrl) {
+    while (true) {
+        const response = await fetch(statusUrl);
+        const job = await response.json();
+        if (!job.success) {
+            return { status: 'failed', error: job.error };
+        }
+        
+        updateJobProgress(job);
+        if (['succeeded', 'failed', 'cancelled'].includes(job.status)) {
+            return job;
+        }
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+}
+
+async function cancelCurrentJob() {
+    if (!currentJobId) return;
+    
+    try {
+        await fetch(`/jobs/${currentJobId}`, { method: 'DELETE' });
+        updateStatus('Cancelling...');
+    } catch (error) {
+        console.error('Cancel error:', error);
+    }
+}
+
+function updateJobProgress(job) {
+    document.getElementById('loadingMessage').textContent = job.message || 'Processing...';
+    document.getElementById('jobProgressFill').style.width = `${Math.round(job.progress * 100)}%`;
+}
+
+function showJobProgress(show) {
+    document.getElementById('jobProgress').style.display = show ? 'flex' : 'none';
+    if (!show) {
+        document.getElementById('loadingMessage').textContent = 'Processing...';
+        document.getElementById('jobProgressFill').style.width = '0%';
+    }
+}
+
 function displayQuestions(questions) {
     const questionsContent = document.getElementById('questionsContent');
     
@@ -655,6 +1036,8 @@ function showNotification(message, type = 'info') {
 function handleKeyboardShortcuts(event) {
     // Only handle shortcuts when viewer is visible
     if (viewerSection.style.display === 'none') return;
+    // Leave keys alone while the user is typing, e.g. in the search box
+    if (event.target.matches('input, textarea, select')) return;
     
     switch (event.key) {
         case 'ArrowLeft':
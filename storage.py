@@ -0,0 +1,194 @@
+"""Content-addressed storage for uploaded PDF files"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's content, the same hash uploads are stored under"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def prune_directory(directory, max_bytes, target=0.9):
+    """Delete the least recently modified files under directory until it fits
+
+    Nothing is deleted while the files total at most max_bytes; otherwise
+    the oldest go until they total at most target * max_bytes. Emptied
+    subdirectories are removed too. Returns the bytes left.
+    """
+    files = []
+    for parent, _, filenames in os.walk(directory):
+        for filename in filenames:
+            path = os.path.join(parent, filename)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            files.append((info.st_mtime, info.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    if total <= max_bytes:
+        return total
+
+    files.sort()
+    for _, size, path in files:
+        if total <= max_bytes * target:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+    for parent, _, _ in os.walk(directory, topdown=False):
+        if parent != directory:
+            try:
+                os.rmdir(parent)
+            except OSError:
+                # Not empty
+                pass
+    return total
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an uploaded stream exceeds the configured size limit"""
+
+
+class DocumentStorage:
+    """Stores each distinct uploaded PDF once, named by its SHA-256
+
+    Uploads are streamed to disk in chunks while being hashed, so the body
+    is never held in memory and never copied twice. Files are reference
+    counted by the documents that have them open. Closing the last one
+    keeps the file, so sessions can reopen it after an eviction and other
+    worker processes can keep using it; collect_garbage() deletes files
+    nobody has used for max_age seconds, and runs every gc_interval
+    seconds as uploads arrive. on_delete, if given, is called with the
+    content hash of every stored PDF it deletes.
+    """
+
+    def __init__(self, root, chunk_size=1024 * 1024, max_age=24 * 60 * 60, gc_interval=60 * 60,
+                 on_delete=None):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.max_age = max_age
+        self.gc_interval = gc_interval
+        self.on_delete = on_delete
+        self._references = {}
+        self._lock = threading.Lock()
+        self._last_collection = time.time()
+        os.makedirs(os.path.join(self.root, 'incoming'), exist_ok=True)
+
+    def path_for(self, content_hash):
+        return os.path.join(self.root, f'{content_hash}.pdf')
+
+    def save_stream(self, stream, max_size=None):
+        """Write a binary stream to storage and return (content_hash, path, size)
+
+        The caller holds a reference to the stored file and must release()
+        it. Raises ValueError if the stream is empty or larger than max_size.
+        """
+        self._maybe_collect_garbage()
+        digest = hashlib.sha256()
+        size = 0
+        handle, temp_path = tempfile.mkstemp(suffix='.part', dir=os.path.join(self.root, 'incoming'))
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                for chunk in iter(lambda: stream.read(self.chunk_size), b''):
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise UploadTooLarge(f'File is larger than {max_size // (1024 * 1024)} MB')
+                    digest.update(chunk)
+                    f.write(chunk)
+
+            if size == 0:
+                raise ValueError('Uploaded file is empty')
+
+            content_hash = digest.hexdigest()
+            path = self.path_for(content_hash)
+            with self._lock:
+                if os.path.exists(path):
+                    # Same content uploaded before: keep the stored copy
+                    os.remove(temp_path)
+                    os.utime(path)
+                else:
+                    os.replace(temp_path, path)
+                # Taken under the lock so a concurrent release() of the
+                # same content cannot delete the file before it is opened
+                self._references[content_hash] = self._references.get(content_hash, 0) + 1
+            return content_hash, path, size
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def acquire(self, content_hash):
+        """Record that a document has the stored file open"""
+        with self._lock:
+            self._references[content_hash] = self._references.get(content_hash, 0) + 1
+            path = self.path_for(content_hash)
+            if os.path.exists(path):
+                # Keeps other processes' garbage collection away from it
+                os.utime(path)
+
+    def release(self, content_hash):
+        """Drop a reference; the file stays until collect_garbage() finds it unused"""
+        with self._lock:
+            if content_hash not in self._references:
+                # Not stored through acquire(), e.g. opened from elsewhere
+                return
+            count = self._references[content_hash] - 1
+            if count > 0:
+                self._references[content_hash] = count
+                return
+            self._references.pop(content_hash, None)
+            try:
+                # Its age for garbage collection counts from now
+                os.utime(self.path_for(content_hash))
+            except OSError:
+                pass
+
+    def collect_garbage(self, max_age=None):
+        """Delete unreferenced files not used for max_age seconds
+
+        References are only known within this process, so another worker
+        may still have an old file open; the age limit is what protects
+        it, since every process touches a file when opening and closing it.
+        """
+        cutoff = time.time() - (self.max_age if max_age is None else max_age)
+        removed = 0
+        deleted_documents = []
+        with self._lock:
+            self._last_collection = time.time()
+            for directory in (self.root, os.path.join(self.root, 'incoming')):
+                for filename in os.listdir(directory):
+                    path = os.path.join(directory, filename)
+                    content_hash = filename.rsplit('.', 1)[0]
+                    if not os.path.isfile(path) or content_hash in self._references:
+                        continue
+                    try:
+                        if os.path.getmtime(path) < cutoff:
+                            os.remove(path)
+                            removed += 1
+                            if directory == self.root:
+                                deleted_documents.append(content_hash)
+                    except OSError:
+                        pass
+
+        if self.on_delete is not None:
+            for content_hash in deleted_documents:
+                try:
+                    self.on_delete(content_hash)
+                except Exception as e:
+                    print(f"Warning: Delete callback failed for {content_hash}: {e}")
+        return removed
+
+    def _maybe_collect_garbage(self):
+        if time.time() - self._last_collection >= self.gc_interval:
+            self.collect_garbage()
@@ -0,0 +1,106 @@
+"""Whole-document abstractive summarization with batched, map-reduce inference"""
+import os
+from nlp import sent_tokenize
+
+SUMMARY_BATCH_SIZE = int(os.getenv('SUMMARY_BATCH_SIZE', 8))
+SUMMARY_MAX_ROUNDS = int(os.getenv('SUMMARY_MAX_ROUNDS', 4))
+
+# Used when the model's tokenizer cannot be asked
+DEFAULT_TOKEN_LIMIT = 1024
+WORDS_PER_TOKEN = 0.75
+
+# Room left in every chunk for the special tokens the model adds
+SPECIAL_TOKEN_MARGIN = 16
+
+def estimate_tokens(texts):
+    """Rough token counts for when no tokenizer is available"""
+    return [int(len(text.split()) / WORDS_PER_TOKEN) + 1 for text in texts]
+
+def count_tokens(models, model_name, texts):
+    """Token counts from the model's tokenizer, estimated if it has none"""
+    texts = list(texts)
+    counts = models.count_tokens(model_name, texts) if texts else []
+    return counts if counts is not None else estimate_tokens(texts)
+
+def split_long_sentence(sentence, token_count, max_tokens):
+    """Split a sentence that alone exceeds max_tokens into word-bounded pieces"""
+    words = sentence.split()
+    pieces = max(2, -(-token_count // max_tokens))
+    size = -(-len(words) // pieces)
+    return [' '.join(words[i:i + size]) for i in range(0, len(words), size)]
+
+def chunk_sentences(sentences, token_counts, max_tokens):
+    """Greedily pack whole sentences into chunks of at most max_tokens tokens"""
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    for sentence, tokens in zip(sentences, token_counts):
+        if tokens > max_tokens:
+            pieces = split_long_sentence(sentence, tokens, max_tokens)
+            piece_tokens = estimate_tokens(pieces)
+            chunks.extend(chunk_sentences(pieces, piece_tokens, max_tokens))
+            continue
+
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(' '.join(current))
+            current = []
+            current_tokens = 0
+
+        current.append(sentence)
+        current_tokens += tokens
+
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+def summarize_batch(models, chunks, batch_size=SUMMARY_BATCH_SIZE, max_length=130,
+                    min_length=30, model_name='summarizer', progress=None):
+    """Summarize every chunk, feeding the model batch_size chunks per call
+
+    progress(done, total) is called after every batch.
+    """
+    summaries = []
+    for start in range(0, len(chunks), batch_size):
+        batch = chunks[start:start + batch_size]
+        # A short final chunk must not be forced into a longer summary than itself
+        batch_min_length = min(min_length, max(5, min(estimate_tokens(batch)) // 2))
+        results = models.run(model_name, batch, batch_size=len(batch), max_length=max_length,
+                             min_length=batch_min_length, do_sample=False, truncation=True)
+        summaries.extend(result['summary_text'] for result in results)
+        if progress is not None:
+            progress(len(summaries), len(chunks))
+    return summaries
+
+def summarize_sentences(sentences, models, model_name='summarizer', batch_size=SUMMARY_BATCH_SIZE,
+                        max_rounds=SUMMARY_MAX_ROUNDS, max_length=130, min_length=30,
+                        progress=None):
+    """Summarize a whole document given as a list of sentences
+
+    Map: sentences are packed into chunks that fit the model's input limit
+    and every chunk is summarized in batches. Reduce: while more than one
+    summary remains, the joined summaries are re-chunked and summarized
+    again, so arbitrarily long documents end in a single summary.
+
+    progress(done, total, round_index) is called after every batch; round
+    0 is the map step over the document itself.
+    """
+    limit = models.token_limit(model_name) or DEFAULT_TOKEN_LIMIT
+    max_tokens = max(64, limit - SPECIAL_TOKEN_MARGIN)
+
+    sentences = [sentence.strip() for sentence in sentences if len(sentence.strip()) > 1]
+    if not sentences:
+        return ''
+
+    for round_index in range(max_rounds):
+        chunks = chunk_sentences(sentences, count_tokens(models, model_name, sentences), max_tokens)
+        round_progress = None
+        if progress is not None:
+            round_progress = lambda done, total, index=round_index: progress(done, total, index)
+        summaries = summarize_batch(models, chunks, batch_size, max_length, min_length,
+                                    model_name, round_progress)
+        if len(summaries) == 1:
+            return summaries[0]
+        sentences = [sentence for summary in summaries for sentence in sent_tokenize(summary)]
+
+    return ' '.join(sentences)
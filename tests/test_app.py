@@ -0,0 +1,58 @@
+import pytest
+
+fitz = pytest.importorskip('fitz')
+pytest.importorskip('flask')
+pytest.importorskip('PIL')
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('app')
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        for name in ('DOCUMENT_STORAGE_DIR', 'THUMBNAIL_DIR', 'SEARCH_INDEX_DIR', 'PROFILE_DIR'):
+            monkeypatch.setenv(name, str(directory / name.lower()))
+        monkeypatch.setenv('RESULT_CACHE_PATH', str(directory / 'results.sqlite3'))
+        monkeypatch.setenv('PREFETCH_DEPTH', '0')
+        import app
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    document = fitz.open()
+    document.new_page(width=200, height=200).insert_text((20, 40), 'Hello')
+    pdf = document.tobytes()
+    document.close()
+
+    client = app_module.app.test_client()
+    response = client.post('/upload?filename=test.pdf', data=pdf, content_type='application/pdf')
+    assert response.status_code == 200, response.get_json()
+    return client
+
+
+def test_page_image_has_a_private_etag(client):
+    response = client.get('/page/1.png?zoom=1')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'image/png'
+    assert response.headers['ETag']
+    assert 'private' in response.headers['Cache-Control']
+
+
+def test_matching_etag_is_not_modified(client, app_module, monkeypatch):
+    etag = client.get('/page/1.png?zoom=1').headers['ETag']
+    monkeypatch.setattr(app_module, 'render_page_image',
+                        lambda *args, **kwargs: pytest.fail('rendered a page the client has'))
+    response = client.get('/page/1.png?zoom=1', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert response.data == b''
+
+
+def test_other_zoom_has_another_etag(client):
+    first = client.get('/page/1.png?zoom=1').headers['ETag']
+    response = client.get('/page/1.png?zoom=2', headers={'If-None-Match': first})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != first
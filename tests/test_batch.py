@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+pytest.importorskip('fitz')
+
+import batch
+from storage import hash_file
+
+
+def test_load_manifest_skips_lines_cut_short(tmp_path):
+    manifest = tmp_path / batch.MANIFEST_NAME
+    manifest.write_text(json.dumps({'content_hash': 'a'}) + '\n'
+                        + json.dumps({'source': 'no hash'}) + '\n'
+                        + '{"content_hash": "b', encoding='utf-8')
+
+    assert batch.load_manifest(str(manifest)) == {'a'}
+    assert batch.load_manifest(str(tmp_path / 'missing.jsonl')) == set()
+
+
+def test_resumed_run_skips_finished_documents(tmp_path):
+    input_dir = tmp_path / 'in'
+    (input_dir / 'nested').mkdir(parents=True)
+    first, second = input_dir / 'a.pdf', input_dir / 'nested' / 'b.PDF'
+    first.write_bytes(b'%PDF first')
+    second.write_bytes(b'%PDF second')
+    (input_dir / 'notes.txt').write_text('not a pdf')
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+    with open(output_dir / batch.MANIFEST_NAME, 'w', encoding='utf-8') as manifest:
+        for path in (first, second):
+            manifest.write(json.dumps({'content_hash': hash_file(str(path))}) + '\n')
+
+    assert batch.run_batch([str(input_dir)], str(output_dir), workers=1, log=lambda message: None) == (0, 2, 0)
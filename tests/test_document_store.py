@@ -0,0 +1,116 @@
+import threading
+
+import pytest
+
+from document_store import DocumentClosed, DocumentStore
+
+
+class FakeDocument:
+    def __init__(self, pages=3):
+        self.pages = pages
+        self.closed = False
+
+    def __len__(self):
+        return self.pages
+
+    def close(self):
+        self.closed = True
+
+
+def add(store, doc_id, **kwargs):
+    return store.add(FakeDocument(), f'{doc_id}.pdf', f'/missing/{doc_id}.pdf',
+                     doc_id=doc_id, content_hash=f'hash-{doc_id}', **kwargs)
+
+
+def test_evicts_least_recently_used():
+    closed = []
+    store = DocumentStore(max_documents=2, on_close=closed.append)
+    first, second = add(store, 'a'), add(store, 'b')
+    store.get('a')
+    add(store, 'c')
+
+    assert store.get('b') is None
+    assert store.get('a') is first
+    assert second.document is None
+    assert closed == [second]
+
+
+def test_memory_limit_keeps_the_entry_being_served():
+    store = DocumentStore(max_memory=100)
+    first = add(store, 'a')
+    first.extracted_text = 'x' * 100
+    second = add(store, 'b')
+    second.extracted_text = 'x' * 100
+    store.enforce_limits(keep='b')
+
+    assert store.get('a') is None
+    assert store.get('b') is second
+
+
+def test_idle_documents_are_swept():
+    store = DocumentStore(idle_timeout=60)
+    entry = add(store, 'a')
+    entry.last_access -= 120
+
+    assert store.sweep() == 1
+    assert len(store) == 0
+    assert entry.document is None
+
+
+def test_pinned_entry_stays_open_until_unpinned():
+    closed = []
+    store = DocumentStore(max_documents=1, on_close=closed.append)
+    entry = add(store, 'a', pin=True)
+    add(store, 'b')
+
+    assert store.get('a') is None
+    assert entry.document is not None and closed == []
+    entry.unpin()
+    assert entry.document is None and closed == [entry]
+
+
+def test_pinning_a_closed_entry_fails():
+    store = DocumentStore()
+    entry = add(store, 'a')
+    store.remove('a')
+
+    assert not entry.pin()
+    with pytest.raises(DocumentClosed):
+        with entry.pinned():
+            pass
+
+
+def test_get_or_open_reopens_a_missing_document():
+    store = DocumentStore()
+    document = FakeDocument(5)
+    entry = store.get_or_open('a', lambda: (document, 'a.pdf', '/missing/a.pdf', 'hash-a'))
+
+    assert entry.document is document and entry.total_pages == 5
+    assert store.get_or_open('a', lambda: pytest.fail('opened twice')) is entry
+
+
+def test_concurrent_reopens_keep_one_document():
+    store = DocumentStore()
+    documents = []
+    barrier = threading.Barrier(4)
+    entries = []
+
+    def opener():
+        document = FakeDocument()
+        documents.append(document)
+        return document, 'a.pdf', '/missing/a.pdf', 'hash-a'
+
+    def reopen():
+        barrier.wait()
+        entries.append(store.get_or_open('a', opener, pin=True))
+
+    threads = [threading.Thread(target=reopen) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(entry) for entry in entries}) == 1
+    assert entries[0]._pins == 4
+    assert sum(not document.closed for document in documents) == 1
+    assert len(store) == 1
@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+from jobs import JobQueue, QueueFull
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(max_workers=1, max_pending=2)
+    yield queue
+    queue.shutdown()
+
+
+def test_job_succeeds(queue):
+    job = queue.submit('test', lambda job: 42)
+    while not job.done:
+        job.wait_for_update(job.version, timeout=5)
+
+    assert job.status == 'succeeded' and job.result == 42
+
+
+def test_running_job_stops_at_its_next_report(queue):
+    started, release = threading.Event(), threading.Event()
+
+    def work(job):
+        started.set()
+        release.wait(5)
+        job.report(0.5)
+        return 'finished'
+
+    job = queue.submit('test', work)
+    assert started.wait(5)
+    queue.cancel(job.id)
+    release.set()
+    while not job.done:
+        job.wait_for_update(job.version, timeout=5)
+
+    assert job.status == 'cancelled' and job.result is None
+
+
+def test_queued_job_is_cancelled_before_it_runs(queue):
+    release = threading.Event()
+    ran = []
+    blocker = queue.submit('test', lambda job: release.wait(5))
+    job = queue.submit('test', lambda job: ran.append(job))
+    queue.cancel(job.id)
+
+    assert job.status == 'cancelled'
+    release.set()
+    while not blocker.done:
+        blocker.wait_for_update(blocker.version, timeout=5)
+    queue.shutdown()
+    assert ran == []
+
+
+def test_queue_rejects_work_at_capacity(queue):
+    release = threading.Event()
+    for _ in range(2):
+        queue.submit('test', lambda job: release.wait(5))
+    try:
+        with pytest.raises(QueueFull):
+            queue.submit('test', lambda job: None)
+    finally:
+        release.set()
@@ -0,0 +1,63 @@
+from render_cache import RenderCache
+
+
+def test_memory_is_bounded_by_bytes():
+    cache = RenderCache(max_bytes=10)
+    keys = [cache.make_key('doc', page, 1.0) for page in range(3)]
+    for key in keys:
+        cache.put(key, b'x' * 4)
+
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2]) == b'x' * 4
+    stats = cache.stats()
+    assert stats['bytes'] == 8 and stats['evictions'] == 1
+
+
+def test_entries_larger_than_the_cache_are_not_kept():
+    cache = RenderCache(max_bytes=4)
+    key = cache.make_key('doc', 0, 1.0)
+    cache.put(key, b'x' * 5)
+
+    assert cache.get(key) is None
+    assert cache.stats()['bytes'] == 0
+
+
+def test_nearby_zooms_share_an_entry():
+    cache = RenderCache()
+    assert cache.make_key('doc', 0, 1.49) == cache.make_key('doc', 0, 1.51)
+
+
+def test_disk_tier_serves_entries_evicted_from_memory(tmp_path):
+    cache = RenderCache(max_bytes=4, disk_dir=str(tmp_path))
+    first, second = cache.make_key('doc', 0, 1.0), cache.make_key('doc', 1, 1.0)
+    cache.put(first, b'aaaa')
+    cache.put(second, b'bbbb')
+
+    assert cache.get(first) == b'aaaa'
+    assert cache.stats()['disk_hits'] == 1
+    # A new cache over the same directory picks up what is already there
+    reopened = RenderCache(disk_dir=str(tmp_path))
+    assert reopened.stats()['disk_bytes'] == 8
+    assert reopened.contains(second)
+
+
+def test_disk_tier_is_pruned_to_its_budget(tmp_path):
+    cache = RenderCache(disk_dir=str(tmp_path), max_disk_bytes=10)
+    for page in range(4):
+        cache.put(cache.make_key('doc', page, 1.0), b'x' * 4)
+
+    assert cache.stats()['disk_bytes'] <= 10
+
+
+def test_discard_document(tmp_path):
+    cache = RenderCache(disk_dir=str(tmp_path))
+    kept, dropped = cache.make_key('other', 0, 1.0), cache.make_key('doc', 0, 1.0)
+    cache.put(kept, b'keep')
+    cache.put(dropped, b'drop')
+    cache.discard_document('doc')
+
+    assert cache.stats()['bytes'] == 4
+    assert cache.contains(dropped)
+    cache.discard_document('doc', disk=True)
+    assert not cache.contains(dropped)
+    assert cache.stats()['disk_bytes'] == 4
@@ -0,0 +1,61 @@
+from result_cache import ResultCache
+
+
+def test_round_trip_and_counters(tmp_path):
+    cache = ResultCache(str(tmp_path / 'results.sqlite3'))
+    assert cache.get('hash', 'summary', {'model': 'a'}) is None
+    cache.put('hash', 'summary', {'model': 'a'}, {'summary': 'text'})
+
+    assert cache.get('hash', 'summary', {'model': 'a'}) == {'summary': 'text'}
+    assert cache.get('hash', 'summary', {'model': 'b'}) is None
+    stats = cache.stats()
+    assert stats['entries'] == 1 and stats['hits'] == 1 and stats['misses'] == 2
+
+
+def test_results_survive_a_new_connection(tmp_path):
+    path = str(tmp_path / 'results.sqlite3')
+    ResultCache(path).put('hash', 'text', None, 'page text')
+
+    assert ResultCache(path).get('hash', 'text') == 'page text'
+
+
+def test_get_or_compute_only_computes_once(tmp_path):
+    cache = ResultCache(str(tmp_path / 'results.sqlite3'))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return [1, 2, 3]
+
+    assert cache.get_or_compute('hash', 'questions', {'count': 3}, compute) == [1, 2, 3]
+    assert cache.get_or_compute('hash', 'questions', {'count': 3}, compute) == [1, 2, 3]
+    assert len(calls) == 1
+
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path / 'results.sqlite3'), max_bytes=250)
+    for number in range(4):
+        cache.put(f'hash-{number}', 'text', None, 'x' * 100)
+
+    assert cache.stats()['bytes'] <= 250
+    assert cache.get('hash-0', 'text') is None
+    assert cache.get('hash-3', 'text') is not None
+
+
+def test_discard_drops_one_document(tmp_path):
+    cache = ResultCache(str(tmp_path / 'results.sqlite3'))
+    cache.put('hash-a', 'text', None, 'a')
+    cache.put('hash-a', 'summary', None, 'summary')
+    cache.put('hash-b', 'text', None, 'b')
+    cache.discard('hash-a')
+
+    assert cache.get('hash-a', 'text') is None
+    assert cache.get('hash-b', 'text') == 'b'
+    assert cache.stats()['entries'] == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResultCache('', max_bytes=0)
+    cache.put('hash', 'text', None, 'value')
+
+    assert cache.get('hash', 'text') is None
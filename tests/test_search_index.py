@@ -0,0 +1,45 @@
+from extraction import assemble_text
+from search_index import SearchIndex
+
+PAGES = [
+    (1, 'The quick brown fox jumps over the lazy dog.'),
+    (2, 'Foxes are quick; a fox is quicker than a dog.'),
+    (3, 'Nothing to see here.'),
+]
+
+
+def build_index():
+    return SearchIndex.from_document_text(assemble_text(PAGES))
+
+
+def test_search_ranks_pages_by_matched_terms():
+    results = build_index().search('quick dog')
+
+    assert [result['page'] for result in results] == [1, 2]
+    assert results[0]['matches'] == 2
+    assert 'quick' in results[0]['snippet']
+
+
+def test_search_without_matches():
+    assert build_index().search('elephant') == []
+    assert build_index().search('   ') == []
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = build_index()
+    path = str(tmp_path / 'index' / 'doc.idx')
+    index.save(path)
+    loaded = SearchIndex.load(path)
+
+    assert loaded.pages == index.pages
+    assert loaded.page_lengths == index.page_lengths
+    assert list(loaded.postings('fox')) == list(index.postings('fox'))
+    assert loaded.search('quick dog') == index.search('quick dog')
+    assert list(tmp_path.joinpath('index').iterdir()) == [tmp_path / 'index' / 'doc.idx']
+
+
+def test_load_rejects_missing_or_corrupt_files(tmp_path):
+    path = tmp_path / 'doc.idx'
+    assert SearchIndex.load(str(path)) is None
+    path.write_bytes(b'\x05\x00')
+    assert SearchIndex.load(str(path)) is None
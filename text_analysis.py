@@ -0,0 +1,265 @@
+"""Tokenize a document once and share the result with every analysis helper"""
+import functools
+import math
+import os
+import re
+from metrics import span
+from nlp import readability, sent_tokenize, stopwords, word_tokenize
+
+EXTRACTIVE_SUMMARY_SENTENCES = int(os.getenv('EXTRACTIVE_SUMMARY_SENTENCES', 3))
+
+# TextRank builds a sentence-by-sentence similarity matrix, so above this
+# many sentences the centroid ranking is used instead
+TEXTRANK_MAX_SENTENCES = int(os.getenv('TEXTRANK_MAX_SENTENCES', 5000))
+
+KEY_INDICATORS = ['important', 'key', 'main', 'primary', 'essential', 'crucial', 'significant']
+
+
+class AnalyzedDocument:
+    """Sentences and word tokens of one extracted text, each computed once
+
+    text is the whitespace-normalized document. Its sentences and their
+    lowercase forms are split up front; the word tokens of every sentence
+    (and their lowercase forms) are only computed the first time a helper
+    asks for them, since the model summary only needs the sentences. No
+    helper needs to run NLTK again.
+    """
+
+    def __init__(self, text):
+        self.text = re.sub(r'\s+', ' ', text).strip()
+        self.sentences = sent_tokenize(self.text)
+        self.sentences_lower = [sentence.lower() for sentence in self.sentences]
+        self._term_matrix = None
+
+    @functools.cached_property
+    def sentence_words(self):
+        return [word_tokenize(sentence) for sentence in self.sentences]
+
+    @functools.cached_property
+    def sentence_words_lower(self):
+        return [[word.lower() for word in words] for words in self.sentence_words]
+
+    @property
+    def word_count(self):
+        return len(self.text.split())
+
+    @property
+    def sentence_count(self):
+        return len(self.sentences)
+
+    def term_matrix(self):
+        """Sparse sentence-by-term count matrix and vocabulary, built once
+
+        Stopwords and non-alphanumeric tokens are left out. Requires NumPy
+        and SciPy.
+        """
+        if self._term_matrix is None:
+            np, sparse = vector_libraries()
+            ignored = get_stopwords()
+            vocabulary = {}
+            rows = []
+            columns = []
+            for row, words in enumerate(self.sentence_words_lower):
+                for word in words:
+                    if word.isalnum() and word not in ignored:
+                        rows.append(row)
+                        columns.append(vocabulary.setdefault(word, len(vocabulary)))
+
+            data = np.ones(len(rows), dtype=np.float32)
+            shape = (len(self.sentences), max(1, len(vocabulary)))
+            # Duplicate (row, column) pairs are summed into term counts
+            matrix = sparse.csr_matrix((data, (rows, columns)), shape=shape)
+            matrix.sum_duplicates()
+            self._term_matrix = (matrix, vocabulary)
+        return self._term_matrix
+
+    def memory_usage(self):
+        """Rough estimate of the memory held by the analysis in bytes"""
+        size = len(self.text) * 4
+        # Only count the word tokens once they have been computed
+        if 'sentence_words' in self.__dict__:
+            size += len(self.text) * 2 + sum(len(words) for words in self.sentence_words) * 120
+        return size
+
+
+_vector_libraries = None
+
+def vector_libraries():
+    """(numpy, scipy.sparse), or None if either is missing
+
+    Imported on first use rather than with this module, which the web
+    app imports at startup.
+    """
+    global _vector_libraries
+    if _vector_libraries is None:
+        try:
+            import numpy
+            from scipy import sparse
+            _vector_libraries = (numpy, sparse)
+        except ImportError:
+            # The extractive summarizer falls back to pure Python without them
+            _vector_libraries = ()
+    return _vector_libraries or None
+
+_stopwords = None
+
+def get_stopwords():
+    """English stopwords from NLTK, or an empty set if the corpus is missing"""
+    global _stopwords
+    if _stopwords is None:
+        try:
+            _stopwords = frozenset(stopwords('english'))
+        except LookupError:
+            print("Warning: NLTK stopwords corpus not found; summaries will include stopwords")
+            _stopwords = frozenset()
+    return _stopwords
+
+def analyze_text(text):
+    """Build the AnalyzedDocument for an extracted text"""
+    with span('tokenize'):
+        return AnalyzedDocument(text)
+
+def tfidf_matrix(analysis):
+    """L2-normalized TF-IDF sentence vectors as a sparse matrix"""
+    np, sparse = vector_libraries()
+    counts, _ = analysis.term_matrix()
+    sentence_count = counts.shape[0]
+
+    # Sublinear term frequency and smoothed inverse document frequency
+    tf = counts.copy()
+    tf.data = 1.0 + np.log(tf.data)
+    document_frequency = np.bincount(counts.indices, minlength=counts.shape[1])
+    idf = np.log((1.0 + sentence_count) / (1.0 + document_frequency)) + 1.0
+    weighted = tf.multiply(idf.astype(np.float32)).tocsr()
+
+    norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ weighted
+
+def rank_sentences_centroid(vectors):
+    """Score sentences by cosine similarity to the document's TF-IDF centroid"""
+    np, _ = vector_libraries()
+    centroid = np.asarray(vectors.sum(axis=0)).ravel()
+    norm = np.linalg.norm(centroid)
+    if norm == 0:
+        return np.zeros(vectors.shape[0])
+    return vectors @ (centroid / norm)
+
+def rank_sentences_textrank(vectors, damping=0.85, iterations=30, min_similarity=0.05):
+    """Score sentences with TextRank over the sparse cosine similarity graph"""
+    np, sparse = vector_libraries()
+    similarity = (vectors @ vectors.T).tocsr()
+    similarity.setdiag(0)
+    # Drop weak edges to keep the graph sparse
+    similarity.data[similarity.data < min_similarity] = 0
+    similarity.eliminate_zeros()
+
+    out_weight = np.asarray(similarity.sum(axis=1)).ravel()
+    out_weight[out_weight == 0] = 1.0
+    transition = (sparse.diags(1.0 / out_weight) @ similarity).T.tocsr()
+
+    count = vectors.shape[0]
+    scores = np.full(count, 1.0 / count)
+    for _ in range(iterations):
+        updated = (1 - damping) / count + damping * (transition @ scores)
+        if np.abs(updated - scores).sum() < 1e-6:
+            return updated
+        scores = updated
+    return scores
+
+def rank_sentences_python(analysis):
+    """Pure-Python TF-IDF centroid ranking used when NumPy/SciPy are unavailable"""
+    ignored = get_stopwords()
+    sentence_terms = [[word for word in words if word.isalnum() and word not in ignored]
+                      for words in analysis.sentence_words_lower]
+
+    document_frequency = {}
+    for terms in sentence_terms:
+        for term in set(terms):
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+
+    count = len(sentence_terms)
+    idf = {term: math.log((1.0 + count) / (1.0 + frequency)) + 1.0
+           for term, frequency in document_frequency.items()}
+
+    vectors = []
+    centroid = {}
+    for terms in sentence_terms:
+        counts = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        vector = {term: (1.0 + math.log(n)) * idf[term] for term, n in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        vector = {term: weight / norm for term, weight in vector.items()}
+        vectors.append(vector)
+        for term, weight in vector.items():
+            centroid[term] = centroid.get(term, 0.0) + weight
+
+    return [sum(weight * centroid[term] for term, weight in vector.items()) for vector in vectors]
+
+def extractive_summarization(analysis, num_sentences=EXTRACTIVE_SUMMARY_SENTENCES, method='centroid'):
+    """Extractive summarization using TF-IDF approach
+
+    Sentences are TF-IDF vectors (stopwords removed). method='centroid'
+    ranks them by similarity to the whole document; method='textrank'
+    runs TextRank over their similarity graph. The top num_sentences are
+    returned in document order.
+    """
+    sentences = analysis.sentences
+    if len(sentences) <= num_sentences:
+        return analysis.text
+
+    with span('rank_sentences'):
+        libraries = vector_libraries()
+        if libraries is None:
+            scores = rank_sentences_python(analysis)
+        else:
+            np, _ = libraries
+            vectors = tfidf_matrix(analysis)
+            if method == 'textrank' and len(sentences) <= TEXTRANK_MAX_SENTENCES:
+                scores = rank_sentences_textrank(vectors)
+            else:
+                scores = rank_sentences_centroid(vectors)
+            scores = np.asarray(scores).ravel().tolist()
+
+    # Get top sentences, keeping the first occurrence of repeated sentences
+    seen = set()
+    top = []
+    for index in sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True):
+        if sentences[index] in seen:
+            continue
+        seen.add(sentences[index])
+        top.append(index)
+        if len(top) == num_sentences:
+            break
+
+    return ' '.join(sentences[index] for index in sorted(top))
+
+def extract_key_points(analysis):
+    """Extract key points from text"""
+    key_points = []
+
+    # Look for sentences with key indicators
+    for sentence, sentence_lower in zip(analysis.sentences, analysis.sentences_lower):
+        if any(indicator in sentence_lower for indicator in KEY_INDICATORS):
+            key_points.append(sentence.strip())
+            # Only the first five are used, so stop scanning early
+            if len(key_points) == 5:
+                break
+
+    # If no key points found, use first few sentences
+    if not key_points and analysis.sentences:
+        key_points = analysis.sentences[:3]
+
+    return key_points[:5]  # Limit to 5 key points
+
+def compute_statistics(analysis):
+    """Word and sentence counts plus readability scores"""
+    with span('textstat'):
+        readability_score, grade_level = readability(analysis.text)
+    return {
+        'word_count': analysis.word_count,
+        'sentence_count': analysis.sentence_count,
+        'readability_score': readability_score,
+        'grade_level': grade_level
+    }
@@ -0,0 +1,137 @@
+"""Batch generation and on-disk storage of page thumbnails"""
+import contextlib
+import os
+import threading
+import fitz  # PyMuPDF
+from extraction import EXTRACTION_WORKERS, split_page_ranges, submit_to_pool, use_parallel_extraction
+from rendering import encode_pixmap
+from storage import prune_directory
+
+THUMBNAIL_WIDTH = int(os.getenv('THUMBNAIL_WIDTH', 120))
+THUMBNAIL_FORMAT = 'webp'
+
+
+def thumbnail_zoom(page, width=THUMBNAIL_WIDTH):
+    """Zoom that renders a page at the thumbnail width"""
+    return width / max(page.rect.width, 1)
+
+def render_thumbnail(page, width=THUMBNAIL_WIDTH, fmt=THUMBNAIL_FORMAT):
+    """Render one fitz page as an encoded thumbnail"""
+    zoom = thumbnail_zoom(page, width)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    return encode_pixmap(pix, fmt, quality=70)
+
+def _render_thumbnail_range(path, page_indexes, width, fmt):
+    """Worker: open the document independently and render some pages' thumbnails"""
+    with fitz.open(path) as document:
+        return [(page_index, render_thumbnail(document[page_index], width, fmt))
+                for page_index in page_indexes]
+
+
+class ThumbnailStore:
+    """Thumbnails saved as one small file per page under directory/<content hash>/
+
+    When the stored thumbnails grow past max_bytes the least recently
+    written are deleted, like the render cache's disk tier; missing
+    ones are simply rendered again.
+    """
+
+    def __init__(self, directory, width=THUMBNAIL_WIDTH, fmt=THUMBNAIL_FORMAT, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.width = width
+        self.fmt = fmt
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._bytes = prune_directory(directory, max_bytes)
+
+    def path_for(self, content_hash, page_index):
+        return os.path.join(self.directory, content_hash, f'{page_index}_{self.width}.{self.fmt}')
+
+    def get(self, content_hash, page_index):
+        """Return a stored thumbnail's bytes, or None"""
+        try:
+            with open(self.path_for(content_hash, page_index), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, content_hash, page_index, data):
+        path = self.path_for(content_hash, page_index)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        # Pruning may remove the directory between makedirs and open; try once more
+        for attempt in range(2):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                with open(temp_path, 'wb') as f:
+                    f.write(data)
+                break
+            except FileNotFoundError:
+                if attempt:
+                    raise
+        os.replace(temp_path, path)
+
+        with self._lock:
+            self._bytes += len(data)
+            over_budget = self._bytes > self.max_bytes
+        if over_budget:
+            total = prune_directory(self.directory, self.max_bytes)
+            with self._lock:
+                self._bytes = total
+
+    def missing(self, content_hash, total_pages):
+        """Page indexes that have no stored thumbnail yet"""
+        return [page_index for page_index in range(total_pages)
+                if not os.path.exists(self.path_for(content_hash, page_index))]
+
+    def get_or_render(self, content_hash, page_index, document, lock):
+        """Return one thumbnail, rendering it from the open document if needed"""
+        data = self.get(content_hash, page_index)
+        if data is None:
+            with lock:
+                data = render_thumbnail(document[page_index], self.width, self.fmt)
+            self.put(content_hash, page_index, data)
+        return data
+
+    def generate(self, content_hash, document, path=None, lock=None, progress=None, workers=None):
+        """Render every missing thumbnail of a document
+
+        Large documents are rendered by the shared process pool, each
+        worker opening its own copy of the file at path; small ones are
+        rendered here, taking lock per page. progress(done, total) is
+        called as pages complete and may raise to stop early. Returns the
+        number of thumbnails rendered.
+        """
+        total_pages = len(document)
+        missing = self.missing(content_hash, total_pages)
+        done = total_pages - len(missing)
+        if progress:
+            progress(done, total_pages)
+
+        workers = workers or EXTRACTION_WORKERS
+        # Same size threshold as text extraction
+        if use_parallel_extraction(len(missing), path, workers):
+            futures = submit_to_pool(_render_thumbnail_range,
+                                     [(path, missing[start:stop], self.width, self.fmt)
+                                      for start, stop in split_page_ranges(len(missing), workers)],
+                                     workers)
+            try:
+                for future in futures:
+                    for page_index, data in future.result():
+                        self.put(content_hash, page_index, data)
+                    done += len(future.result())
+                    if progress:
+                        progress(done, total_pages)
+            finally:
+                for future in futures:
+                    future.cancel()
+        else:
+            for page_index in missing:
+                with lock if lock is not None else contextlib.nullcontext():
+                    data = render_thumbnail(document[page_index], self.width, self.fmt)
+                self.put(content_hash, page_index, data)
+                done += 1
+                if progress:
+                    progress(done, total_pages)
+
+        return len(missing)
@@ -0,0 +1,93 @@
+"""Background work for the desktop viewer with latest-request-wins coalescing"""
+import queue
+import threading
+
+
+class Superseded(Exception):
+    """Raised inside a task when a newer request has replaced it"""
+
+
+class UIWorker:
+    """Runs slow work off the UI thread, one lane (thread) per kind of work
+
+    Each lane holds at most one waiting request: submitting a new one
+    replaces the waiting request, and marks a running one as stale so
+    its report() raises Superseded at the next checkpoint. Results and
+    progress are queued and handed to their callbacks only when the UI
+    thread calls deliver(), and only if no newer request was made on the
+    lane since, so callbacks may touch widgets freely.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._pending = {}
+        self._generations = {}
+        self._threads = {}
+        self._results = queue.Queue()
+        self._closed = False
+
+    def submit(self, lane, task, on_done=None, on_progress=None, on_error=None):
+        """Queue task(report) on a lane, replacing anything still waiting there
+
+        The task calls report(value) to send progress to on_progress;
+        report raises Superseded once the request is stale.
+        """
+        with self._condition:
+            generation = self._generations.get(lane, 0) + 1
+            self._generations[lane] = generation
+            self._pending[lane] = (generation, task, on_done, on_progress, on_error)
+            if lane not in self._threads:
+                thread = threading.Thread(target=self._run, args=(lane,), daemon=True,
+                                          name=f'ui-worker-{lane}')
+                self._threads[lane] = thread
+                thread.start()
+            self._condition.notify_all()
+        return generation
+
+    def cancel(self, lane):
+        """Drop the waiting request and mark the running one as stale"""
+        with self._condition:
+            self._generations[lane] = self._generations.get(lane, 0) + 1
+            self._pending.pop(lane, None)
+
+    def is_current(self, lane, generation):
+        with self._condition:
+            return self._generations.get(lane) == generation
+
+    def deliver(self, limit=50):
+        """Call the callbacks of finished or progressing tasks; UI thread only"""
+        for _ in range(limit):
+            try:
+                lane, generation, callback, value = self._results.get_nowait()
+            except queue.Empty:
+                return
+            if callback is not None and self.is_current(lane, generation):
+                callback(value)
+
+    def shutdown(self):
+        with self._condition:
+            self._closed = True
+            self._pending.clear()
+            self._condition.notify_all()
+
+    def _run(self, lane):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed or lane in self._pending)
+                if self._closed:
+                    return
+                generation, task, on_done, on_progress, on_error = self._pending.pop(lane)
+
+            def report(value=None):
+                if not self.is_current(lane, generation):
+                    raise Superseded()
+                self._results.put((lane, generation, on_progress, value))
+
+            try:
+                result = task(report)
+            except Superseded:
+                continue
+            except Exception as e:
+                self._results.put((lane, generation, on_error, e))
+            else:
+                self._results.put((lane, generation, on_done, result))